@@ -18,6 +18,7 @@ from browser_env.env_config import (
 from llms.providers.openai_utils import (
     generate_from_openai_chat_completion,
 )
+from llms.rate_limit import call_with_retry
 
 
 def shopping_get_auth_token() -> str:
@@ -158,14 +159,19 @@ def llm_fuzzy_match(pred: str, reference: str, question: str) -> float:
         {"role": "user", "content": message},
     ]
 
-    response = generate_from_openai_chat_completion(
-        # model="gpt-4-1106-preview",
+    # paced and retried on rate limits like the agent's own calls
+    response = call_with_retry(
+        lambda: generate_from_openai_chat_completion(
+            # model="gpt-4-1106-preview",
+            model="gpt-4o",
+            messages=messages,
+            temperature=0,
+            max_tokens=768,
+            top_p=1.0,
+            context_length=0,
+        ),
         model="gpt-4o",
-        messages=messages,
-        temperature=0,
-        max_tokens=768,
-        top_p=1.0,
-        context_length=0,
+        endpoint="openai",
     ).lower()
     if "partially correct" in response or "incorrect" in response:
         return 0.0
@@ -194,13 +200,17 @@ def llm_ua_match(pred: str, reference: str, question: str) -> float:
         {"role": "user", "content": message},
     ]
 
-    response = generate_from_openai_chat_completion(
+    response = call_with_retry(
+        lambda: generate_from_openai_chat_completion(
+            model="gpt-4-1106-preview",
+            messages=messages,
+            temperature=0,
+            max_tokens=768,
+            top_p=1.0,
+            context_length=0,
+        ),
         model="gpt-4-1106-preview",
-        messages=messages,
-        temperature=0,
-        max_tokens=768,
-        top_p=1.0,
-        context_length=0,
+        endpoint="openai",
     ).lower()
     if "different" in response:
         return 0.0
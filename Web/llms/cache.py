@@ -0,0 +1,178 @@
+"""Content-addressed SQLite response cache.
+
+Uses the same key scheme and table layout as World/common/llm_cache.py, so a
+single cache file can be shared by both code bases via LLM_CACHE_PATH."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable
+
+CACHE_PATH = os.environ.get("LLM_CACHE_PATH", "cachedir/llm_cache.sqlite")
+CACHE_MAX_BYTES = int(float(os.environ.get("LLM_CACHE_MAX_MB", 1024)) * 2**20)
+
+
+def normalize_messages(prompt: Any) -> list[dict[str, str]]:
+    if isinstance(prompt, str):
+        return [{"role": "user", "content": prompt}]
+    if isinstance(prompt, dict):
+        prompt = [prompt]
+    return [{"role": m["role"], "content": m["content"]} for m in prompt]
+
+
+def make_key(
+    model: str,
+    prompt: Any,
+    temperature: float | None,
+    max_tokens: int | None,
+    stop: str | list[str] | None,
+) -> str:
+    """Hash of the normalized (model, messages, temperature, max_tokens, stop)."""
+    if stop is None:
+        stop = []
+    elif isinstance(stop, str):
+        stop = [stop]
+    request = {
+        "model": model,
+        "messages": normalize_messages(prompt),
+        "temperature": None
+        if temperature is None
+        else round(float(temperature), 6),
+        "max_tokens": max_tokens,
+        "stop": sorted(s for s in stop if s),
+    }
+    serialized = json.dumps(
+        request, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Single-file response cache with LRU eviction past `max_bytes`."""
+
+    check_every = 100
+
+    def __init__(
+        self, path: str = CACHE_PATH, max_bytes: int = CACHE_MAX_BYTES
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            self._conn = sqlite3.connect(
+                self.path, timeout=30, check_same_thread=False
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, "
+                "response TEXT NOT NULL, "
+                "size INTEGER NOT NULL, "
+                "last_access REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_last_access "
+                "ON responses (last_access)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT response, size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            self.conn.commit()
+            self.hits += 1
+            self.bytes_saved += row[1]
+            response: str = row[0]
+            return response
+
+    def set(self, key: str, response: str) -> None:
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, response, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, response, size, time.time()),
+            )
+            self.conn.commit()
+            self._writes += 1
+            if (self._writes - 1) % self.check_every == 0:
+                self._evict()
+
+    def _evict(self) -> None:
+        total = self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        to_free = total - int(0.9 * self.max_bytes)
+        freed = 0
+        stale = []
+        for key, size in self.conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access"
+        ):
+            stale.append((key,))
+            freed += size
+            if freed >= to_free:
+                break
+        self.conn.executemany("DELETE FROM responses WHERE key = ?", stale)
+        self.conn.commit()
+
+    def cached_call(
+        self,
+        func: Callable[[], str],
+        model: str,
+        prompt: Any,
+        temperature: float | None,
+        max_tokens: int | None,
+        stop: str | list[str] | None,
+    ) -> str:
+        key = make_key(model, prompt, temperature, max_tokens, stop)
+        response = self.get(key)
+        if response is not None:
+            return response
+        response = func()
+        if response:
+            self.set(key, response)
+        return response
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            entries, total = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "bytes_saved": self.bytes_saved,
+            "entries": entries,
+            "bytes": total,
+        }
+
+
+llm_cache = LLMCache()
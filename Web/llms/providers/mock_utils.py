@@ -0,0 +1,137 @@
+"""Offline stand-ins for a real LLM, for benchmarking the agent loop.
+
+`mock` answers every prompt with a scripted response (by default it stops the
+episode), `replay` / `replay:<trace.jsonl>` serves the responses of a trace
+recorded with LLM_RECORD_PATH. The trace format is shared with
+World/common/llm_mock.py."""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable
+
+from llms.cache import make_key
+
+MOCK_LATENCY = float(os.environ.get("LLM_MOCK_LATENCY", 0))
+RECORD_PATH = os.environ.get("LLM_RECORD_PATH")
+REPLAY_PATH = os.environ.get("LLM_REPLAY_PATH")
+MOCK_RESPONSE = os.environ.get(
+    "LLM_MOCK_RESPONSE",
+    "Let's think step-by-step. This is a mock response. "
+    "In summary, the next action I will perform is ```stop [N/A]```",
+)
+
+_policy: Callable[[Any], str] | None = None
+_replayers: dict[str, "TraceReplayer"] = {}
+_lock = threading.Lock()
+
+
+def is_mock_model(model: str) -> bool:
+    return model == "mock" or model.startswith("replay")
+
+
+def set_mock_policy(policy: Callable[[Any], str] | None) -> None:
+    """Script the `mock` model: `policy(prompt)` returns the response."""
+    global _policy
+    _policy = policy
+
+
+def trace_key(
+    prompt: Any,
+    temperature: float | None,
+    max_tokens: int | None,
+    stop: str | list[str] | None,
+) -> str:
+    # the model is left out so that a trace recorded with any model can be replayed
+    return make_key(None, prompt, temperature, max_tokens, stop)  # type: ignore[arg-type]
+
+
+def record_trace(
+    prompt: Any,
+    model: str,
+    temperature: float | None,
+    max_tokens: int | None,
+    stop: str | list[str] | None,
+    response: str,
+    path: str | None = None,
+) -> None:
+    path = path or RECORD_PATH
+    if not path:
+        return
+    record = {
+        "key": trace_key(prompt, temperature, max_tokens, stop),
+        "model": model,
+        "prompt": prompt,
+        "response": response,
+    }
+    with _lock:
+        with open(path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+
+class TraceReplayer:
+    """Serves a recorded trace, matching requests on their key first and
+    falling back to the recorded order."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.responses: list[str] = []
+        self.by_key: dict[str, deque[int]] = {}
+        with open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self.by_key.setdefault(record["key"], deque()).append(
+                        len(self.responses)
+                    )
+                    self.responses.append(record["response"])
+        self.used = [False] * len(self.responses)
+        self.cursor = 0
+        self._lock = threading.Lock()
+
+    def respond(self, key: str) -> str:
+        with self._lock:
+            indices = self.by_key.get(key)
+            if indices:
+                idx = indices.popleft() if len(indices) > 1 else indices[0]
+            else:
+                while (
+                    self.cursor < len(self.responses) and self.used[self.cursor]
+                ):
+                    self.cursor += 1
+                if self.cursor >= len(self.responses):
+                    return ""
+                idx = self.cursor
+            self.used[idx] = True
+            return self.responses[idx]
+
+
+def get_replayer(model: str) -> TraceReplayer:
+    path = model.split(":", 1)[1] if ":" in model else REPLAY_PATH
+    assert (
+        path
+    ), "Set LLM_REPLAY_PATH or use the model name replay:<trace.jsonl> to replay a trace."
+    with _lock:
+        if path not in _replayers:
+            _replayers[path] = TraceReplayer(path)
+        return _replayers[path]
+
+
+def generate_from_mock(
+    prompt: Any,
+    model: str,
+    temperature: float | None = None,
+    max_tokens: int | None = None,
+    stop: str | list[str] | None = None,
+) -> str:
+    if MOCK_LATENCY:
+        time.sleep(MOCK_LATENCY)
+    if model.startswith("replay"):
+        return get_replayer(model).respond(
+            trace_key(prompt, temperature, max_tokens, stop)
+        )
+    if _policy is not None:
+        return _policy(prompt)
+    return MOCK_RESPONSE
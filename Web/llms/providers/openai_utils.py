@@ -4,7 +4,6 @@ Adopted from https://github.com/zeno-ml/zeno-build/"""
 import asyncio
 import logging
 import os
-import random
 import time
 from typing import Any
 
@@ -13,47 +12,35 @@ import openai
 import openai.error
 from tqdm.asyncio import tqdm_asyncio
 
+from llms.rate_limit import backoff_delay, retry_after
+
 
 def retry_with_exponential_backoff(  # type: ignore
     func,
     initial_delay: float = 1,
-    exponential_base: float = 2,
-    jitter: bool = True,
     max_retries: int = 3,
     errors: tuple[Any] = (openai.error.RateLimitError,),
 ):
-    """Retry a function with exponential backoff."""
+    """Retry a function with jittered exponential backoff, honouring the
+    server's Retry-After."""
 
     def wrapper(*args, **kwargs):  # type: ignore
-        # Initialize variables
         num_retries = 0
-        delay = initial_delay
-
-        # Loop until a successful response or max_retries is hit or an exception is raised
         while True:
             try:
                 return func(*args, **kwargs)
-            # Retry on specified errors
             except errors as e:
-                # Increment retries
                 num_retries += 1
-
-                # Check if max retries has been reached
                 if num_retries > max_retries:
                     raise Exception(
                         f"Maximum number of retries ({max_retries}) exceeded."
                     )
-
-                # Increment the delay
-                delay *= exponential_base * (1 + jitter * random.random())
+                delay = retry_after(e)
+                if delay is None:
+                    delay = backoff_delay(num_retries, base=initial_delay)
                 print(f"Retrying in {delay} seconds.")
-                # Sleep for the delay
                 time.sleep(delay)
 
-            # Raise exceptions for any errors not specified
-            except Exception as e:
-                raise e
-
     return wrapper
 
 
@@ -66,7 +53,7 @@ async def _throttled_openai_completion_acreate(
     limiter: aiolimiter.AsyncLimiter,
 ) -> dict[str, Any]:
     async with limiter:
-        for _ in range(3):
+        for attempt in range(3):
             try:
                 return await openai.Completion.acreate(  # type: ignore
                     engine=engine,
@@ -75,11 +62,12 @@ async def _throttled_openai_completion_acreate(
                     max_tokens=max_tokens,
                     top_p=top_p,
                 )
-            except openai.error.RateLimitError:
+            except openai.error.RateLimitError as e:
+                delay = retry_after(e) or backoff_delay(attempt + 3)
                 logging.warning(
-                    "OpenAI API rate limit exceeded. Sleeping for 10 seconds."
+                    f"OpenAI API rate limit exceeded. Sleeping for {delay:.1f} seconds."
                 )
-                await asyncio.sleep(10)
+                await asyncio.sleep(delay)
             except openai.error.APIError as e:
                 logging.warning(f"OpenAI API error: {e}")
                 break
@@ -131,7 +119,6 @@ async def agenerate_from_openai_completion(
     return [x["choices"][0]["text"] for x in responses]
 
 
-@retry_with_exponential_backoff
 def generate_from_openai_completion(
     prompt: str,
     engine: str,
@@ -168,7 +155,7 @@ async def _throttled_openai_chat_completion_acreate(
     limiter: aiolimiter.AsyncLimiter,
 ) -> dict[str, Any]:
     async with limiter:
-        for _ in range(3):
+        for attempt in range(3):
             try:
                 return await openai.ChatCompletion.acreate(  # type: ignore
                     model=model,
@@ -177,11 +164,12 @@ async def _throttled_openai_chat_completion_acreate(
                     max_tokens=max_tokens,
                     top_p=top_p,
                 )
-            except openai.error.RateLimitError:
+            except openai.error.RateLimitError as e:
+                delay = retry_after(e) or backoff_delay(attempt + 3)
                 logging.warning(
-                    "OpenAI API rate limit exceeded. Sleeping for 10 seconds."
+                    f"OpenAI API rate limit exceeded. Sleeping for {delay:.1f} seconds."
                 )
-                await asyncio.sleep(10)
+                await asyncio.sleep(delay)
             except asyncio.exceptions.TimeoutError:
                 logging.warning("OpenAI API timeout. Sleeping for 10 seconds.")
                 await asyncio.sleep(10)
@@ -236,7 +224,6 @@ async def agenerate_from_openai_chat_completion(
     return [x["choices"][0]["message"]["content"] for x in responses]
 
 
-@retry_with_exponential_backoff
 def generate_from_openai_chat_completion(
     messages: list[dict[str, str]],
     model: str,
@@ -0,0 +1,322 @@
+"""Adaptive rate limiting, retry with jittered backoff and circuit breaking.
+
+Mirrors World/common/rate_limit.py: every model gets an AIMD adjusted request
+bucket (plus an optional token bucket), failed calls are retried after the
+server's Retry-After or a full jitter exponential backoff, and an endpoint that
+keeps failing is skipped until its cooldown is over."""
+
+import email.utils
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+RATE_DECREASE = 0.7
+RATE_INCREASE = 0.5
+MIN_RPM = 1.0
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30.0
+RETRYABLE_ERRORS = {
+    "APIError",
+    "APIConnectionError",
+    "ServiceUnavailableError",
+    "Timeout",
+    "TryAgain",
+    "ConnectionError",
+    "ReadTimeout",
+    "TimeoutError",
+}
+
+
+class CircuitOpen(Exception):
+    """Raised when an endpoint is failing, retry after `retry_after` seconds."""
+
+    def __init__(self, msg: str, retry_after: float | None = None) -> None:
+        super().__init__(msg)
+        self.retry_after = retry_after
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+def is_rate_limited(e: BaseException) -> bool:
+    return (
+        type(e).__name__ == "RateLimitError"
+        or getattr(e, "http_status", None) == 429
+        or getattr(e, "status_code", None) == 429
+    )
+
+
+def is_retryable(e: BaseException) -> bool:
+    status = getattr(e, "http_status", None) or getattr(e, "status_code", None)
+    return (
+        is_rate_limited(e)
+        or isinstance(e, CircuitOpen)
+        or type(e).__name__ in RETRYABLE_ERRORS
+        or (isinstance(status, int) and status >= 500)
+    )
+
+
+def retry_after(e: BaseException) -> float | None:
+    """Seconds to wait according to the server's Retry-After headers."""
+    if getattr(e, "retry_after", None) is not None:
+        return float(e.retry_after)  # type: ignore[attr-defined]
+    headers = getattr(e, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+    except (AttributeError, ValueError):
+        return None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        date = email.utils.parsedate_to_datetime(value)
+        return max(0.0, date.timestamp() - time.time())
+
+
+class TokenBucket:
+    """Refills `rate` units per second up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(
+            self.capacity, self.level + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self.refill()
+        if self.level >= amount:
+            return 0.0
+        return (min(amount, self.capacity) - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        self.level -= amount
+
+
+class ModelLimiter:
+    """Request / token buckets of one model, the request rate adapts AIMD
+    style (cut on every 429, raised a little on every success)."""
+
+    def __init__(self, rpm: float | None = None, tpm: float | None = None):
+        self.max_rpm = rpm
+        self.rpm = rpm
+        self.requests = TokenBucket(rpm / 60.0) if rpm else None
+        self.tokens = TokenBucket(tpm / 60.0) if tpm else None
+        self.blocked_until = 0.0
+        self.recent: deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int = 0) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    wait = max(
+                        self.requests.wait_time(1) if self.requests else 0.0,
+                        self.tokens.wait_time(tokens)
+                        if self.tokens and tokens
+                        else 0.0,
+                    )
+                if wait <= 0:
+                    if self.requests:
+                        self.requests.take(1)
+                    if self.tokens and tokens:
+                        self.tokens.take(tokens)
+                    self.recent.append(now)
+                    while self.recent and self.recent[0] < now - 60:
+                        self.recent.popleft()
+                    return
+            time.sleep(wait)
+
+    def set_rpm(self, rpm: float) -> None:
+        self.rpm = max(MIN_RPM, rpm)
+        if self.requests is None:
+            self.requests = TokenBucket(self.rpm / 60.0, capacity=1.0)
+        else:
+            self.requests.refill()
+            self.requests.rate = self.rpm / 60.0
+
+    def success(self) -> None:
+        with self._lock:
+            if self.rpm is not None:
+                rpm = self.rpm + RATE_INCREASE
+                self.set_rpm(min(rpm, self.max_rpm) if self.max_rpm else rpm)
+
+    def observed_rpm(self, now: float) -> float:
+        while self.recent and self.recent[0] < now - 60:
+            self.recent.popleft()
+        if not self.recent:
+            return MIN_RPM
+        return len(self.recent) * 60.0 / max(1.0, now - self.recent[0])
+
+    def rate_limited(self, delay: float | None = None) -> None:
+        with self._lock:
+            now = time.monotonic()
+            observed = self.observed_rpm(now)
+            self.set_rpm(
+                RATE_DECREASE
+                * (min(self.rpm, observed) if self.rpm else observed)
+            )
+            if delay:
+                self.blocked_until = max(self.blocked_until, now + delay)
+
+
+class RateLimiter:
+    """Per model rate limits shared by every llm call of the process."""
+
+    def __init__(self) -> None:
+        self.models: dict[str, ModelLimiter] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, limits: dict[str, dict[str, float]] | None) -> None:
+        """`limits` maps a model name to optional "rpm" / "tpm" limits."""
+        with self._lock:
+            for model, limit in (limits or {}).items():
+                self.models[model] = ModelLimiter(**(limit or {}))
+
+    def get(self, model: str) -> ModelLimiter:
+        with self._lock:
+            if model not in self.models:
+                self.models[model] = ModelLimiter()
+            return self.models[model]
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures, lets a single probe
+    through once `cooldown` seconds have passed."""
+
+    def __init__(
+        self,
+        threshold: int = BREAKER_THRESHOLD,
+        cooldown: float = BREAKER_COOLDOWN,
+    ) -> None:
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.cooldown:
+            return "half_open"
+        return "open"
+
+    def retry_in(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+
+rate_limiter = RateLimiter()
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(endpoint: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if endpoint not in _breakers:
+            _breakers[endpoint] = CircuitBreaker()
+        return _breakers[endpoint]
+
+
+def call_with_retry(
+    func: Callable[[], T],
+    model: str,
+    endpoint: str,
+    max_retries: int = 3,
+    tokens: int = 0,
+) -> T:
+    """Call `func` paced by the model's limiter and the endpoint's breaker,
+    retrying transient errors up to `max_retries` times."""
+    limiter = rate_limiter.get(model)
+    breaker = get_breaker(endpoint)
+    attempt = 0
+    while True:
+        try:
+            if not breaker.allow():
+                raise CircuitOpen(
+                    f"Endpoint {endpoint} is failing, retry in {breaker.retry_in():.1f}s",
+                    retry_after=breaker.retry_in(),
+                )
+            limiter.acquire(tokens)
+            try:
+                result = func()
+            except Exception as e:
+                if is_rate_limited(e):
+                    breaker.success()
+                elif is_retryable(e):
+                    breaker.failure()
+                else:
+                    breaker.success()
+                raise
+            breaker.success()
+            limiter.success()
+            return result
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            attempt += 1
+            if attempt > max_retries:
+                raise Exception(
+                    f"Maximum number of retries ({max_retries}) exceeded."
+                ) from e
+            delay = retry_after(e)
+            if is_rate_limited(e):
+                limiter.rate_limited(delay)
+            if delay is None:
+                delay = backoff_delay(attempt)
+            print(f"{type(e).__name__}: retrying in {delay:.1f} seconds.")
+            time.sleep(delay)
+
+
+def load_rate_limits(path: str) -> None:
+    """Configure the limiter from a yaml / json file with a `rate_limits` key,
+    the same format as the World endpoint files."""
+    import yaml
+
+    with open(path, "r") as f:
+        config: dict[str, Any] = yaml.safe_load(f) or {}
+    rate_limiter.configure(config.get("rate_limits", config))
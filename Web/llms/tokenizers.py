@@ -4,6 +4,8 @@ import tiktoken
 from transformers import LlamaTokenizer  # type: ignore
 from transformers import AutoTokenizer
 
+from llms.providers.mock_utils import is_mock_model
+
 deepseek_map = {"deepseek-r1:7b" : "deepseek-ai/deepseek-llm-7b",
                 "deepseek-r1:14b" : "deepseek-ai/deepseek-llm-14b",
                 "deepseek-r1:32b" : "deepseek-ai/deepseek-llm-32b",
@@ -13,7 +15,10 @@ deepseek_map = {"deepseek-r1:7b" : "deepseek-ai/deepseek-llm-7b",
 class Tokenizer(object):
     def __init__(self, provider: str, model_name: str) -> None:
         if provider == "openai":
-            self.tokenizer = tiktoken.encoding_for_model(model_name)
+            if is_mock_model(model_name):
+                self.tokenizer = tiktoken.get_encoding("cl100k_base")
+            else:
+                self.tokenizer = tiktoken.encoding_for_model(model_name)
         elif provider == "huggingface":
             self.tokenizer = LlamaTokenizer.from_pretrained(model_name)
             # turn off adding special tokens automatically
@@ -7,18 +7,64 @@ from llms import (
     generate_from_openai_completion,
     lm_config,
 )
+from llms.cache import llm_cache
+from llms.rate_limit import call_with_retry
+from llms.providers.mock_utils import (
+    RECORD_PATH,
+    generate_from_mock,
+    is_mock_model,
+    record_trace,
+)
 from ollama import chat
-from joblib import Memory 
 from pdb import set_trace as st
 
 APIInput = str | list[Any] | dict[str, Any]
 
-memory = Memory('cachedir', verbose=0)
 
-@memory.cache
 def call_llm(
     lm_config: lm_config.LMConfig,
     prompt: APIInput,
+) -> str:
+    gen_config = lm_config.gen_config
+    stop = gen_config.get("stop_sequences") or gen_config.get("stop_token")
+    temperature = gen_config.get("temperature")
+    max_tokens = gen_config.get("max_tokens") or gen_config.get(
+        "max_new_tokens"
+    )
+    if is_mock_model(lm_config.model):
+        # offline runs: scripted or replayed responses, never cached
+        return generate_from_mock(
+            prompt, lm_config.model, temperature, max_tokens, stop
+        )
+    # paced per model and retried with backoff, per endpoint circuit breaker
+    endpoint = gen_config.get("model_endpoint") or lm_config.provider
+    response = llm_cache.cached_call(
+        lambda: call_with_retry(
+            lambda: _call_llm(lm_config, prompt),
+            model=lm_config.model,
+            endpoint=endpoint,
+        ),
+        model=f"{lm_config.provider}/{lm_config.model}/{lm_config.mode}",
+        prompt=prompt,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stop=stop,
+    )
+    if RECORD_PATH:
+        record_trace(
+            prompt,
+            lm_config.model,
+            temperature,
+            max_tokens,
+            stop,
+            response,
+        )
+    return response
+
+
+def _call_llm(
+    lm_config: lm_config.LMConfig,
+    prompt: APIInput,
 ) -> str:
     response: str
     if lm_config.provider == "openai":
@@ -38,6 +38,7 @@ from evaluation_harness import evaluator_router
 from exp_utils.colored_logger import ColoredLogger
 from exp_utils.gen_manuals import format_manual, extract_and_format_mapping
 from exp_utils.task_range import all_task_range
+from llms.rate_limit import load_rate_limits
 from pdb import set_trace as st
 
 
@@ -148,6 +149,12 @@ def config() -> argparse.Namespace:
         type=str,
         default="",
     )
+    parser.add_argument(
+        "--rate_limits",
+        help="yaml file with per model rpm / tpm limits, e.g. `gpt-4o: {rpm: 500, tpm: 30000}`",
+        type=str,
+        default="",
+    )
 
     # logging related
     parser.add_argument("--result_dir", type=str, default="")
@@ -602,6 +609,8 @@ if __name__ == "__main__":
     np.random.seed(1)
     
     args = config()
+    if args.rate_limits:
+        load_rate_limits(args.rate_limits)
     args.sleep_after_execution = 2.0
     args.log_name = f"log"
     
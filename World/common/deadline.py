@@ -0,0 +1,75 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from pdb import set_trace as st
+
+
+class DeadlineExceeded(Exception):
+    """Raised when an llm call runs past its deadline or gets cancelled."""
+
+
+class Deadline(object):
+    """
+    A thread-safe time limit with cancellation, used instead of SIGALRM so that
+    llm calls can be bounded from worker threads and coroutines as well.
+
+    Args:
+        timeout (float): Seconds until the deadline expires. None means no time limit.
+        parent (Deadline): Optional outer deadline, expiring or cancelling it also
+            expires this one.
+    """
+    def __init__(self, timeout=None, parent=None):
+        self.expires_at = None if timeout is None else time.monotonic() + timeout
+        self.parent = parent
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def cancelled(self):
+        if self._cancelled.is_set():
+            return True
+        return self.parent is not None and self.parent.cancelled()
+
+    def remaining(self):
+        """Seconds left before expiring (None if unbounded)."""
+        remaining = None if self.expires_at is None else max(0., self.expires_at - time.monotonic())
+        if self.parent is not None:
+            parent_remaining = self.parent.remaining()
+            if parent_remaining is not None:
+                remaining = parent_remaining if remaining is None else min(remaining, parent_remaining)
+        return remaining
+
+    def expired(self):
+        if self.cancelled():
+            return True
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def check(self):
+        if self.cancelled():
+            raise DeadlineExceeded("LLM call was cancelled")
+        if self.expired():
+            raise DeadlineExceeded("Oops time is up")
+
+
+_current_deadline = contextvars.ContextVar('llm_deadline', default=None)
+
+def current_deadline():
+    """The deadline of the llm call running in this thread / task, if any."""
+    return _current_deadline.get()
+
+def check_deadline():
+    deadline = current_deadline()
+    if deadline is not None:
+        deadline.check()
+
+@contextmanager
+def deadline_scope(timeout=None, parent=None):
+    deadline = Deadline(timeout, parent=parent)
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
@@ -0,0 +1,30 @@
+import contextvars
+from contextlib import contextmanager
+from pdb import set_trace as st
+
+_current_early_stop = contextvars.ContextVar('llm_early_stop', default=None)
+
+
+@contextmanager
+def early_stop_scope(early_stop):
+    """
+    Client-side stop rule for the llm call running in this thread / task.
+    `early_stop(text)` returns the position to cut the generated text at, or
+    None to keep reading. Streaming backends check it after every delta.
+    """
+    token = _current_early_stop.set(early_stop)
+    try:
+        yield early_stop
+    finally:
+        _current_early_stop.reset(token)
+
+
+def early_stop_active():
+    return _current_early_stop.get() is not None
+
+
+def early_stop_position(text):
+    early_stop = _current_early_stop.get()
+    if early_stop is None:
+        return None
+    return early_stop(text)
@@ -0,0 +1,57 @@
+import queue
+import threading
+import cv2
+import imageio
+from pdb import set_trace as st
+
+# frames waiting to be encoded, past that the agent waits for the encoder instead of piling them up
+MAX_PENDING = 16
+
+
+class FrameWriter(object):
+    """
+    Encodes the frames of an episode to a gif / mp4 as they come, from a
+    background thread, so that no frame list is kept in memory.
+    Only every `every`-th frame is kept, resized by `scale`.
+    """
+    def __init__(self, path, fps=0.8, every=1, scale=1.0):
+        self.path = path
+        self.every = max(1, every)
+        self.scale = scale
+        self.received = 0
+        self.written = 0
+        self.error = None
+        self.writer = imageio.get_writer(path, mode='I', fps=fps)
+        self.queue = queue.Queue(maxsize=MAX_PENDING)
+        self.thread = threading.Thread(target=self._run, name='frame-writer', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            frame = self.queue.get()
+            if frame is None:
+                return
+            if self.error is not None:
+                continue
+            try:
+                if self.scale != 1:
+                    frame = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+                self.writer.append_data(frame)
+                self.written += 1
+            except Exception as e:
+                # raised by close, the run itself goes on
+                self.error = e
+
+    def add(self, frame):
+        if self.received % self.every == 0:
+            self.queue.put(frame)
+        self.received += 1
+
+    def close(self):
+        """Encode the pending frames and close the file, returns the number of frames written."""
+        self.queue.put(None)
+        self.thread.join()
+        self.writer.close()
+        if self.error is not None:
+            raise self.error
+        return self.written
@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pdb import set_trace as st
+
+CACHE_PATH = os.environ.get('LLM_CACHE_PATH', 'cachedir/llm_cache.sqlite')
+CACHE_MAX_BYTES = int(float(os.environ.get('LLM_CACHE_MAX_MB', 1024)) * 2**20)
+
+
+def normalize_messages(prompt):
+    """Turn a str prompt or a chat message list into a canonical message list."""
+    if isinstance(prompt, str):
+        return [{'role': 'user', 'content': prompt}]
+    return [{'role': m['role'], 'content': m['content']} for m in prompt]
+
+
+def make_key(model, prompt, temperature, max_tokens, stop):
+    """Content hash of everything that determines a response."""
+    if stop is None:
+        stop = []
+    elif isinstance(stop, str):
+        stop = [stop]
+    request = {'model': model,
+               'messages': normalize_messages(prompt),
+               'temperature': None if temperature is None else round(float(temperature), 6),
+               'max_tokens': max_tokens,
+               'stop': sorted(s for s in stop if s)}
+    request = json.dumps(request, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(request.encode('utf-8')).hexdigest()
+
+
+class LLMCache(object):
+    """
+    Single-file (SQLite) response cache shared by every llm backend.
+    Entries are evicted least-recently-used first once the cache grows past `max_bytes`.
+    """
+    # how often (in writes) to re-check the total size, other processes may share the file
+    check_every = 100
+
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes = 0
+        # statistics of this process
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    @property
+    def conn(self):
+        # open lazily so that importing the module never touches the disk
+        if self._conn is None:
+            folder = os.path.dirname(self.path)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('CREATE TABLE IF NOT EXISTS responses ('
+                               'key TEXT PRIMARY KEY, '
+                               'response TEXT NOT NULL, '
+                               'size INTEGER NOT NULL, '
+                               'last_access REAL NOT NULL)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)')
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key):
+        with self._lock:
+            row = self.conn.execute('SELECT response, size FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute('UPDATE responses SET last_access = ? WHERE key = ?', (time.time(), key))
+            self.conn.commit()
+            self.hits += 1
+            self.bytes_saved += row[1]
+            return row[0]
+
+    def set(self, key, response):
+        size = len(response.encode('utf-8'))
+        with self._lock:
+            self.conn.execute('INSERT OR REPLACE INTO responses (key, response, size, last_access) VALUES (?, ?, ?, ?)',
+                              (key, response, size, time.time()))
+            self.conn.commit()
+            self._writes += 1
+            if (self._writes - 1) % self.check_every == 0:
+                self._evict()
+
+    def _evict(self):
+        total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # drop the least recently used entries until we are at 90% of the cap
+        to_free = total - int(0.9 * self.max_bytes)
+        freed = 0
+        stale = []
+        for key, size in self.conn.execute('SELECT key, size FROM responses ORDER BY last_access'):
+            stale.append((key,))
+            freed += size
+            if freed >= to_free:
+                break
+        self.conn.executemany('DELETE FROM responses WHERE key = ?', stale)
+        self.conn.commit()
+
+    def cached_call(self, func, model, prompt, temperature, max_tokens, stop):
+        """Return the cached response for this request, or call `func()` and store its result."""
+        key = make_key(model, prompt, temperature, max_tokens, stop)
+        response = self.get(key)
+        if response is not None:
+            return response
+        response = func()
+        # do not remember failed / empty generations
+        if response:
+            self.set(key, response)
+        return response
+
+    def stats(self):
+        with self._lock:
+            entries, total = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        requests = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / requests if requests else 0.,
+                'bytes_saved': self.bytes_saved,
+                'entries': entries,
+                'bytes': total}
+
+    def summary(self):
+        stats = self.stats()
+        return (f"LLM cache: {stats['hits']} hits / {stats['misses']} misses "
+                f"(hit rate {stats['hit_rate']:.2%}), {stats['bytes_saved'] / 2**10:.1f} KB saved, "
+                f"{stats['entries']} entries using {stats['bytes'] / 2**20:.1f} MB")
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+llm_cache = LLMCache()
@@ -0,0 +1,164 @@
+import os
+import yaml
+import threading
+from contextlib import contextmanager
+from common.deadline import DeadlineExceeded
+from common.rate_limit import CircuitBreaker, CircuitOpen, is_rate_limited, rate_limiter
+from pdb import set_trace as st
+
+# endpoints used when nothing is configured, each backend can also be set with a
+# comma separated list in the matching environment variable.
+DEFAULT_ENDPOINTS = {'openai': [None], # None -> the openai library default
+                     'ollama': [os.environ.get('OLLAMA_HOST', 'http://localhost:11434')],
+                     'vllm': ['http://localhost:8080/v1']}
+ENDPOINT_ENV_VARS = {'openai': 'OPENAI_API_BASES',
+                     'ollama': 'OLLAMA_HOSTS',
+                     'vllm': 'VLLM_HOSTS'}
+# seconds to wait for each read from a pooled ollama connection (the whole call is bounded by its Deadline)
+OLLAMA_READ_TIMEOUT = 600
+
+
+class Endpoint(object):
+    """One server of a backend, with its reused client, load counters and circuit breaker."""
+    def __init__(self, backend, url):
+        self.backend = backend
+        self.url = url
+        self.in_flight = 0
+        self.requests = 0
+        self.breaker = CircuitBreaker()
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """
+        Persistent client with a keep-alive connection pool (ollama only). The
+        openai and vllm backends talk through the openai library, which keeps its
+        own session per thread, and only need `url` as their api_base.
+        """
+        if self.backend != 'ollama':
+            return None
+        with self._lock:
+            if self._client is None:
+                import ollama
+                self._client = ollama.Client(host=self.url, timeout=OLLAMA_READ_TIMEOUT)
+        return self._client
+
+
+class ClientRegistry(object):
+    """
+    Keeps the endpoints of every backend and hands them out to llm calls, either
+    round robin or to the endpoint with the fewest requests in flight. Endpoints
+    whose circuit is open are skipped until their cooldown is over.
+    """
+    policies = ['least_loaded', 'round_robin']
+
+    def __init__(self, policy='least_loaded'):
+        assert policy in self.policies, f"Unknown balancing policy {policy}, choose from {self.policies}"
+        self.policy = policy
+        self.endpoints = {}
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def configure(self, endpoints=None, policy=None):
+        """
+        Args:
+            endpoints (dict): backend name -> list of urls, replaces the current endpoints of those backends.
+            policy (str): 'least_loaded' or 'round_robin'.
+        """
+        with self._lock:
+            if policy is not None:
+                assert policy in self.policies, f"Unknown balancing policy {policy}, choose from {self.policies}"
+                self.policy = policy
+            for backend, urls in (endpoints or {}).items():
+                if isinstance(urls, str):
+                    urls = [urls]
+                self.endpoints[backend] = [Endpoint(backend, url) for url in urls]
+                self._next[backend] = 0
+
+    def get_endpoints(self, backend):
+        with self._lock:
+            if backend not in self.endpoints:
+                urls = os.environ.get(ENDPOINT_ENV_VARS.get(backend, ''), '')
+                urls = [url.strip() for url in urls.split(',') if url.strip()] or DEFAULT_ENDPOINTS.get(backend, [None])
+                self.endpoints[backend] = [Endpoint(backend, url) for url in urls]
+                self._next[backend] = 0
+            return self.endpoints[backend]
+
+    def _pick(self, backend):
+        endpoints = self.get_endpoints(backend)
+        with self._lock:
+            start = self._next[backend]
+            self._next[backend] = (start + 1) % len(endpoints)
+            # rotate the candidates so that ties are broken round robin
+            candidates = endpoints[start:] + endpoints[:start]
+            healthy = [e for e in candidates if e.breaker.state == 'closed']
+            if healthy:
+                if self.policy == 'least_loaded':
+                    endpoint = min(healthy, key=lambda e: e.in_flight)
+                else:
+                    endpoint = healthy[0]
+            else:
+                # every circuit is open, let a single probe through once a cooldown is over
+                endpoint = next((e for e in candidates if e.breaker.allow()), None)
+                if endpoint is None:
+                    retry_in = min(e.breaker.retry_in() for e in candidates)
+                    raise CircuitOpen(f"All {backend} endpoints are failing, retry in {retry_in:.1f}s", retry_after=retry_in)
+            endpoint.in_flight += 1
+            endpoint.requests += 1
+        return endpoint
+
+    @contextmanager
+    def acquire(self, backend):
+        """Reserve an endpoint of `backend` for the duration of one request."""
+        endpoint = self._pick(backend)
+        try:
+            yield endpoint
+        except DeadlineExceeded:
+            endpoint.breaker.release()
+            raise
+        except Exception as e:
+            # a 429 still means the server is up, the rate limiter deals with it
+            if is_rate_limited(e):
+                endpoint.breaker.success()
+            else:
+                endpoint.breaker.failure()
+            raise
+        else:
+            endpoint.breaker.success()
+        finally:
+            with self._lock:
+                endpoint.in_flight -= 1
+
+    def num_endpoints(self, backend):
+        return len(self.get_endpoints(backend))
+
+    def stats(self):
+        with self._lock:
+            return {backend: {str(e.url): {'in_flight': e.in_flight, 'requests': e.requests, 'state': e.breaker.state}
+                              for e in endpoints}
+                    for backend, endpoints in self.endpoints.items()}
+
+
+registry = ClientRegistry()
+
+
+def load_endpoints(path):
+    """
+    Configure the registry from a yaml file, e.g.
+
+        policy: least_loaded
+        ollama:
+          - http://gpu1:11434
+          - http://gpu2:11434
+        vllm:
+          - http://gpu3:8080/v1
+        rate_limits:
+          gpt-4o-mini: {rpm: 5000, tpm: 2000000}
+    """
+    with open(path, 'r') as file:
+        config = yaml.safe_load(file) or {}
+    policy = config.pop('policy', None)
+    rate_limiter.configure(config.pop('rate_limits', None))
+    registry.configure(config, policy=policy)
+    return registry
@@ -1,10 +1,8 @@
 import tiktoken
 from ollama import chat
-from joblib import Memory
 # from transformers import LlamaTokenizer  # type: ignore
 # from transformers import AutoTokenizer
 from pdb import set_trace as st
-memory = Memory('cachedir', verbose=0)
 
 
 deepseek_map = {"deepseek-r1:7b" : "deepseek-ai/deepseek-llm-7b",
@@ -1,14 +1,25 @@
 import os
-import openai
 # from openai import OpenAI
-from joblib import Memory
+from common.deadline import current_deadline
+from common.usage import record_usage, mark_first_token
+from common.early_stop import early_stop_position
+from common.llm_clients import registry
 from pdb import set_trace as st
 
 # openai.api_key = os.environ["OPENAI_API_KEY"]
-memory = Memory('cachedir', verbose=0)
 
-# cache the result to avoid sending duplicate requests.
-# @memory.cache
+_openai = None
+
+def get_openai():
+    # the sdk is slow to import and only needed by the openai / vllm backends,
+    # so it is imported (and the key read) on the first call
+    global _openai
+    if _openai is None:
+        import openai
+        openai.api_key = os.environ.get("OPENAI_API_KEY")
+        _openai = openai
+    return _openai
+
 # def openai_llm(prompt, 
 #                model_name, 
 #                instruction,
@@ -28,11 +39,22 @@ memory = Memory('cachedir', verbose=0)
 
 #     return response.output_text
 
-@memory.cache
+# responses are cached by common.llm_cache in llms.llm, not here.
 def openai_llm(prompt, 
                model_name, 
-               temperature=0.08, max_tokens=128, stop=None):
+               temperature=0.08, max_tokens=128, stop=None, stream=True):
     # time.sleep(0.001 * token_num(prompt)) #let the program sleep a bit due to the potential rate limit.
+    deadline = current_deadline()
+    with registry.acquire('openai') as endpoint:
+        return _openai_llm(prompt, model_name, temperature, max_tokens, stop, stream,
+                           deadline=deadline,
+                           api_base=endpoint.url)
+
+def _openai_llm(prompt, model_name, temperature, max_tokens, stop, stream, deadline, api_base):
+    openai = get_openai()
+    request_timeout = deadline.remaining() if deadline else None
+    # None keeps the library default (openai.api_base)
+    endpoint = {'api_base': api_base} if api_base else {}
 
     if model_name in ['o3-mini', 'o1']:
         messages = [{'role': 'user', 'content': prompt}] if isinstance(prompt, str) else prompt
@@ -41,8 +63,24 @@ def openai_llm(prompt,
             messages = messages,
             max_completion_tokens=20000, 
             stop=stop,
+            request_timeout=request_timeout,
+            **endpoint,
         )
         response_content = response["choices"][0]['message']['content']
+        record_openai_usage(response)
+    elif stream:
+        messages = [{'role': 'user', 'content': prompt}] if isinstance(prompt, str) else prompt
+        response = openai.ChatCompletion.create(
+            model=model_name,
+            messages = messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stop=stop,
+            request_timeout=request_timeout,
+            stream=True,
+            **endpoint,
+        )
+        response_content = openai_stream(response, stop, deadline)
     else:
         messages = [{'role': 'user', 'content': prompt}] if isinstance(prompt, str) else prompt
         response = openai.ChatCompletion.create(
@@ -51,6 +89,44 @@ def openai_llm(prompt,
             temperature=temperature,
             max_tokens=max_tokens,
             stop=stop,
+            request_timeout=request_timeout,
+            **endpoint,
         )
         response_content = response["choices"][0]['message']['content']
+        record_openai_usage(response)
     return response_content
+
+
+def openai_stream(response, stop=None, deadline=None):
+    # read the streamed deltas, and stop reading as soon as a stop string shows up
+    message = ''
+    num_chunks = 0
+    for chunk in response:
+        if deadline:
+            deadline.check()
+        delta = chunk["choices"][0].get("delta", {}).get("content")
+        if not delta:
+            continue
+        if not message:
+            mark_first_token()
+        num_chunks += 1
+        message += delta
+        if stop:
+            stop_pos = min([pos for pos in (message.find(token) for token in stop) if pos != -1], default=-1)
+            if stop_pos != -1:
+                message = message[:stop_pos]
+                break
+        stop_pos = early_stop_position(message)
+        if stop_pos is not None:
+            message = message[:stop_pos]
+            break
+    # the legacy streaming api does not report usage, each delta is about one token
+    record_usage(completion_tokens=num_chunks)
+    return message
+
+
+def record_openai_usage(response):
+    usage = response.get("usage")
+    if usage:
+        record_usage(prompt_tokens=usage.get("prompt_tokens"),
+                     completion_tokens=usage.get("completion_tokens"))
@@ -0,0 +1,102 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from common.llm_cache import make_key
+from pdb import set_trace as st
+
+# synthetic latency (seconds) added to every mock / replay response
+MOCK_LATENCY = float(os.environ.get('LLM_MOCK_LATENCY', 0))
+# when set, every real llm response is appended to this jsonl trace
+RECORD_PATH = os.environ.get('LLM_RECORD_PATH')
+# trace served by the `replay` model (`replay:<path>` overrides it)
+REPLAY_PATH = os.environ.get('LLM_REPLAY_PATH')
+
+_policy = None
+_replayers = {}
+_lock = threading.Lock()
+
+
+def is_mock_model(model_name):
+    return model_name == 'mock' or model_name.startswith('replay')
+
+
+def set_mock_policy(policy):
+    """
+    Script the `mock` model: `policy(prompt)` returns the response. Without a
+    policy the mock model answers 'finish', which ends an episode right away.
+    """
+    global _policy
+    _policy = policy
+
+
+def trace_key(prompt, temperature, max_tokens, stop):
+    # the model is left out so that a trace recorded with any model can be replayed
+    return make_key(None, prompt, temperature, max_tokens, stop)
+
+
+def record_trace(prompt, model_name, temperature, max_tokens, stop, response, path=None):
+    path = path or RECORD_PATH
+    if not path:
+        return
+    record = {'key': trace_key(prompt, temperature, max_tokens, stop),
+              'model': model_name,
+              'prompt': prompt,
+              'response': response}
+    with _lock:
+        with open(path, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+
+class TraceReplayer(object):
+    """
+    Serves the responses of a recorded trace. A request is matched on its key
+    first, unmatched requests get the next response of the trace in recorded order.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.responses = []
+        self.by_key = {}
+        with open(path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self.by_key.setdefault(record['key'], deque()).append(len(self.responses))
+                    self.responses.append(record['response'])
+        self.used = [False] * len(self.responses)
+        self.cursor = 0
+        self._lock = threading.Lock()
+
+    def respond(self, key):
+        with self._lock:
+            indices = self.by_key.get(key)
+            if indices:
+                idx = indices.popleft() if len(indices) > 1 else indices[0]
+            else:
+                while self.cursor < len(self.responses) and self.used[self.cursor]:
+                    self.cursor += 1
+                if self.cursor >= len(self.responses):
+                    return ''
+                idx = self.cursor
+            self.used[idx] = True
+            return self.responses[idx]
+
+
+def get_replayer(model_name):
+    path = model_name.split(':', 1)[1] if ':' in model_name else REPLAY_PATH
+    assert path, "Set LLM_REPLAY_PATH or use the model name replay:<trace.jsonl> to replay a trace."
+    with _lock:
+        if path not in _replayers:
+            _replayers[path] = TraceReplayer(path)
+        return _replayers[path]
+
+
+def mock_llm(prompt, model_name, temperature=0.08, max_tokens=128, stop=None):
+    if MOCK_LATENCY:
+        time.sleep(MOCK_LATENCY)
+    if model_name.startswith('replay'):
+        return get_replayer(model_name).respond(trace_key(prompt, temperature, max_tokens, stop))
+    if _policy is not None:
+        return _policy(prompt)
+    return 'finish'
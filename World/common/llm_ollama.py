@@ -1,18 +1,20 @@
 import re
-import tiktoken
-import ollama
-from joblib import Memory
+from common.deadline import current_deadline
+from common.llm_clients import registry
+from common.usage import record_usage, mark_first_token
+from common.early_stop import early_stop_position, early_stop_active
 # from transformers import LlamaTokenizer  # type: ignore
 # from transformers import AutoTokenizer
 from pdb import set_trace as st
-memory = Memory('cachedir', verbose=0)
 import time
 
 def remove_think(content):
     return content.split('</think>')[-1]
 
 def ollama_llm(prompt, model_name, temperature=0.08, max_tokens=128, stop=None):
-    if 'qwen3' in model_name.lower():
+    # a client-side stop rule (pipelined think steps) has to read past '\nObservation'
+    pipelined = early_stop_active()
+    if 'qwen3' in model_name.lower() and not pipelined:
         stop = ['\nObservation']
     # Prepare messages
     if isinstance(prompt, str):
@@ -34,34 +36,51 @@ def ollama_llm(prompt, model_name, temperature=0.08, max_tokens=128, stop=None):
         raise ValueError("Prompt must be a string or a list of messages.")
     
     start_time = time.time()
-    response = ollama.chat(
-        model=model_name,
-        messages=messages,
-        options={
-            'num_predict': max_tokens,
-            'temperature': temperature,
-            'num_ctx': 32768
-        },
-        stream=True
-    )
+    deadline = current_deadline()
+    # reuse the pooled client of the least loaded ollama server, the client timeout
+    # bounds each read of the stream and the deadline bounds the whole call
+    with registry.acquire('ollama') as endpoint:
+        response = endpoint.client.chat(
+            model=model_name,
+            messages=messages,
+            options={
+                'num_predict': max_tokens,
+                'temperature': temperature,
+                'num_ctx': 32768
+            },
+            stream=True
+        )
 
-    # Deal with streamed output in case it can be truncated early
-    message = ''
-    num_chunks = 0
-    for i, chunk in enumerate(response):
-        if chunk:
-            num_chunks += 1
-            message += chunk['message']['content']
-            if stop:
-                stop_pos = len(message)
-                for token in stop:
-                    pos = message.find(token)
-                    if pos != -1:
-                        stop_pos = min(stop_pos, pos)
-                if stop_pos < len(message):
-                    print(f'Truncating for stop tokens: {message[stop_pos:]}')
+        # Deal with streamed output in case it can be truncated early
+        message = ''
+        num_chunks = 0
+        for i, chunk in enumerate(response):
+            if deadline:
+                deadline.check()
+            if chunk:
+                if not num_chunks:
+                    mark_first_token()
+                num_chunks += 1
+                message += chunk['message']['content']
+                if chunk.get('done'):
+                    record_usage(prompt_tokens=chunk.get('prompt_eval_count'))
+                if stop:
+                    stop_pos = len(message)
+                    for token in stop:
+                        pos = message.find(token)
+                        if pos != -1:
+                            stop_pos = min(stop_pos, pos)
+                    if stop_pos < len(message):
+                        print(f'Truncating for stop tokens: {message[stop_pos:]}')
+                        message = message[:stop_pos]
+                        break
+                stop_pos = early_stop_position(message)
+                if stop_pos is not None:
                     message = message[:stop_pos]
                     break
+        # hand the connection back to the pool even when we stopped reading early
+        if hasattr(response, 'close'):
+            response.close()
 
     end_time = time.time()
     elapsed_time = end_time - start_time
@@ -69,8 +88,10 @@ def ollama_llm(prompt, model_name, temperature=0.08, max_tokens=128, stop=None):
     print(f'Total time for decoding = {elapsed_time:.3f}')
     print(f'Number of tokens decoded = {num_chunks}')
     print(f'Tokens per second = {num_chunks/elapsed_time:.3f}')
+    record_usage(completion_tokens=num_chunks)
 
-    if 'qwen3' in model_name.lower(): message = message.replace('Action: ', '')
+    # keep the 'Action: ' of the think suffix a pipelined step is looking for
+    if 'qwen3' in model_name.lower() and not pipelined: message = message.replace('Action: ', '')
     print('Ran prompt', flush=True)
 
     if message is None or message == '':
@@ -1,31 +1,37 @@
-import tiktoken
-# from openai import OpenAI
-from joblib import Memory
+from common.deadline import current_deadline
+from common.llm_gpt import get_openai
+from common.llm_clients import registry
 # from transformers import LlamaTokenizer  # type: ignore
 # from transformers import AutoTokenizer
 from pdb import set_trace as st
-memory = Memory('cachedir', verbose=0)
 
-# client = OpenAI(
-#     base_url="http://localhost:8080/v1",
-#     api_key="EMPTY",
-# )
 
 def remove_think(content):
     return content.split('</think>')[-1]
 
 def vllm_llm(prompt, model_name, temperature=0.08, max_tokens=128, stop=None):
-    prompt = '/nothink ' + prompt # Do this unless you want a reasoning model
-    messages = [{'role': 'user', 'content': prompt}] if isinstance(prompt, str) else prompt
+    # Do this unless you want a reasoning model
+    if isinstance(prompt, str):
+        messages = [{'role': 'user', 'content': '/nothink ' + prompt}]
+    else:
+        messages = prompt
 
-    completion = client.chat.completions.create(
-        model=model_name,
-        messages=messages,
-        temperature=temperature
-    )
-    message = completion.choices[0].message.content
+    deadline = current_deadline()
+    # vllm serves an openai compatible api, send the request to one of the configured servers
+    with registry.acquire('vllm') as endpoint:
+        completion = get_openai().ChatCompletion.create(
+            model=model_name,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stop=stop,
+            api_base=endpoint.url,
+            api_key='EMPTY',
+            request_timeout=deadline.remaining() if deadline else None,
+        )
+    message = completion["choices"][0]["message"]["content"]
 
     if 'Qwen3' in model_name:
         message = remove_think(message)
 
-    return message
\ No newline at end of file
+    return message
@@ -1,35 +1,85 @@
-import os
 import time
-import openai
-import signal
-import tiktoken
-from joblib import Memory
-from common.utils import error_handle
+import asyncio
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from common.deadline import Deadline, DeadlineExceeded, deadline_scope
+from common.llm_cache import llm_cache
+from common.usage import usage_scope, record_usage
+from common.early_stop import early_stop_scope
+from common.llm_clients import registry
+from common.rate_limit import rate_limiter, backoff_delay, retry_after, is_rate_limited, sleep
+from common.llm_mock import mock_llm, is_mock_model, record_trace, RECORD_PATH
 from .llm_gpt import openai_llm
 # from .llm_deepseek import deepseek_llm
 from .llm_ollama import ollama_llm
-#from .llm_vllm import vllm_llm
+from .llm_vllm import vllm_llm
 from pdb import set_trace as st
 
-openai.api_key = os.environ["OPENAI_API_KEY"]
-memory = Memory('cachedir', verbose=0)
+_encoder = None
+
+def get_encoder():
+    # loading the bpe ranks is expensive, so build the encoder once per process.
+    global _encoder
+    if _encoder is None:
+        import tiktoken
+        _encoder = tiktoken.get_encoding("cl100k_base")
+    return _encoder
+
+def message_token_num(messages):
+    # chat format overhead as in the openai cookbook: 3 tokens per message, 1 per name, 3 to prime the reply.
+    encoder = get_encoder()
+    token_num = 3
+    for message in messages:
+        token_num += 3
+        for key, value in message.items():
+            token_num += len(encoder.encode(value))
+            if key == 'name':
+                token_num += 1
+    return token_num
 
 def token_num(prompt):
     # return the number of token in a prompt.
-    encoder = tiktoken.get_encoding("cl100k_base")
     if isinstance(prompt, str):
-        token_num = len(encoder.encode(prompt))
+        return len(get_encoder().encode(prompt))
     elif isinstance(prompt, list):
-        token_num = 0
-        for message in prompt:
-            token_num += len(message['role'])
-            token_num += len(message['content'])
-    return token_num
+        return message_token_num(prompt)
+    raise ValueError("Prompt must be a string or a list of messages.")
 
 def truncate(prompt, max_token):
-    encoder = tiktoken.get_encoding("cl100k_base")
+    encoder = get_encoder()
     return encoder.decode(encoder.encode(prompt)[:max_token])
 
+
+class TokenCounter(object):
+    """
+    Running token count of a prompt that grows at its end (e.g. the trajectory).
+    Only the newly appended text is encoded, so the cost per step does not grow
+    with the history. Tokens merging across the boundary make the count an
+    estimate within one token per extension; any other change to the prompt
+    falls back to a full count.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self, text=''):
+        self.text = text
+        self.count = len(get_encoder().encode(text)) if text else 0
+        return self.count
+
+    def extend(self, text):
+        self.text += text
+        self.count += len(get_encoder().encode(text))
+        return self.count
+
+    def update(self, prompt):
+        """Count `prompt`, reusing the previous count when it only appends to the last prompt."""
+        if self.text and prompt.startswith(self.text):
+            self.count += len(get_encoder().encode(prompt[len(self.text):]))
+            self.text = prompt
+            return self.count
+        return self.reset(prompt)
+
 def print_info(logger, msg):
     if logger:
         logger.log(msg, option='print')
@@ -51,6 +101,43 @@ TOKEN_LIMITS = {'gpt-4-turbo-2024-04-09': 128000,
 ollama_models = ['qwen3:32b', 'llama3:70b', 'qwen3:235b', 'llama3.3:70b', 'qwen3:14b', 'gemma3:12b']
 vllm_models = ['Qwen/Qwen3-32B']
 
+# seconds allowed for a single llm attempt before it is abandoned and retried.
+LLM_TIMEOUT = 5000
+
+# max number of in-flight requests per backend server when dispatching prompts in batch.
+BACKEND_WORKERS = {'openai': 8,
+                   'ollama': 4,
+                   'vllm': 16,
+                   'mock': 32}
+_executors = {}
+_executors_lock = threading.Lock()
+
+def get_backend(model_name):
+    if is_mock_model(model_name):
+        return 'mock'
+    elif model_name in vllm_models:
+        return 'vllm'
+    elif model_name in ollama_models:
+        return 'ollama'
+    return 'openai'
+
+def streams_output(model_name):
+    # backends that read the generation as a stream, where an early_stop rule also ends it early
+    backend = get_backend(model_name)
+    if backend == 'ollama':
+        return True
+    return backend == 'openai' and model_name not in ['o3-mini', 'o1']
+
+def get_executor(backend):
+    # one bounded worker pool per backend, shared by every caller in the process,
+    # sized to keep all the configured servers of the backend busy.
+    with _executors_lock:
+        if backend not in _executors:
+            max_workers = BACKEND_WORKERS[backend] * registry.num_endpoints(backend)
+            _executors[backend] = ThreadPoolExecutor(max_workers=max_workers,
+                                                     thread_name_prefix=f'llm-{backend}')
+        return _executors[backend]
+
 def llm(prompt, 
         model_name, 
         temperature=0.08, 
@@ -59,8 +146,22 @@ def llm(prompt,
         logger=None,
         max_trial=10,
         reset_context=False,
+        timeout=LLM_TIMEOUT,
+        deadline=None,
+        cache=True,
+        prompt_tokens=None,
+        early_stop=None,
         ):
     """
+    `timeout` bounds every single attempt, `deadline` is an optional outer
+    Deadline that bounds (or cancels) the whole call including retries.
+    With `cache`, responses are served from / stored in the shared llm_cache.
+    The usage record of the call (tokens, latency, ttft) is sent to `logger.log_usage`,
+    `prompt_tokens` can pass an already known prompt size to avoid re-encoding it.
+    Failed attempts are retried after the server's Retry-After or a jittered
+    exponential backoff, requests are paced by the model's common.rate_limit bucket.
+    `early_stop(text)` is an optional client-side stop rule (see common.early_stop).
+
     token_size = token_num(prompt)
     try:
         token_limit = int(0.9 * TOKEN_LIMITS[model_name]) 
@@ -77,28 +178,138 @@ def llm(prompt,
     # set a time limit to retry, please use it wisely.
     budget = max_trial
     response_content = ''
+    backend = get_backend(model_name)
+    if backend == 'mock':
+        # mock / replay responses are free, caching them would only mix them up with real ones
+        cache = False
     while budget > 0:
+        if deadline is not None and deadline.expired():
+            print_info(logger, f"\033[31mError\033[0m:LLM call cancelled or out of time, giving up.")
+            break
         try:
-            signal.signal(signal.SIGALRM, error_handle) 
-            signal.alarm(5000) # wait for at most 300s for one openai call (maybe it's too long, can change it per your choice)
-            if model_name in vllm_models:
-                response_content = vllm_llm(prompt, model_name, temperature, max_tokens, stop)
-            elif model_name in ollama_models:
-                response_content = ollama_llm(prompt, model_name, temperature, max_tokens, stop)
-            else:
-                response_content = openai_llm(prompt,
-                                              model_name, 
-                                            #   instruction='You are an intelligent assistant helping to complete a multi-step task.',
-                                              temperature=temperature, 
-                                              max_tokens=max_tokens, 
-                                              stop=stop)
+            # thread-safe time limit for one attempt, the backends poll it while waiting.
+            with deadline_scope(timeout, parent=deadline), usage_scope(model_name) as usage:
+                call = functools.partial(_call_backend, backend, prompt, model_name, temperature, max_tokens, stop, early_stop)
+                if cache:
+                    # _call_backend flips this back on a cache miss
+                    usage['cached'] = True
+                    response_content = llm_cache.cached_call(call, model_name, prompt, temperature, max_tokens, stop)
+                else:
+                    response_content = call()
+            if not usage['cached']:
+                # fill in what the backend could not report
+                if usage['prompt_tokens'] is None:
+                    usage['prompt_tokens'] = prompt_tokens if prompt_tokens is not None else token_num(prompt)
+                if usage['completion_tokens'] is None:
+                    usage['completion_tokens'] = token_num(response_content or '')
+            if logger:
+                logger.log_usage(usage)
+            if RECORD_PATH and backend != 'mock':
+                record_trace(prompt, model_name, temperature, max_tokens, stop, response_content)
             budget = 0
         except Exception as e:
-            print_info(logger, f"\033[31mError\033[0m:{e}. LLM not responding, redoing the task now...")
             budget -= 1
+            delay = retry_after(e)
+            if is_rate_limited(e):
+                rate_limiter.report_rate_limit(model_name, delay)
+            if delay is None:
+                delay = backoff_delay(max_trial - budget - 1)
+            print_info(logger, f"\033[31mError\033[0m:{e}. LLM not responding, redoing the task in {delay:.1f}s...")
+            if budget > 0:
+                try:
+                    sleep(delay, deadline)
+                except DeadlineExceeded:
+                    pass
 
     return response_content
 
+def _call_backend(backend, prompt, model_name, temperature, max_tokens, stop, early_stop=None):
+    with early_stop_scope(early_stop):
+        response = _request_backend(backend, prompt, model_name, temperature, max_tokens, stop)
+    if early_stop is not None:
+        # non-streaming backends return the whole generation, cut it here
+        stop_pos = early_stop(response or '')
+        if stop_pos is not None:
+            response = response[:stop_pos]
+    return response
+
+def _request_backend(backend, prompt, model_name, temperature, max_tokens, stop):
+    record_usage(cached=False)
+    if backend == 'mock':
+        return mock_llm(prompt, model_name, temperature, max_tokens, stop)
+    # wait for the model's request (and token) budget, only real requests are paced
+    tokens = token_num(prompt) + max_tokens if rate_limiter.limits_tokens(model_name) else 0
+    rate_limiter.acquire(model_name, tokens)
+    if backend == 'vllm':
+        response = vllm_llm(prompt, model_name, temperature, max_tokens, stop)
+    elif backend == 'ollama':
+        response = ollama_llm(prompt, model_name, temperature, max_tokens, stop)
+    else:
+        response = openai_llm(prompt,
+                              model_name, 
+                            #   instruction='You are an intelligent assistant helping to complete a multi-step task.',
+                              temperature=temperature, 
+                              max_tokens=max_tokens, 
+                              stop=stop)
+    rate_limiter.report_success(model_name)
+    return response
+
+def llm_batch(prompts,
+              model_name,
+              temperature=0.08,
+              max_tokens=128,
+              stop=None,
+              logger=None,
+              max_trial=10,
+              reset_context=False,
+              timeout=LLM_TIMEOUT,
+              deadline=None,
+              cache=True,
+              prompt_tokens=None,
+              early_stop=None,
+              ):
+    """
+    Send many prompts at once. They are fanned out over the worker pool of the
+    model's backend, each one keeps its own retry budget of `max_trial`, and the
+    responses come back in the order of `prompts`.
+    `prompt_tokens` is an optional list with the known size of each prompt,
+    `early_stop` is applied to every response (see llm).
+    """
+    if prompt_tokens is None:
+        prompt_tokens = [None] * len(prompts)
+    executor = get_executor(get_backend(model_name))
+    futures = [executor.submit(llm,
+                               prompt,
+                               model_name,
+                               temperature=temperature,
+                               max_tokens=max_tokens,
+                               stop=stop,
+                               logger=logger,
+                               max_trial=max_trial,
+                               reset_context=reset_context,
+                               timeout=timeout,
+                               deadline=deadline,
+                               cache=cache,
+                               prompt_tokens=tokens,
+                               early_stop=early_stop)
+               for prompt, tokens in zip(prompts, prompt_tokens)]
+    return [future.result() for future in futures]
+
+async def allm(prompt, model_name, deadline=None, **kwargs):
+    # awaitable version of llm(), runs on the backend worker pool.
+    # cancelling the awaiting task also cancels the request running in the pool.
+    loop = asyncio.get_running_loop()
+    executor = get_executor(get_backend(model_name))
+    deadline = Deadline(parent=deadline)
+    try:
+        return await loop.run_in_executor(executor, functools.partial(llm, prompt, model_name, deadline=deadline, **kwargs))
+    except asyncio.CancelledError:
+        deadline.cancel()
+        raise
+
+async def allm_batch(prompts, model_name, **kwargs):
+    return await asyncio.gather(*[allm(prompt, model_name, **kwargs) for prompt in prompts])
+
 def print_prompt(prompt):
     if isinstance(prompt, str):
         print(f"\033[34mPrompt\033[0m:prompt")
@@ -1,9 +1,19 @@
 import os
-import sys
-import imageio
+import time
+import queue
+import atexit
+import threading
 import numpy as np
+from common.usage import summarize_usage
+from common.frame_writer import FrameWriter
+from common.traj_store import TrajectoryStore
 from pdb import set_trace as st
 
+# seconds between flushes of the log file, it is also flushed on Logger.flush() and at exit
+FLUSH_INTERVAL = float(os.environ.get('LOG_FLUSH_INTERVAL', 1))
+# frames per second of the episode visualizations
+VISUALIZATION_FPS = 0.8
+
 COLOR_CODES = {
     "black": "\033[30m",
     "red": "\033[31m",
@@ -18,6 +28,73 @@ COLOR_CODES = {
 }
 
 
+# queue markers of LogSink
+_FLUSH = object()
+_CLOSE = object()
+
+
+class LogSink(object):
+    """
+    Appends text to one file handle from a background thread, so that logging
+    never waits on the disk. Writes are buffered and flushed every
+    `flush_interval` seconds, on flush() and when the process exits.
+    """
+    def __init__(self, path, mode='a', flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.file = open(path, mode)
+        self.queue = queue.Queue()
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name='log-sink', daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        last_flush = time.time()
+        while True:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self.file.flush()
+                last_flush = time.time()
+                continue
+            try:
+                if item is _CLOSE:
+                    self.file.flush()
+                    return
+                if item is _FLUSH or time.time() - last_flush >= self.flush_interval:
+                    if item is not _FLUSH:
+                        self.file.write(item)
+                    self.file.flush()
+                    last_flush = time.time()
+                else:
+                    self.file.write(item)
+            finally:
+                self.queue.task_done()
+
+    def write(self, text):
+        if self.closed:
+            # logged after close (e.g. from another exit handler), write it directly
+            with open(self.path, 'a') as f:
+                f.write(text)
+            return
+        self.queue.put(text)
+
+    def flush(self):
+        """Block until everything written so far is on disk."""
+        if not self.closed:
+            self.queue.put(_FLUSH)
+            self.queue.join()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(_CLOSE)
+        self.thread.join()
+        self.file.close()
+
+
 class Logger(object):
     def __init__(self, args, log_folder="./logs"):
         # make log folder
@@ -34,13 +111,31 @@ class Logger(object):
         if not os.path.exists(self.gif_folder):
             os.makedirs(self.gif_folder)
         print(f'\033[34mSaving experiment logs to\033[0m:{self.log_file}')
-        open(self.log_file, 'w')
+        # one handle for the whole run, a resumed run keeps the log of the tasks it restores
+        self.sink = LogSink(self.log_file, 'a' if getattr(args, 'resume', False) else 'w')
 
         # experiment data
         self.steps_all = [] # all experiment steps
         self.steps_success = [] # steps for successful experiments
         self.manual_steps = []  # manual steps
-        self.frames = []    # frames for gif
+        self.usage = []     # one usage record per llm call
+        # episode visualization (gif, mp4 or none), frames are streamed to the encoder as they come
+        self.visualization = getattr(args, 'visualization', 'gif')
+        self.visualize = self.visualization != 'none'
+        self.frame_every = getattr(args, 'frame_every', 1)
+        self.frame_scale = getattr(args, 'frame_scale', 1.0)
+        self.frame_writer = None
+        # written under a temporary name, the result of the task is only known at the end
+        self.frame_path = f"{self.gif_folder}/.episode_{os.getpid()}.{self.visualization}"
+        # one record per env step (see common.traj_store), queried with common.traj_store.load_steps
+        self.run_name = args.log_name
+        self.steps = TrajectoryStore(f"{self.log_folder}/steps")
+        if not getattr(args, 'resume', False):
+            self.steps.clear()
+        self.episode = {'task': None, 'trial': None}
+        self.usage_mark = 0
+        # wandb run of the metrics, None logs to the run of wandb.init (sweeps keep one run per config)
+        self.wandb_run = None
         # self.gif_path = os.path.join(gif_folder, f"{args.log_name}.gif")
         # self.gif_path = gif_folder
 
@@ -52,12 +147,45 @@ class Logger(object):
 
     def log(self, *args, option="print"):
         text = ' '.join([str(arg) for arg in args])
-        default_stdout = sys.stdout  # assign console output to a variable
         self._print(text, option=option)
-        f = open(self.log_file, 'a')
-        sys.stdout = f
-        self._print(text, option=option)
-        sys.stdout = default_stdout  # set stdout back to console output
+        # same text as printed to the console (colors included), written in the background
+        self.sink.write(text + '\n')
+
+    def write(self, text):
+        """Append already formatted text to the log file only (e.g. the log of a worker process)"""
+        self.sink.write(text)
+
+    def flush(self):
+        """Wait until everything logged so far is in the log file (and the step records on disk)"""
+        self.sink.flush()
+        self.steps.flush()
+
+    def start_episode(self, task_name, trial):
+        """Set the task and trial of the next step records"""
+        self.episode = {'task': str(task_name), 'trial': trial}
+        self.usage_mark = len(self.usage)
+
+    def log_step(self, step, action, observation, reward, subgoal=None):
+        """Record one env step, with the llm usage since the previous step (or the episode start)"""
+        usage = summarize_usage(self.usage[self.usage_mark:])
+        self.usage_mark = len(self.usage)
+        self.steps.append({'run': self.run_name,
+                           'env': self.args.env,
+                           'model': self.args.agent_model,
+                           'task': self.episode['task'],
+                           'trial': self.episode['trial'],
+                           'step': step,
+                           'action': str(action),
+                           'observation': str(observation),
+                           'reward': float(reward),
+                           'subgoal': subgoal,
+                           'llm_calls': usage['calls'],
+                           'latency': usage['total_latency'],
+                           'prompt_tokens': usage['prompt_tokens'],
+                           'completion_tokens': usage['completion_tokens']})
+
+    def close(self):
+        self.sink.close()
 
     def log_experiment(self, steps, success):
         """Log experiment steps and success"""
@@ -65,12 +193,38 @@ class Logger(object):
         if success:
             self.steps_success.append(steps)
 
+    def log_usage(self, record):
+        """Store the usage record (tokens, latency, ttft) of one llm call"""
+        self.usage.append(dict(record))
+
+    def log_usage_summary(self, prefix, start=0):
+        """Log aggregated usage of the llm calls recorded since index `start`"""
+        usage = summarize_usage(self.usage[start:])
+        ttft = f"{usage['mean_ttft']:.3f}s" if usage['mean_ttft'] is not None else 'n/a'
+        self.colored_log(prefix,
+                         f"{usage['calls']} llm calls ({usage['cached_calls']} cached), "
+                         f"{usage['prompt_tokens']} prompt tokens, {usage['completion_tokens']} completion tokens, "
+                         f"{usage['total_latency']:.1f}s total latency, mean ttft {ttft}",
+                         color="magenta")
+        return usage
+
     def log_frame(self, frame):
-        """Store a frame for gif generation"""
-        self.frames.append(frame)
+        """Send a frame to the visualization of the current task, encoded in the background"""
+        if not self.visualize:
+            return
+        if self.frame_writer is None:
+            self.frame_writer = FrameWriter(self.frame_path,
+                                            fps=VISUALIZATION_FPS,
+                                            every=self.frame_every,
+                                            scale=self.frame_scale)
+        self.frame_writer.add(frame)
 
     def clear_frame(self):
-        self.frames = []
+        """Drop the visualization of the current task"""
+        if self.frame_writer is not None:
+            self.frame_writer.close()
+            self.frame_writer = None
+            os.remove(self.frame_path)
 
     def save_summary(self):
         """Save summary statistics"""
@@ -80,14 +234,18 @@ class Logger(object):
         summary_text = (f"Average Steps (All): {avg_steps_all:.2f}\n"
                         f"Average Steps (Successful): {avg_steps_success:.2f}\n")
         self.log(summary_text)
+        self.log_usage_summary("LLM Usage (All):")
 
     def save_gif(self, task_name, reward):
-        """Saves the collected frames as a gif"""
-        if self.frames:
+        """Finishes the visualization (gif or mp4) of the task"""
+        if not self.visualize:
+            return
+        if self.frame_writer is not None:
+            self.frame_writer.close()
+            self.frame_writer = None
             success = 'success' if reward == 1 else 'failure'
-            imageio.mimsave(f"{self.gif_folder}/{task_name}_{success}.gif", self.frames, fps=0.8)
-            self.clear_frame()
-            self.log(f"Saved visualization GIF at {self.gif_folder}")
+            os.replace(self.frame_path, f"{self.gif_folder}/{task_name}_{success}.{self.visualization}")
+            self.log(f"Saved visualization {self.visualization.upper()} at {self.gif_folder}")
         else:
             self.log("No frames recorded, skipping GIF generation.")
             
@@ -0,0 +1,255 @@
+import time
+import random
+import threading
+import email.utils
+from collections import deque
+from common.deadline import current_deadline
+from pdb import set_trace as st
+
+# multiplicative decrease of a model's request rate on a 429, additive increase (rpm) per success
+RATE_DECREASE = 0.7
+RATE_INCREASE = 0.5
+MIN_RPM = 1.
+# consecutive failures that open the circuit of an endpoint, and seconds until it is probed again
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30.
+
+
+class CircuitOpen(Exception):
+    """Raised when every endpoint of a backend is failing, retry after `retry_after` seconds."""
+    def __init__(self, msg, retry_after=None):
+        super(CircuitOpen, self).__init__(msg)
+        self.retry_after = retry_after
+
+
+def sleep(seconds, deadline=None):
+    # sleep that wakes up early when the llm call expires or gets cancelled
+    deadline = deadline or current_deadline()
+    if deadline is not None:
+        remaining = deadline.remaining()
+        if remaining is not None:
+            seconds = min(seconds, remaining)
+        end = time.monotonic() + seconds
+        while not deadline.expired() and time.monotonic() < end:
+            time.sleep(min(0.5, end - time.monotonic()))
+        deadline.check()
+    elif seconds > 0:
+        time.sleep(seconds)
+
+
+def backoff_delay(attempt, base=1., cap=60.):
+    # exponential backoff with full jitter, so that concurrent workers do not retry in lockstep
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def is_rate_limited(e):
+    return (type(e).__name__ == 'RateLimitError'
+            or getattr(e, 'http_status', None) == 429
+            or getattr(e, 'status_code', None) == 429)
+
+
+def retry_after(e):
+    """Seconds to wait before retrying according to the server (Retry-After headers), if it said so."""
+    if getattr(e, 'retry_after', None) is not None:
+        return e.retry_after
+    headers = getattr(e, 'headers', None) or {}
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        value = headers.get('retry-after')
+    except (AttributeError, ValueError):
+        return None
+    if not value:
+        return None
+    try:
+        return max(0., float(value))
+    except ValueError:
+        date = email.utils.parsedate_to_datetime(value)
+        return max(0., date.timestamp() - time.time())
+
+
+class TokenBucket(object):
+    """Refills `rate` units per second up to `capacity`."""
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        self.refill()
+        if self.level >= amount:
+            return 0.
+        return (min(amount, self.capacity) - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= amount
+
+
+class ModelLimiter(object):
+    """
+    Request (rpm) and token (tpm) buckets of one model. The request rate adapts
+    AIMD style: it is cut on every 429 and creeps back up with each success, so
+    that concurrent workers settle just under the quota instead of oscillating.
+    Without a configured rpm the model is unlimited until its first 429, the
+    rate is then seeded from the throughput observed over the last minute.
+    """
+    def __init__(self, rpm=None, tpm=None):
+        self.max_rpm = rpm
+        self.rpm = rpm
+        self.requests = TokenBucket(rpm / 60.) if rpm else None
+        self.tokens = TokenBucket(tpm / 60.) if tpm else None
+        self.blocked_until = 0.
+        self.recent = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=0):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    wait = max(self.requests.wait_time(1) if self.requests else 0.,
+                               self.tokens.wait_time(tokens) if self.tokens and tokens else 0.)
+                if wait <= 0:
+                    if self.requests:
+                        self.requests.take(1)
+                    if self.tokens and tokens:
+                        self.tokens.take(tokens)
+                    self.recent.append(now)
+                    while self.recent and self.recent[0] < now - 60:
+                        self.recent.popleft()
+                    return
+            sleep(wait)
+
+    def set_rpm(self, rpm):
+        self.rpm = max(MIN_RPM, rpm)
+        if self.requests is None:
+            self.requests = TokenBucket(self.rpm / 60., capacity=1.)
+        else:
+            self.requests.refill()
+            self.requests.rate = self.rpm / 60.
+
+    def success(self):
+        with self._lock:
+            if self.rpm is not None:
+                rpm = self.rpm + RATE_INCREASE
+                self.set_rpm(min(rpm, self.max_rpm) if self.max_rpm else rpm)
+
+    def observed_rpm(self, now):
+        # requests per minute actually sent over the last minute (or since the first request)
+        while self.recent and self.recent[0] < now - 60:
+            self.recent.popleft()
+        if not self.recent:
+            return MIN_RPM
+        return len(self.recent) * 60. / max(1., now - self.recent[0])
+
+    def rate_limited(self, delay=None):
+        with self._lock:
+            now = time.monotonic()
+            observed = self.observed_rpm(now)
+            self.set_rpm(RATE_DECREASE * (min(self.rpm, observed) if self.rpm else observed))
+            if delay:
+                self.blocked_until = max(self.blocked_until, now + delay)
+
+
+class RateLimiter(object):
+    """Per model rate limits shared by every llm call of the process."""
+    def __init__(self):
+        self.limits = {}
+        self.models = {}
+        self._lock = threading.Lock()
+
+    def configure(self, limits):
+        """
+        Args:
+            limits (dict): model name -> {'rpm': requests per minute, 'tpm': tokens per minute}, both optional.
+        """
+        with self._lock:
+            for model_name, limit in (limits or {}).items():
+                self.limits[model_name] = limit or {}
+                self.models[model_name] = ModelLimiter(**self.limits[model_name])
+
+    def get(self, model_name):
+        with self._lock:
+            if model_name not in self.models:
+                self.models[model_name] = ModelLimiter()
+            return self.models[model_name]
+
+    def limits_tokens(self, model_name):
+        return self.get(model_name).tokens is not None
+
+    def acquire(self, model_name, tokens=0):
+        self.get(model_name).acquire(tokens)
+
+    def report_success(self, model_name):
+        self.get(model_name).success()
+
+    def report_rate_limit(self, model_name, delay=None):
+        self.get(model_name).rate_limited(delay)
+
+    def stats(self):
+        with self._lock:
+            return {model_name: limiter.rpm for model_name, limiter in self.models.items()}
+
+
+rate_limiter = RateLimiter()
+
+
+class CircuitBreaker(object):
+    """
+    Stops sending requests to an endpoint after `threshold` consecutive failures.
+    After `cooldown` seconds a single probe request is let through, its success
+    closes the circuit again and its failure re-opens it.
+    """
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half_open' if time.monotonic() - self.opened_at >= self.cooldown else 'open'
+
+    def retry_in(self):
+        if self.opened_at is None:
+            return 0.
+        return max(0., self.opened_at + self.cooldown - time.monotonic())
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def release(self):
+        # the request ended without telling anything about the endpoint's health
+        with self._lock:
+            self.probing = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self.probing = False
@@ -0,0 +1,148 @@
+import os
+import glob
+import atexit
+import threading
+import uuid
+import importlib
+from pdb import set_trace as st
+
+# rows kept in memory before they are written out as a new part
+FLUSH_ROWS = 256
+
+# (name, arrow type) of the columns of a step record, see step_schema
+STEP_COLUMNS = [('run', 'string'),
+                ('env', 'string'),
+                ('model', 'string'),
+                ('task', 'string'),
+                ('trial', 'int32'),
+                ('step', 'int32'),
+                ('action', 'string'),
+                ('observation', 'string'),
+                ('reward', 'float64'),
+                ('subgoal', 'string'),
+                ('llm_calls', 'int32'),
+                ('latency', 'float64'),
+                ('prompt_tokens', 'int64'),
+                ('completion_tokens', 'int64')]
+
+
+def require(module):
+    # pyarrow and pandas are slow to import and only needed once step records are
+    # written or read, so importing common.logger does not need them
+    try:
+        return importlib.import_module(module)
+    except ImportError as e:
+        package = module.split('.')[0]
+        raise ImportError(f"The trajectory store needs {package} to write or read step records "
+                          f"(pip install {package})") from e
+
+
+def step_schema():
+    pa = require('pyarrow')
+    return pa.schema([(name, getattr(pa, kind)()) for name, kind in STEP_COLUMNS])
+
+
+class TrajectoryStore(object):
+    """
+    Append-only per-step records of a run, one row per env step (see STEP_COLUMNS).
+    Rows are buffered and written as Parquet parts, `<folder>/part-<token>-<n>.parquet`
+    with a token unique to the store, so that processes can share a folder (and a
+    resumed run the folder of the run it resumes) and a crash only loses the buffer.
+    Needs pyarrow from the first appended row on. Read them back with load_steps.
+    """
+    def __init__(self, folder, flush_rows=FLUSH_ROWS):
+        self.folder = folder
+        self.flush_rows = flush_rows
+        os.makedirs(folder, exist_ok=True)
+        self.rows = []
+        self.parts = 0
+        # not the pid, a pid of the crashed run can come back in the resumed one
+        self.token = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def append(self, row):
+        if not self.rows and not self.parts:
+            # fail on the first step of the run rather than when the first part is written
+            require('pyarrow.parquet')
+        self.rows.append(row)
+        if len(self.rows) >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if not self.rows:
+                return
+            pa, pq = require('pyarrow'), require('pyarrow.parquet')
+            table = pa.Table.from_pylist(self.rows, schema=step_schema())
+            path = f"{self.folder}/part-{self.token}-{self.parts:05d}.parquet"
+            # write then rename, so that readers never see half a part
+            pq.write_table(table, f"{path}.tmp")
+            os.replace(f"{path}.tmp", path)
+            self.parts += 1
+            self.rows = []
+
+    def clear(self):
+        """Remove the parts of a previous run in the same folder."""
+        for path in glob.glob(f"{self.folder}/part-*.parquet"):
+            os.remove(path)
+
+    def keep_tasks(self, tasks):
+        """
+        Drop the rows of the tasks not in `tasks` from the parts of a previous run,
+        e.g. the steps of the tasks a crashed run had not finished, which a resumed
+        run plays again.
+        """
+        paths = glob.glob(f"{self.folder}/part-*.parquet")
+        if not paths:
+            return
+        pa, pc, pq = require('pyarrow'), require('pyarrow.compute'), require('pyarrow.parquet')
+        tasks = [str(task) for task in tasks]
+        for path in paths:
+            table = pq.read_table(path, schema=step_schema())
+            kept = table.filter(pc.is_in(table['task'], value_set=pa.array(tasks, pa.string())))
+            if kept.num_rows == table.num_rows:
+                continue
+            if kept.num_rows == 0:
+                os.remove(path)
+                continue
+            pq.write_table(kept, f"{path}.tmp")
+            os.replace(f"{path}.tmp", path)
+
+
+def load_steps(paths, columns=None, **where):
+    """
+    Load the step records of one or more runs as a DataFrame.
+
+    Args:
+        paths: steps folder(s) or glob(s), e.g. 'logs/*/steps' for a whole sweep
+        columns: columns to read (default all)
+        where: equality filters pushed down to the scan, e.g. env='VillageNav-v0', trial=0.
+            A list value matches any of its items.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    files = sorted(f for path in paths for folder in glob.glob(path) for f in glob.glob(f"{folder}/part-*.parquet"))
+    if not files:
+        pd = require('pandas')
+        return pd.DataFrame(columns=columns or [name for name, _ in STEP_COLUMNS])
+    require('pandas')
+    ds = require('pyarrow.dataset')
+    dataset = ds.dataset(files, schema=step_schema(), format='parquet')
+    condition = None
+    for name, value in where.items():
+        term = ds.field(name).isin(value) if isinstance(value, (list, tuple, set)) else ds.field(name) == value
+        condition = term if condition is None else condition & term
+    return dataset.to_table(columns=columns, filter=condition).to_pandas()
+
+
+def episode_summary(steps):
+    """One row per (run, task, trial): number of steps, final reward, llm latency and tokens."""
+    keys = ['run', 'env', 'model', 'task', 'trial']
+    steps = steps.sort_values(keys + ['step'])
+    return steps.groupby(keys, as_index=False).agg(steps=('step', 'count'),
+                                                   reward=('reward', 'last'),
+                                                   llm_calls=('llm_calls', 'sum'),
+                                                   latency=('latency', 'sum'),
+                                                   prompt_tokens=('prompt_tokens', 'sum'),
+                                                   completion_tokens=('completion_tokens', 'sum'))
@@ -0,0 +1,60 @@
+import time
+import contextvars
+from contextlib import contextmanager
+from pdb import set_trace as st
+
+_current_usage = contextvars.ContextVar('llm_usage', default=None)
+
+
+@contextmanager
+def usage_scope(model_name):
+    """
+    Collect the usage record of one llm call. Backends fill it in through
+    `record_usage` / `mark_first_token`, latency is set when the scope exits.
+
+    Record fields:
+        model, prompt_tokens, completion_tokens, latency (s),
+        ttft (s, time to first token, None if not streamed), cached
+    """
+    record = {'model': model_name,
+              'prompt_tokens': None,
+              'completion_tokens': None,
+              'latency': None,
+              'ttft': None,
+              'cached': False}
+    start = time.perf_counter()
+    token = _current_usage.set((record, start))
+    try:
+        yield record
+    finally:
+        record['latency'] = time.perf_counter() - start
+        _current_usage.reset(token)
+
+
+def record_usage(**kwargs):
+    current = _current_usage.get()
+    if current is not None:
+        current[0].update(kwargs)
+
+
+def mark_first_token():
+    current = _current_usage.get()
+    if current is not None and current[0]['ttft'] is None:
+        record, start = current
+        record['ttft'] = time.perf_counter() - start
+
+
+def summarize_usage(records):
+    """Aggregate a list of usage records into totals and means."""
+    if not records:
+        return {'calls': 0, 'cached_calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0,
+                'total_latency': 0., 'mean_latency': 0., 'mean_ttft': None}
+    ttfts = [r['ttft'] for r in records if r['ttft'] is not None]
+    total_latency = sum(r['latency'] or 0. for r in records)
+    return {'calls': len(records),
+            'cached_calls': sum(1 for r in records if r['cached']),
+            'prompt_tokens': sum(r['prompt_tokens'] or 0 for r in records),
+            'completion_tokens': sum(r['completion_tokens'] or 0 for r in records),
+            'total_latency': total_latency,
+            'mean_latency': total_latency / len(records),
+            'mean_ttft': sum(ttfts) / len(ttfts) if ttfts else None}
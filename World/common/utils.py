@@ -1,9 +1,20 @@
 import random
-import wandb
+import yaml
 import numpy as np
 from collections import Counter
 from pdb import set_trace as st
 
+_wandb = None
+
+def get_wandb():
+    # wandb takes seconds to import and debug runs never log to it,
+    # so it is imported on the first run that does
+    global _wandb
+    if _wandb is None:
+        import wandb
+        _wandb = wandb
+    return _wandb
+
 def set_seed(seed) -> None:
     """Sets random seed for reproducibility
     Args:
@@ -16,10 +27,39 @@ def set_seed(seed) -> None:
     # if torch.cuda.is_available():
     #     torch.cuda.manual_seed_all(seed)
 
-def error_handle(signum, frame):
-    """Time limit error handle"""
-    raise Exception("Oops time is up")
-
+def finalize_args(args):
+    """Set the log name and the env specific configs of parsed main.py args, in place."""
+    # set log name
+    str_debug = 'debug_' if args.debug else ''
+    args.log_name = \
+        f"{str_debug}{args.env}/Manual_{args.manual_type}_{args.hierachical}_{args.exploration_model}_{args.imperfect_aware}_{args.agent_model}_trial_{args.max_trial}"
+
+    # environment specific configs
+    if 'Nav' in args.env:
+        args.env_type = 'navigation'
+    elif 'Cooking' in args.env:
+        args.env_type = 'cooking'
+    elif 'Roguelike' in args.env:
+        args.env_type = 'roguelike'
+        args.back = False
+        if 'reversible' in args.env:
+            args.back = True 
+        
+    with open(f'envs/env_configs/{args.env_type}.yaml', 'r') as file:
+        yaml_args = yaml.safe_load(file)
+
+    for key, value in yaml_args.items():
+        setattr(args, key, value)
+    return args
+
+def init_wandb(args, **kwargs):
+    return get_wandb().init(
+        project="mirage3", 
+        entity="lyneylynettemagic-university-of-michigan", 
+        name=args.log_name,
+        config={k: str(v) if v is None else v for k, v in vars(args).items()},
+        **kwargs
+    )
 
 def initialize_logs(task_range):
     last_rewards = []
@@ -85,10 +125,10 @@ def rew_logging(best_rewards,
         color="green"
     )
     if not debug:
-        wandb.log({f'last rew trial {trial}': last_avg_r, 
-                f'best rew trial {trial}': best_avg_r,
-                f'last sr trial {trial}': last_sr,
-                f'best sr trial {trial}': best_sr})
+        (logger.wandb_run or get_wandb()).log({f'last rew trial {trial}': last_avg_r, 
+                                         f'best rew trial {trial}': best_avg_r,
+                                         f'last sr trial {trial}': last_sr,
+                                         f'best sr trial {trial}': best_sr})
 
     return best_rewards, best_trials, last_rewards
 
@@ -23,6 +23,15 @@ from .constant import *
 from pdb import set_trace as st
 
 class Env:
+    # attributes of the task objects that never change during a task (pygame surfaces, links between the objects)
+    static_attrs = {'character': ('image',),
+                    'kitchen': ('character',),
+                    'farm': ('map', 'images'),
+                    'store': (),
+                    'fishing': ('map', 'tilesets', 'npc_list'),
+                    'obs_func': ('character', 'kitchen', 'farm', 'store', 'harbor')}
+    task_attrs = ('task', 'locations', 'desired_in_farm', 'horizon', 'task_text')
+
     def __init__(self, 
                  mode,
                  crop_gone=False,
@@ -48,44 +57,39 @@ class Env:
         return task, locations, desired_in_farm
     
     def record_task(self, task_info):
-        self.initial_task = copy.deepcopy(self.task)
-        self.initial_locations = copy.deepcopy(self.locations)
-        self.initial_desired = copy.deepcopy(self.desired_in_farm)
         self.initial_task_info = copy.deepcopy(task_info)
         return
-    
-    def rewind(self):
-        self.task, self.locations = copy.deepcopy(self.initial_task), copy.deepcopy(self.initial_locations)
-        self.horizon = self.get_horizon()
-        self.desired_in_farm = self.desired_in_farm
-        self.task_text = convert_task_to_text(self.task)
-        
-        self.map = GameMap(self.itemFetcher)
-        self.character = Character(self.itemFetcher, self.task)
-        self.farm = Farm(self.map, 
-                         self.locations['farm'], 
-                         self.crop_gone,
-                         self.desired_in_farm)
-        self.store = Store(self.locations['store'])
-        self.fishing = Fishing(self.map, self.locations['fishing'])
-        self.kitchen = Kitchen(self.character, 
-                               self.task, 
-                               self.locations['restaurant'],
-                               novice_mistake=self.novice_mistake)
-        self.obs_func = Observation(self.character, self.kitchen, self.farm, self.store, self.fishing)
-        obs = self.obs_func.get_full_observation()
-        task_info = self.initial_task_info
-        obs = f"{task_info}\n{obs}"
-        return obs
+
+    def snapshot(self):
+        state = {'env': {k: getattr(self, k) for k in self.task_attrs}}
+        for name, static in self.static_attrs.items():
+            state[name] = {k: v for k, v in vars(getattr(self, name)).items() if k not in static}
+        # one deepcopy, so that what the objects share (the task, the locations) stays shared
+        return copy.deepcopy(state)
+
+    def restore(self, snapshot):
+        # the objects are kept (with their surfaces), only their state is replaced
+        state = copy.deepcopy(snapshot)
+        for k, v in state['env'].items():
+            setattr(self, k, v)
+        for name in self.static_attrs:
+            vars(getattr(self, name)).update(state[name])
 
 
     def reset(self):
+        return self.start_task(self.generate_task())
+
+    def generate_task(self):
+        # the random part of reset, the rest only builds the task objects from it
         task, locations, desired_in_farm = self.initialize_task()
         if self.storage_loss:
             locations = storage_loss(task, 
                                      locations,
                                      process_num=3 if self.mode=='easy' else 5)
-            
+        return {'task': task, 'locations': locations, 'desired_in_farm': desired_in_farm}
+
+    def start_task(self, world):
+        task, locations, desired_in_farm = world['task'], world['locations'], world['desired_in_farm']
         self.task, self.locations = task, locations
         self.horizon = self.get_horizon()
         self.desired_in_farm = desired_in_farm
@@ -21,15 +21,37 @@ class Env:
         self.last_obs = None
         self.obs_type = obs_type
         self.npc_manual_lst = npc_manual_lst
-        self.initial_map = None
         self.initial_character= None 
 
     def reset(self):
         self.game_map.reset()
         self.character.reset()
-        self.initial_map = copy.deepcopy(self.game_map.map_data)
         self.num_rounds = 0
         return self.character.get_observation()
+
+    def snapshot(self):
+        # all that steps can change: map cells and objects (lights, moving npcs), the character and the counters.
+        # cells are label codes, copying the arrays is a full copy
+        game_map = self.game_map
+        return {'map_data': {season: grid.copy() for season, grid in game_map.map_data.items()},
+                'objects': {season: list(objs) for season, objs in game_map.objects.items()},
+                'time_step': game_map.time_step,
+                'npc_pos': list(getattr(game_map, 'npc_pos', [])),
+                'character': (self.character.position, self.character.direction),
+                'num_rounds': self.num_rounds,
+                'last_obs': self.last_obs}
+
+    def restore(self, snapshot):
+        # copy again, the same snapshot is restored for every trial
+        game_map = self.game_map
+        game_map.map_data = {season: grid.copy() for season, grid in snapshot['map_data'].items()}
+        game_map.objects = {season: list(objs) for season, objs in snapshot['objects'].items()}
+        game_map.time_step = snapshot['time_step']
+        if hasattr(game_map, 'npc_pos'):
+            game_map.npc_pos = list(snapshot['npc_pos'])
+        self.character.position, self.character.direction = snapshot['character']
+        self.num_rounds = snapshot['num_rounds']
+        self.last_obs = snapshot['last_obs']
     
 
     def goal_completed(self):
@@ -0,0 +1,126 @@
+# grid.py
+import random
+import numpy as np
+from ..utils.config import TILE_SIZE
+from pdb import set_trace as st
+
+# codes of the labels every map uses, the others (house_1, npc_0, object_12, ...) get theirs on first use
+EMPTY, LAND, ROAD, GRASS, DESTINATION, CONSTRUCTION = range(6)
+BASE_LABELS = ['', 'land', 'road', 'grass', 'destination', 'construction']
+# int16 holds far more labels than a map can have
+GRID_DTYPE = np.int16
+
+
+class LabelTable(object):
+    """
+    Label <-> code lookup of one map. map_data cells hold the codes, the
+    labels are only needed for observations and manuals (see decode).
+    Codes are never reassigned, so snapshots of the grid stay valid.
+    """
+    def __init__(self):
+        self.names = list(BASE_LABELS)
+        self.codes = {name: code for code, name in enumerate(self.names)}
+
+    def code(self, name):
+        code = self.codes.get(name)
+        if code is None:
+            code = len(self.names)
+            self.names.append(name)
+            self.codes[name] = code
+        return code
+
+    def decode(self, grid):
+        """Labels of a grid (or a part of it) as nested lists of str."""
+        return np.array(self.names, dtype=object)[grid].tolist()
+
+
+def empty_grid(rows, cols):
+    return np.zeros((rows * TILE_SIZE, cols * TILE_SIZE), dtype=GRID_DTYPE)
+
+
+def tile_blocks(grid):
+    # (tile row, tile col, pixel row, pixel col) view, no copy
+    rows, cols = grid.shape[0] // TILE_SIZE, grid.shape[1] // TILE_SIZE
+    return grid.reshape(rows, TILE_SIZE, cols, TILE_SIZE).swapaxes(1, 2)
+
+
+def pure_tiles(grid, code):
+    """Per tile summary: True where all the pixels of the tile are `code`."""
+    return (tile_blocks(grid) == code).all(axis=(2, 3))
+
+
+def any_tiles(grid, code):
+    """Per tile summary: True where some pixel of the tile is `code`."""
+    return (tile_blocks(grid) == code).any(axis=(2, 3))
+
+
+def corner_tiles(grid):
+    """Per tile summary: the code of the top left pixel, the type the map checks for a tile."""
+    return grid[::TILE_SIZE, ::TILE_SIZE]
+
+
+def fit_mask(grid, size, code=LAND):
+    """
+    True at the (row, col) where a `size` block anchored at its top left is all
+    `code` and ends before the last row and column (as size_safe_to_place).
+    One summed-area table answers every anchor of the grid at once.
+    """
+    rows, cols = grid.shape
+    height, width = size
+    fits = np.zeros((rows, cols), dtype=bool)
+    anchor_rows, anchor_cols = rows - height, cols - width
+    if anchor_rows <= 0 or anchor_cols <= 0:
+        return fits
+    sat = np.zeros((rows + 1, cols + 1), dtype=np.int32)
+    sat[1:, 1:] = (grid == code).cumsum(axis=0).cumsum(axis=1)
+    block = (sat[height:height + anchor_rows, width:width + anchor_cols]
+             - sat[:anchor_rows, width:width + anchor_cols]
+             - sat[height:height + anchor_rows, :anchor_cols]
+             + sat[:anchor_rows, :anchor_cols])
+    fits[:anchor_rows, :anchor_cols] = block == height * width
+    return fits
+
+
+class FreeCells(object):
+    """
+    Cells still free to anchor an object during map generation. `mask` is the
+    occupancy view used by the vectorized queries, `cells` + `index` give
+    constant time removal (the last cell fills the hole) and random choice.
+    """
+    def __init__(self, mask):
+        self.mask = mask.copy()
+        self.cells = [tuple(cell) for cell in np.argwhere(self.mask).tolist()]
+        self.index = {cell: i for i, cell in enumerate(self.cells)}
+
+    def __len__(self):
+        return len(self.cells)
+
+    def __contains__(self, cell):
+        return cell in self.index
+
+    def remove(self, cell):
+        i = self.index.pop(cell)
+        last = self.cells.pop()
+        if i < len(self.cells):
+            self.cells[i] = last
+            self.index[last] = i
+        self.mask[cell] = False
+
+    def choice(self):
+        return random.choice(self.cells)
+
+    def sample(self, where, accept=None):
+        """
+        A uniformly random free cell with `where` set and `accept(row, col)`
+        true, None if there is none. Same odds as scanning a shuffled list of
+        the cells for the first match, without touching the rejected ones.
+        """
+        pool = [tuple(cell) for cell in np.argwhere(self.mask & where).tolist()]
+        while pool:
+            i = random.randrange(len(pool))
+            cell = pool[i]
+            if accept is None or accept(*cell):
+                return cell
+            pool[i] = pool[-1]
+            pool.pop()
+        return None
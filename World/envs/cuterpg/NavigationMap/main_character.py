@@ -20,14 +20,7 @@ class NavigationCharacter(Character):
         screen.blit(self.images[self.direction], (x * GRID_SIZE, y * GRID_SIZE))
 
     def whole_tile_road(self, x, y):
-        tile_x_start = (x // TILE_SIZE) * TILE_SIZE
-        tile_y_start = (y // TILE_SIZE) * TILE_SIZE
-
-        for yy in range(tile_y_start, tile_y_start + TILE_SIZE):
-            for xx in range(tile_x_start, tile_x_start + TILE_SIZE):
-                if self.game_map.map_data[self.game_map.season][yy][xx] != 'road':
-                    return False
-        return True
+        return self.game_map.is_pure_tile(y, x, 'road')
 
 
     def can_move_to(self, new_position):
@@ -68,4 +61,5 @@ class NavigationCharacter(Character):
         x, y = self.position
         MAP_COLS = self.game_map.MAP_COLS
         MAP_ROWS = self.game_map.MAP_ROWS
-        return get_first_person((x, y), self.direction, self.game_map.map_data, self.game_map.season, MAP_ROWS, MAP_COLS, TILE_SIZE)
+        return get_first_person((x, y), self.direction, self.game_map.map_data, self.game_map.season, MAP_ROWS, MAP_COLS, TILE_SIZE,
+                                labels=self.game_map.labels.names)
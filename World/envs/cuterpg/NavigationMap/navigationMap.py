@@ -13,11 +13,22 @@ from .path_converter import convert_path_to_instructions, path_to_turn
 from .observation_converter import convert_obs_to_manual
 from envs.cuterpg.utils.tileset import TileSet
 from .utils import sample_light_positions
+from .grid import LabelTable, FreeCells, fit_mask, empty_grid, pure_tiles, any_tiles, corner_tiles, EMPTY, LAND, ROAD, GRASS, DESTINATION, CONSTRUCTION
 from ..utils.config import GRID_SIZE, TILE_SIZE, CHARACTER_WIDTH, CHARACTER_HEIGHT
 from envs.cuterpg.utils.assets.label_to_description import SPECIAL_OBJECTS, WINTER_SPECIAL_OBJECTS
 from pdb import set_trace as st
 
 class GameMap:
+    # pygame surfaces, rebuilt from the assets rather than saved with the map (see get_state)
+    render_attrs = ('screen', 'tilesets', 'land_tile', 'road_tile', 'highlighted_road_tile', 'alter_road_tile', 'npc_list',
+                    'assets', 'background')
+    # derived from the map and rebuilt on demand, or only used while generating it, not saved either
+    cache_attrs = ('field', 'free_cells')
+    # objects that move or change color, drawn over the background on every frame
+    dynamic_types = ('npc', 'light')
+    # moves of the path search, in the order their ties are broken (tile dx, dy)
+    MOVES = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
     def __init__(self, screen, 
                        seasons,
                        dynamic,
@@ -37,6 +48,10 @@ class GameMap:
         self.construction = construction
         self.max_land_size = max_land_size
         self.min_land_size = min_land_size
+        self.field = None
+        # surfaces by (season, asset), kept across resets, and the background of each season (see draw)
+        self.assets = {}
+        self.background = {}
         self.MAP_ROWS = map_rows
         self.MAP_COLS = map_cols
         self.season_pointer = 0
@@ -62,24 +77,33 @@ class GameMap:
                 self.path, _ = self.find_path_bfs(self.start_position)
                 self.alter_path, _ = self.generate_obstructed_path(self.start_position)
                 
-        self.underlying_map = copy.deepcopy(self.map_data)
+        self.underlying_map = {season: grid.copy() for season, grid in self.map_data.items()}
         self.place_pedestrian()
         self.max_horizon = 6 * len(self.path)
         return
+
+    def get_state(self):
+        # everything reset generated, picklable
+        return {k: v for k, v in vars(self).items() if k not in self.render_attrs + self.cache_attrs}
+
+    def set_state(self, state):
+        self.__dict__.update(state)
+        self.field = None
+        self.load_tilesets()
+        if hasattr(self, 'npc_ids'):
+            all_npc = self.tilesets[self.seasons[0]].get_npc()
+            self.npc_list = [all_npc[i] for i in self.npc_ids]
             
     def initialize_agent(self):
-        m, n = len(self.map_data[self.season]), len(self.map_data[self.season][0])
-
         # List to store road tiles and their distances to the nearest goal tile
         road_tiles_with_distance = []
 
-        # Iterate through the map and find all road tiles
-        for row in range(0, m, TILE_SIZE):
-            for col in range(0, n, TILE_SIZE):
-                if self.map_data[self.season][row][col] == 'road':
-                    tile_x, tile_y = col // TILE_SIZE, row // TILE_SIZE
-                    _, min_distance = self.find_path_bfs((col, row))
-                    road_tiles_with_distance.append(((tile_x, tile_y), min_distance))
+        # Iterate through the map and find all road tiles, their path length to the goal is read from the distance field
+        dist = self.distance_field()['dist']
+        road_rows, road_cols = np.nonzero(corner_tiles(self.map_data[self.season]) == ROAD)
+        for tile_y, tile_x in zip(road_rows.tolist(), road_cols.tolist()):
+            min_distance = dist[tile_y][tile_x] if dist[tile_y][tile_x] >= 0 else None
+            road_tiles_with_distance.append(((tile_x, tile_y), min_distance))
 
         # Sort the list by distance (closest first)
         ranked_road_tiles = sorted(road_tiles_with_distance, key=lambda x: x[1])
@@ -102,18 +126,27 @@ class GameMap:
         self.season_pointer = 0
         self.season = self.seasons[self.season_pointer]
         self.objects = {}
+        # cells hold label codes (see grid.py), shared by the seasons of the map
+        self.labels = LabelTable()
+        self.map_data = {}
+        for season in self.seasons:
+            self.objects[season] = []
+            self.map_data[season] = empty_grid(self.MAP_ROWS, self.MAP_COLS)
+        self.load_tilesets()
+        return
+
+    def load_tilesets(self):
         self.tilesets = {}
         self.land_tile = {}
         self.road_tile = {}
         self.highlighted_road_tile = {}
-        self.map_data = {}
         for season in self.seasons:
-            self.objects[season] = []
-            self.tilesets[season] = TileSet(season)
+            if (season, 'tileset') not in self.assets:
+                self.assets[(season, 'tileset')] = TileSet(season)
+            self.tilesets[season] = self.assets[(season, 'tileset')]
             self.land_tile[season] = self.tilesets[season].get_land()
             self.road_tile[season] = self.tilesets[season].get_road()
             self.highlighted_road_tile[season] = self.tilesets[season].get_highlighted_road()
-            self.map_data[season] = [["" for _ in range(self.MAP_COLS * TILE_SIZE)] for _ in range(self.MAP_ROWS * TILE_SIZE)]
         if self.construction:
             self.alter_road_tile = {}
             self.alter_road_tile[season] = self.tilesets[season].get_alter_road()
@@ -121,92 +154,122 @@ class GameMap:
         
 
     def get_goal_tile(self):
-        m, n = len(self.map_data[self.season]), len(self.map_data[self.season][0])
-        goal_tiles = {(col // TILE_SIZE, row // TILE_SIZE)
-                        for row in range(m)
-                        for col in range(n)
-                        if self.map_data[self.season][row][col] == 'destination'}
-        return goal_tiles
+        tile_rows, tile_cols = np.nonzero(any_tiles(self.map_data[self.season], DESTINATION))
+        return set(zip(tile_cols.tolist(), tile_rows.tolist()))
     
-    def closet_to_goal_tiles(self):
-        m, n = len(self.map_data[self.season]), len(self.map_data[self.season][0])
-        goal_tiles = self.get_goal_tile()
-        min_distance = float('inf')
-        closest_tiles = None
-
-        for row in range(m // TILE_SIZE):
-            for col in range(n // TILE_SIZE):
-                # Compute the distance to the closest goal tile
-                tile_type = self.map_data[self.season][row * TILE_SIZE][col * TILE_SIZE]
-                if tile_type != 'road':
-                    continue
-                distance = min(abs(goal_col - col) + abs(goal_row - row) for (goal_col, goal_row) in goal_tiles)
-                
-                if distance < min_distance:
-                    min_distance = distance
-                    closest_tiles = [(col, row)]
-                elif distance == min_distance:
-                    closest_tiles.append((col, row))
+    def closest_road_tiles(self):
+        """(col, row) of the road tiles closest (manhattan, in tiles) to the goal, in row major order."""
+        goal_tiles = np.array(sorted(self.get_goal_tile()))
+        road_rows, road_cols = np.nonzero(corner_tiles(self.map_data[self.season]) == ROAD)
+        # distance of every road tile to its closest goal tile
+        distance = (np.abs(road_cols[:, None] - goal_tiles[None, :, 0]) + np.abs(road_rows[:, None] - goal_tiles[None, :, 1])).min(axis=1)
+        closest = distance == distance.min()
+        return list(zip(road_cols[closest].tolist(), road_rows[closest].tolist()))
 
+    def closet_to_goal_tiles(self):
         pixels = []
-        for closest_tile in closest_tiles:
-            closest_tile_col, closest_tile_row = closest_tile
+        for closest_tile_col, closest_tile_row in self.closest_road_tiles():
             pixels.extend([(x, y)
                     for y in range(closest_tile_row * TILE_SIZE, (closest_tile_row + 1) * TILE_SIZE)
                     for x in range(closest_tile_col * TILE_SIZE, (closest_tile_col + 1) * TILE_SIZE)])
 
         return pixels
 
+    def distance_field(self, goals=None):
+        """
+        Path length (in tiles) from every tile to the goal, and the next tile on
+        the way, from one reverse BFS over the pure road tiles.
+        The goal is closest_road_tiles(), or the tiles of the `goals` pixels.
+        The field is kept until the roads or the goal change (construction, npcs).
+
+        Returns a dict with 'dist' (rows x cols, -1 where the goal is out of reach)
+        and 'next' ((col, row) of the next tile, None on the goal).
+        """
+        road = pure_tiles(self.map_data[self.season], ROAD)
+        if goals is None:
+            goal_tiles = self.closest_road_tiles()
+        else:
+            goal_tiles = sorted({(x // TILE_SIZE, y // TILE_SIZE) for x, y in goals})
+        key = (road.tobytes(), tuple(goal_tiles))
+        if self.field is not None and self.field['key'] == key:
+            return self.field
+
+        rows, cols = road.shape
+        road = road.tolist()
+        dist = [[-1] * cols for _ in range(rows)]
+        queue = deque()
+        for col, row in goal_tiles:
+            dist[row][col] = 0
+            queue.append((col, row))
+        while queue:
+            col, row = queue.popleft()
+            # a tile can only be entered if it is all road, a goal tile that is not can only be started from
+            if not road[row][col]:
+                continue
+            for dx, dy in self.MOVES:
+                ncol, nrow = col - dx, row - dy
+                if 0 <= nrow < rows and 0 <= ncol < cols and dist[nrow][ncol] < 0:
+                    dist[nrow][ncol] = dist[row][col] + 1
+                    queue.append((ncol, nrow))
+
+        # the first move (in MOVES order) that gets one tile closer, so that following it
+        # gives the same path as a forward BFS from the tile
+        next_tile = [[None] * cols for _ in range(rows)]
+        for row in range(rows):
+            for col in range(cols):
+                if dist[row][col] <= 0:
+                    continue
+                for dx, dy in self.MOVES:
+                    ncol, nrow = col + dx, row + dy
+                    if 0 <= nrow < rows and 0 <= ncol < cols and road[nrow][ncol] and dist[nrow][ncol] == dist[row][col] - 1:
+                        next_tile[row][col] = (ncol, nrow)
+                        break
+
+        self.field = {'key': key, 'dist': dist, 'next': next_tile}
+        return self.field
 
-    def generate_random_map(self):
-        self.empty_grids = [(x, y) for x in range(TILE_SIZE*self.MAP_ROWS) for y in range(TILE_SIZE*self.MAP_COLS)]
 
+    def generate_random_map(self):
         def place_land(x, y, w, h):
+            grid = self.map_data[self.season]
             # handle right double roads
             count_double_road_right = 0
-            for row in range(max(y - TILE_SIZE, 0), y + h):
-                if 0 <= row < self.MAP_ROWS * TILE_SIZE and x + w + TILE_SIZE < self.MAP_COLS * TILE_SIZE and self.map_data[self.season][row][x + w + TILE_SIZE] == "road":
-                    count_double_road_right += 1
+            if x + w + TILE_SIZE < self.MAP_COLS * TILE_SIZE:
+                count_double_road_right = np.count_nonzero(grid[max(y - TILE_SIZE, 0):y + h, x + w + TILE_SIZE] == ROAD)
             if count_double_road_right > TILE_SIZE:
                 w += TILE_SIZE
 
             # handle left double roads
             count_double_road_left = 0
-            for row in range(y, y + h):
-                if 0 <= row < self.MAP_ROWS * TILE_SIZE and x - TILE_SIZE - 1 >= 0 and self.map_data[self.season][row][x - TILE_SIZE - 1] == "road":
-                    count_double_road_left += 1
+            if x - TILE_SIZE - 1 >= 0:
+                count_double_road_left = np.count_nonzero(grid[y:y + h, x - TILE_SIZE - 1] == ROAD)
             if count_double_road_left > TILE_SIZE:
                 x -= TILE_SIZE
 
             # handle downward double roads
             for j in range(min(x + TILE_SIZE, self.MAP_COLS * TILE_SIZE), min(x + w, self.MAP_COLS * TILE_SIZE)):
-                if y + h - 1 < self.MAP_ROWS * TILE_SIZE and self.map_data[self.season][y + h - 1][j] == "road":
+                if y + h - 1 < self.MAP_ROWS * TILE_SIZE and grid[y + h - 1, j] == ROAD:
                     h += TILE_SIZE
 
-            for i in range(y, min(y + h, self.MAP_ROWS * TILE_SIZE)):
-                for j in range(x, min(x + w, self.MAP_COLS * TILE_SIZE)):
-                    if self.map_data[self.season][i][j] == "":
-                        self.map_data[self.season][i][j] = "land"
-            for i in range(max(0, y - TILE_SIZE), min(self.MAP_ROWS * TILE_SIZE, y + h + TILE_SIZE)):
-                for j in range(max(0, x - TILE_SIZE), min(self.MAP_COLS * TILE_SIZE, x + w + TILE_SIZE)):
-                    if self.map_data[self.season][i][j] == "":
-                        self.map_data[self.season][i][j] = "road"
+            # slices are views, the masked assignments write to the map
+            land = grid[y:y + h, x:x + w]
+            land[land == EMPTY] = LAND
+            border = grid[max(0, y - TILE_SIZE):y + h + TILE_SIZE, max(0, x - TILE_SIZE):x + w + TILE_SIZE]
+            border[border == EMPTY] = ROAD
             return
 
         for j in range(0, self.MAP_ROWS):
             for i in range(0, self.MAP_COLS):
                 y = j * TILE_SIZE
                 x = i * TILE_SIZE
-                if self.map_data[self.season][y][x] == "":
+                if self.map_data[self.season][y, x] == EMPTY:
                     land_width = random.randint(self.min_land_size, self.max_land_size) * TILE_SIZE
                     land_height = random.randint(self.min_land_size, self.max_land_size) * TILE_SIZE
                     place_land(x, y, land_width, land_height)
                     # print(x, y, land_width // TILE_SIZE, land_height // TILE_SIZE)
 
-        for i in range(0, TILE_SIZE*self.MAP_ROWS): 
-            for j in range(0, TILE_SIZE*self.MAP_COLS):
-                if self.map_data[self.season][i][j] == 'road':
-                    self.empty_grids.remove((i, j))
+        # anchors left for the objects, each placement takes its top left cell
+        self.free_cells = FreeCells(self.map_data[self.season] != ROAD)
                     
         self.place_houses('destination', 1, size=(10, 8))
         self.place_houses('house', random.randint(5, 8), size=(10, 8))
@@ -222,7 +285,7 @@ class GameMap:
         self.fill_land_with_objects()
 
     def copy_map_data(self, other_season):
-        self.map_data[other_season] = copy.deepcopy(self.map_data[self.season])
+        self.map_data[other_season] = self.map_data[self.season].copy()
         self.objects[other_season] = copy.deepcopy(self.objects[self.season])
 
     def switch_season(self):
@@ -237,16 +300,34 @@ class GameMap:
             season = self.season
         if not (row+size[0]<self.MAP_ROWS*TILE_SIZE and col+size[1]<self.MAP_COLS*TILE_SIZE):
             return False
-        return all(self.map_data[season][row+r][col+c] == 'land' for r in range(size[0]) for c in range(size[1]))
+        grid = self.map_data[season]
+        # most candidates already fail on their first cell, skip the array op for them
+        if grid.item(row, col) != LAND:
+            return False
+        return bool((grid[row:row+size[0], col:col+size[1]] == LAND).all())
+
+    def safe_anchors(self, size, season=None):
+        # size_safe_to_place for every cell at once
+        return fit_mask(self.map_data[season or self.season], size, LAND)
+
+    def road_side_anchors(self, size=(1, 1)):
+        # is_next_to_road for every cell at once
+        side = np.isin(self.map_data[self.season], (ROAD, GRASS))
+        rows, cols = side.shape
+        height, width = size
+        anchors = np.zeros_like(side)
+        anchors[1:, :] |= side[:-1, :]
+        anchors[:, 1:] |= side[:, :-1]
+        anchors[:rows - height, :cols - width + 1] |= side[height:, width - 1:]
+        anchors[:rows - height + 1, :cols - width] |= side[height - 1:, width:]
+        return anchors
     
 
     def place_item_at(self, row, col, size, obj_type, name_in_map, name="", id="", color='', season=None):
         if season is None:
             season = self.season
             
-        for r in range(size[0]):
-            for c in range(size[1]):
-                self.map_data[season][row + r][col + c] = name_in_map
+        self.map_data[season][row:row + size[0], col:col + size[1]] = self.labels.code(name_in_map)
 
         self.objects[season].append({
             'type': obj_type,
@@ -278,7 +359,6 @@ class GameMap:
         with open(f'envs/cuterpg/utils/assets/lights/light_boundaries.json') as f:
             light_boundaries = json.load(f)
             
-        random.shuffle(self.empty_grids)
         self.light_positions = []
 
         for i in range(count):
@@ -286,17 +366,18 @@ class GameMap:
             color_idx = self.light_to_idx[color_order[self.time_step]]
             obj = light_boundaries[color_idx-1]
             size = (math.ceil(obj['height'] / GRID_SIZE), math.ceil(obj['width'] / GRID_SIZE))
-            for (row, col) in self.empty_grids:
-                if self.size_safe_to_place(size, row, col) and self.map_data[self.season][row][col] == 'land' and self.is_next_to_road(row, col, size):
-                    name_in_map, _, obj_name = self.get_name(obj, i+1)
-                    self.place_item_at(row, col, size, 'light', name_in_map, name=obj_name, id=obj['id'])
-                    self.empty_grids.remove((row, col))
-                    self.light_positions.append((obj, row, col, size, 'light', name_in_map, obj_name, obj['id']))
-                    break
+            cell = self.free_cells.sample(self.safe_anchors(size) & self.road_side_anchors(size))
+            if cell is None:
+                continue
+            row, col = cell
+            name_in_map, _, obj_name = self.get_name(obj, i+1)
+            self.place_item_at(row, col, size, 'light', name_in_map, name=obj_name, id=obj['id'])
+            self.free_cells.remove((row, col))
+            self.light_positions.append((obj, row, col, size, 'light', name_in_map, obj_name, obj['id']))
         
         # for _, (x, y) in enumerate(original_path):  # original_path every single tile on the path
         #     self.map_data[self.season][y][x] = 'npc'
-        #     # self.empty_grids.remove((row, col))
+        #     # self.free_cells.remove((row, col))
         #     # placed_positions.append((row, col))
 
         #     # check if it's still possible
@@ -321,7 +402,9 @@ class GameMap:
             return 
         total_npc = 3
         all_npc = self.tilesets[self.season].get_npc()
-        self.npc_list = random.sample(all_npc, total_npc)
+        # same draw as sampling the surfaces, the ids are kept to rebuild them from a snapshot
+        self.npc_ids = random.sample(range(len(all_npc)), total_npc)
+        self.npc_list = [all_npc[i] for i in self.npc_ids]
         original_path = copy.deepcopy(self.path[1:-1]) # original path which we used to generate manual
         random.shuffle(original_path)
         x, y = original_path[0]
@@ -343,35 +426,28 @@ class GameMap:
         if count is None:
             count = self.npc
         all_npc = self.tilesets[self.season].get_npc()
-        self.npc_list = random.sample(all_npc, count)
+        self.npc_ids = random.sample(range(len(all_npc)), count)
+        self.npc_list = [all_npc[i] for i in self.npc_ids]
         size = (CHARACTER_WIDTH, CHARACTER_HEIGHT)
-        random.shuffle(self.empty_grids)
         placed_positions = []
-        for (row, col) in self.empty_grids:
-            if self.size_safe_to_place(size, row, col) and self.map_data[self.season][row][col] == 'land' and self.is_next_to_road(row, col, size):
-                self.place_item_at(row, col, (CHARACTER_WIDTH, CHARACTER_HEIGHT), 'npc', f"npc_0", f"npc_0")
-                self.empty_grids.remove((row, col))
-                placed_positions.append((row, col))
-                break
+        cell = self.free_cells.sample(self.safe_anchors(size) & self.road_side_anchors(size))
+        if cell is not None:
+            row, col = cell
+            self.place_item_at(row, col, (CHARACTER_WIDTH, CHARACTER_HEIGHT), 'npc', f"npc_0", f"npc_0")
+            self.free_cells.remove((row, col))
+            placed_positions.append((row, col))
             
         for idx in range(1, count):
-            best_position = None
-            max_min_distance = -1
-            for row, col in self.empty_grids:
-                if not (self.size_safe_to_place(size, row, col) and self.map_data[self.season][row][col] == 'land' and self.is_next_to_road(row, col, size)):
-                    continue
-                # Compute the minimum distance from all previously placed NPCs
-                min_distance = min(self.manhattan_distance((row, col), npc_pos) for npc_pos in placed_positions)
+            candidates = np.argwhere(self.free_cells.mask & self.safe_anchors(size) & self.road_side_anchors(size))
+            # Compute the minimum distance from all previously placed NPCs
+            placed = np.array(placed_positions)
+            min_distance = np.abs(candidates[:, None, :] - placed[None, :, :]).sum(axis=2).min(axis=1)
 
-                # Select the position that maximizes this minimum distance
-                if min_distance > max_min_distance:
-                    max_min_distance = min_distance
-                    best_position = (row, col)
-
-            row, col = best_position
+            # Select a position that maximizes this minimum distance
+            row, col = random.choice(candidates[min_distance == min_distance.max()].tolist())
             self.place_item_at(row, col, (CHARACTER_WIDTH, CHARACTER_HEIGHT), 'npc', f"npc_{idx}", f"npc_{idx}")
             placed_positions.append((row, col))
-            self.empty_grids.remove((row, col))
+            self.free_cells.remove((row, col))
 
 
     def manhattan_distance(self, pos1, pos2):
@@ -388,16 +464,17 @@ class GameMap:
 
     def place_houses(self, obj_type, count, size=(1, 1)):
         for i in range(count):
-            random.shuffle(self.empty_grids)
-            for row, col in self.empty_grids:
-                if self.size_safe_to_place(size, row, col) and not self.has_object_at(row, col, size) and self.is_next_to_road(row, col, size):
-                    if obj_type == 'house':
-                        self.place_item_at(row, col, size, obj_type, f"house_{i+1}")
-                    else:
-                        self.goal_pos = (row, col)
-                        self.place_item_at(row, col, size, obj_type, "destination")
-                    self.empty_grids.remove((row, col))
-                    break
+            cell = self.free_cells.sample(self.safe_anchors(size) & self.road_side_anchors(size),
+                                          lambda row, col: not self.has_object_at(row, col, size))
+            if cell is None:
+                continue
+            row, col = cell
+            if obj_type == 'house':
+                self.place_item_at(row, col, size, obj_type, f"house_{i+1}")
+            else:
+                self.goal_pos = (row, col)
+                self.place_item_at(row, col, size, obj_type, "destination")
+            self.free_cells.remove((row, col))
 
 
     def has_object_at(self, row, col, size=(1, 1), season=None):
@@ -413,36 +490,39 @@ class GameMap:
 
     def is_next_to_road(self, row, col, size=(1, 1)):
         for (y, x) in {(row-1, col), (row, col-1), (row+size[0], col+size[1]-1), (row + size[0]-1, col + size[1])}:
-                if 0 <= x < self.MAP_COLS * TILE_SIZE and 0 <= y < self.MAP_ROWS * TILE_SIZE and self.map_data[self.season][y][x] in ['road', 'grass']:
+                if 0 <= x < self.MAP_COLS * TILE_SIZE and 0 <= y < self.MAP_ROWS * TILE_SIZE and self.map_data[self.season][y, x] in (ROAD, GRASS):
                     return True
         return False
 
 
     def enclose_lands(self):
-        direction = [(1, 0), (0, 1), (-1, 0), (0, -1)]
-        for i in range(0, self.MAP_ROWS * TILE_SIZE):
-            for j in range(0, self.MAP_COLS * TILE_SIZE):
-                for d in direction:
-                    dx, dy = d
-                    y, x = i + dy, j + dx
-                    if 0 <= x < self.MAP_COLS * TILE_SIZE and 0 <= y < self.MAP_ROWS * TILE_SIZE and self.map_data[self.season][i][j] == 'land' and self.map_data[self.season][y][x] == 'road':
-                        self.map_data[self.season][i][j] = 'grass'
-                        self.objects[self.season].append({'type': 'grass', 'position': (i, j), 'size': (1, 1)})
+        # land next to a road (4-neighborhood) turns into grass
+        grid = self.map_data[self.season]
+        road = grid == ROAD
+        next_to_road = np.zeros_like(road)
+        next_to_road[1:, :] |= road[:-1, :]
+        next_to_road[:-1, :] |= road[1:, :]
+        next_to_road[:, 1:] |= road[:, :-1]
+        next_to_road[:, :-1] |= road[:, 1:]
+        enclosed = (grid == LAND) & next_to_road
+        grid[enclosed] = GRASS
+        for i, j in np.argwhere(enclosed).tolist():
+            self.objects[self.season].append({'type': 'grass', 'position': (i, j), 'size': (1, 1)})
 
     
     def place_smaller_objs(self, target_land, objects, counter, season='summer'):
-        while sum(row.count('land') for row in self.map_data[season]) > target_land:
+        while np.count_nonzero(self.map_data[season] == LAND) > target_land:
             # last_couter = counter
             for obj in objects:
-                random.shuffle(self.empty_grids)
                 size = (math.ceil(obj['height'] / GRID_SIZE), math.ceil(obj['width'] / GRID_SIZE))
-                for row, col in self.empty_grids:
-                    if self.size_safe_to_place(size, row, col, season=season) and not self.has_object_at(row, col, size, season=season):
-                        name_in_map, obj_color, obj_name = self.get_name(obj, counter)
-                        self.place_item_at(row, col, size, 'object', name_in_map, name=obj_name, id=obj['id'], color=obj_color, season=season)
-                        self.empty_grids.remove((row, col))
-                        counter += 1
-                        break
+                cell = self.free_cells.sample(self.safe_anchors(size, season=season),
+                                              lambda row, col: not self.has_object_at(row, col, size, season=season))
+                if cell is not None:
+                    row, col = cell
+                    name_in_map, obj_color, obj_name = self.get_name(obj, counter)
+                    self.place_item_at(row, col, size, 'object', name_in_map, name=obj_name, id=obj['id'], color=obj_color, season=season)
+                    self.free_cells.remove((row, col))
+                    counter += 1
     
 
     def place_special_objs(self, objects, counter, target=20):
@@ -452,15 +532,15 @@ class GameMap:
         while counter < target and counter != last_couter: # if we are not able to fit any of them let's stop
             last_couter = counter
             for obj in objects:
-                random.shuffle(self.empty_grids)
                 size = (math.ceil(obj['height'] / GRID_SIZE), math.ceil(obj['width'] / GRID_SIZE))
-                for row, col in self.empty_grids:
-                    if self.size_safe_to_place(size, row, col) and not self.has_object_at(row, col, size):
-                        name_in_map, obj_color, obj_name = self.get_name(obj, counter)
-                        self.place_item_at(row, col, size, 'object', name_in_map, name=obj_name, id=obj['id'], color=obj_color)
-                        self.empty_grids.remove((row, col))
-                        counter += 1
-                        break
+                cell = self.free_cells.sample(self.safe_anchors(size),
+                                              lambda row, col: not self.has_object_at(row, col, size))
+                if cell is not None:
+                    row, col = cell
+                    name_in_map, obj_color, obj_name = self.get_name(obj, counter)
+                    self.place_item_at(row, col, size, 'object', name_in_map, name=obj_name, id=obj['id'], color=obj_color)
+                    self.free_cells.remove((row, col))
+                    counter += 1
                 if counter >= target:
                     break
         return counter
@@ -484,19 +564,19 @@ class GameMap:
         while counter < target and counter != last_couter: # if we are not able to fit any of them let's stop
             last_couter = counter
             for obj in objects:
-                random.shuffle(self.empty_grids)
                 size = (math.ceil(obj['height'] / GRID_SIZE), math.ceil(obj['width'] / GRID_SIZE))
-                for row, col in self.empty_grids:
-                    if self.size_safe_to_place(size, row, col, season=seasons[0]) and not self.has_object_at(row, col, size, season=seasons[0]):
-                        obj_other_season = [x for x in target_boundaries if x['id'] == obj['id']][0]
-                        name_in_map, obj_color, obj_name = self.get_name(obj_other_season, counter)
-                        self.place_item_at(row, col, size, 'object', name_in_map, name=obj_name, id=obj_other_season['id'], season=seasons[1], color=obj_color)
-
-                        name_in_map, obj_color, obj_name = self.get_name(obj, counter)
-                        self.place_item_at(row, col, size, 'object', name_in_map, name=obj_name, id=obj['id'], season=seasons[0], color=obj_color)
-                        self.empty_grids.remove((row, col))
-                        counter += 1
-                        break
+                cell = self.free_cells.sample(self.safe_anchors(size, season=seasons[0]),
+                                              lambda row, col: not self.has_object_at(row, col, size, season=seasons[0]))
+                if cell is not None:
+                    row, col = cell
+                    obj_other_season = [x for x in target_boundaries if x['id'] == obj['id']][0]
+                    name_in_map, obj_color, obj_name = self.get_name(obj_other_season, counter)
+                    self.place_item_at(row, col, size, 'object', name_in_map, name=obj_name, id=obj_other_season['id'], season=seasons[1], color=obj_color)
+
+                    name_in_map, obj_color, obj_name = self.get_name(obj, counter)
+                    self.place_item_at(row, col, size, 'object', name_in_map, name=obj_name, id=obj['id'], season=seasons[0], color=obj_color)
+                    self.free_cells.remove((row, col))
+                    counter += 1
                 if counter >= target:
                     break
         return counter
@@ -504,7 +584,7 @@ class GameMap:
 
     def fill_land_with_objects(self):
         special_counter = 1
-        initial_land = sum(row.count('land') for row in self.map_data[self.season])
+        initial_land = np.count_nonzero(self.map_data[self.season] == LAND)
         if len(self.seasons) == 1:
             target_land = int(0.5*initial_land)
             with open(f'envs/cuterpg/utils/assets/{self.season}_boundaries.json') as f:
@@ -540,51 +620,76 @@ class GameMap:
         return
 
 
-    def draw(self):
+    def get_asset(self, path):
+        """Surface of a png, loaded from disk once per (season, file)."""
+        key = (self.season, path)
+        if key not in self.assets:
+            self.assets[key] = pygame.image.load(path).convert_alpha()
+        return self.assets[key]
+
+    def get_object_tile(self, obj):
+        obj_type = obj['type']
+        if obj_type == 'house':
+            return self.tilesets[self.season].get_house(16, 32, 8, 10)
+        elif obj_type == 'destination':
+            return self.tilesets[self.season].get_house(8, 32, 8, 10)
+        elif obj_type == 'grass':
+            return self.tilesets[self.season].get_object(25, 20, 1, 1)
+        elif obj_type == 'npc':
+            return self.npc_list[int(obj.get('name', '').split('_')[1])]
+        elif obj_type == 'object':
+            return self.get_asset(f"envs/cuterpg/utils/assets/{self.season}_objects/object_{obj['id']}.png")
+        elif obj_type == 'construction':
+            obj_file_name = obj['name'].split('_construction')[0]
+            return self.get_asset(f"envs/cuterpg/utils/assets/construction/{obj_file_name}.png")
+        elif obj_type == 'light':
+            return self.get_asset(f"envs/cuterpg/utils/assets/lights/object_{obj['id']}.png")
+        return None
+
+    def get_background(self):
+        """
+        Tiles and the objects that stay put, composited once per season and
+        rebuilt only when the roads, the highlighted paths or those objects change.
+        """
+        static_objects = [obj for obj in self.objects[self.season] if obj['type'] not in self.dynamic_types]
+        path = self.path or []
+        alter_path = self.alter_path if self.construction else []
+        key = ((corner_tiles(self.map_data[self.season]) == ROAD).tobytes(),
+               tuple(path),
+               tuple(alter_path),
+               tuple((obj['type'], obj['position'], obj.get('id'), obj.get('name')) for obj in static_objects))
+        cached = self.background.get(self.season)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        background = pygame.Surface(self.screen.get_size()).convert()
+        path, alter_path = set(path), set(alter_path)
         for row in range(0, self.MAP_ROWS * TILE_SIZE, TILE_SIZE):
             for col in range(0, self.MAP_COLS * TILE_SIZE, TILE_SIZE):
-                tile_type = self.map_data[self.season][row][col]
+                tile_type = self.map_data[self.season][row, col]
                 # for those on the gt path let's change color
-                if (col, row) in self.path:
+                if (col, row) in path:
                     tile = self.highlighted_road_tile
-                elif self.construction and (col, row) in self.alter_path:
+                elif (col, row) in alter_path:
                     tile = self.alter_road_tile
                 else:
-                    tile = self.road_tile if tile_type == 'road' else self.land_tile
-                tile = tile[self.season]
-                x = col * GRID_SIZE
-                y = row * GRID_SIZE
-                self.screen.blit(tile, (x, y))
+                    tile = self.road_tile if tile_type == ROAD else self.land_tile
+                background.blit(tile[self.season], (col * GRID_SIZE, row * GRID_SIZE))
 
+        for obj in static_objects:
+            obj_tile = self.get_object_tile(obj)
+            if obj_tile is not None:
+                row, col = obj['position']
+                background.blit(obj_tile, (col * GRID_SIZE, row * GRID_SIZE))
+        self.background[self.season] = (key, background)
+        return background
+
+    def draw(self):
+        self.screen.blit(self.get_background(), (0, 0))
         for obj in self.objects[self.season]:
-            obj_type = obj['type']
-            obj_name = obj.get('name', '')
-            row, col = obj['position']
-            
-            if obj_type == 'house':
-                obj_tile = self.tilesets[self.season].get_house(16, 32, 8, 10)
-            elif obj_type == 'destination':
-                obj_tile = self.tilesets[self.season].get_house(8, 32, 8, 10)
-            elif obj_type == 'grass':
-                obj_tile = self.tilesets[self.season].get_object(25, 20, 1, 1)
-            elif obj_type == 'npc':
-                obj_tile = self.npc_list[int(obj_name.split('_')[1])]
-            elif obj_type == 'object':
-                obj_filename = f"object_{obj['id']}.png"
-                if self.season == 'summer':
-                    obj_tile = pygame.image.load(f"envs/cuterpg/utils/assets/summer_objects/{obj_filename}").convert_alpha()
-                elif self.season == 'winter':
-                    obj_tile = pygame.image.load(f"envs/cuterpg/utils/assets/winter_objects/{obj_filename}").convert_alpha()
-            elif obj_type == 'construction':
-                obj_file_name = obj['name'].split('_construction')[0]
-                obj_tile = pygame.image.load(f"envs/cuterpg/utils/assets/construction/{obj_file_name}.png").convert_alpha()
-            elif obj_type == 'light':
-                obj_tile = pygame.image.load(f"envs/cuterpg/utils/assets/lights/object_{obj['id']}.png").convert_alpha()
-            else:
-                continue
-            x = col * GRID_SIZE
-            y = row * GRID_SIZE
-            self.screen.blit(obj_tile, (x, y))
+            if obj['type'] in self.dynamic_types:
+                row, col = obj['position']
+                self.screen.blit(self.get_object_tile(obj), (col * GRID_SIZE, row * GRID_SIZE))
             
             
     def step_before(self):
@@ -648,7 +753,7 @@ class GameMap:
                     pos for pos in neighbors
                     if 0 <= pos[0] < self.MAP_COLS
                     and 0 <= pos[1] < self.MAP_ROWS
-                    and self.map_data[self.season][pos[1] * TILE_SIZE][pos[0] * TILE_SIZE] != 'road'
+                    and self.map_data[self.season][pos[1] * TILE_SIZE, pos[0] * TILE_SIZE] != ROAD
                 ]
                 if non_road_neighbors:
                     target_tile = random.choice(non_road_neighbors)
@@ -661,10 +766,8 @@ class GameMap:
             new_col = target_tile[0] * TILE_SIZE + random.randint(1, 2)
             new_row = target_tile[1] * TILE_SIZE + random.randint(1, 2)
 
-            for i in range(row, row + CHARACTER_HEIGHT):
-                for j in range(col, col + CHARACTER_WIDTH):
-                    if 0 <= i < self.MAP_ROWS * TILE_SIZE and 0 <= j < self.MAP_COLS * TILE_SIZE:
-                        self.map_data[self.season][i][j] = self.underlying_map[self.season][i][j]
+            self.map_data[self.season][row:row + CHARACTER_HEIGHT, col:col + CHARACTER_WIDTH] = \
+                self.underlying_map[self.season][row:row + CHARACTER_HEIGHT, col:col + CHARACTER_WIDTH]
 
             # remove NPC from the old location
             self.objects[self.season] = [
@@ -680,20 +783,19 @@ class GameMap:
 
         
     def get_dominant_tile_type(self, row, col):
-        for i in range(row, row + CHARACTER_HEIGHT):
-            for j in range(col, col + CHARACTER_WIDTH):
-                if 0 <= i < self.MAP_ROWS * TILE_SIZE and 0 <= j < self.MAP_COLS * TILE_SIZE:
-                    tile = self.underlying_map[self.season][i][j]
-                    if tile == 'road':
-                        return 'road'
+        if (self.underlying_map[self.season][row:row + CHARACTER_HEIGHT, col:col + CHARACTER_WIDTH] == ROAD).any():
+            return 'road'
         return 'land'
 
     def revert_map(self,
                    map_data):
-        result = copy.deepcopy(map_data)
-        for season in self.seasons:
-            result[season] = [[item if item != "construction" else "road" for item in row] for row in result[season]]
-        return result
+        return {season: np.where(map_data[season] == CONSTRUCTION, ROAD, map_data[season]) for season in self.seasons}
+
+    def label_map(self, map_data=None):
+        # labels instead of codes, as the manual converters read the map
+        if map_data is None:
+            map_data = self.map_data
+        return {season: self.labels.decode(grid) for season, grid in map_data.items()}
     
 
     def get_map_manual_status(self,
@@ -716,7 +818,7 @@ class GameMap:
 
         if manual_type == 0:
             manual, _ = path_to_turn(path, 
-                                  self.map_data, 
+                                  self.label_map(), 
                                   self.mode,
                                   self.MAP_ROWS,
                                   self.MAP_COLS,
@@ -726,12 +828,12 @@ class GameMap:
         elif manual_type == 1:
             # perfect, number of tiles
             manual = convert_path_to_instructions(path, 
-                                                     self.map_data, 
+                                                     self.label_map(), 
                                                      self.mode)[0]
             manual = '\n'.join(manual)
         elif manual_type == 2:
             # perfect, observation based
-            map_data = self.revert_map(self.map_data)
+            map_data = self.label_map(self.revert_map(self.map_data))
             proto_manual, imperfect_info = convert_path_to_instructions(path, 
                                                                         map_data, 
                                                                         self.mode)
@@ -747,7 +849,7 @@ class GameMap:
                 
         elif manual_type == 3:
             manual, imperfect_info = path_to_turn(path, 
-                                                  self.map_data, 
+                                                  self.label_map(), 
                                                   self.mode,
                                                   self.MAP_ROWS,
                                                   self.MAP_COLS,
@@ -755,7 +857,7 @@ class GameMap:
                                                   wrong_turns=True)
             manual = '\n'.join(manual)
         elif manual_type == 4:
-            map_data = self.revert_map(self.map_data)
+            map_data = self.label_map(self.revert_map(self.map_data))
             proto_manual, imperfect_info = convert_path_to_instructions(path, 
                                                                         map_data, 
                                                                         self.mode, 
@@ -783,47 +885,28 @@ class GameMap:
         return manual
     
     def find_path_bfs(self, start, closet=None):
-        start = tuple((x // TILE_SIZE) * TILE_SIZE for x in start)
-
-        directions = [      # God's view (dx, dy)
-            (-TILE_SIZE, 0),    # up
-            (TILE_SIZE, 0),     # down
-            (0, -TILE_SIZE),    # left
-            (0, TILE_SIZE),     # right
-        ]
-
-        queue = deque([(start, [], 0)])   # (current_position, previous_path)
-        visited = set()
-        if closet is None:
-            closet = self.closet_to_goal_tiles()
-
-        while queue:
-            (x, y), path, dist = queue.popleft()
-
-            # change this to target tiles
-            if (x, y) in closet:
-                # we want to record this specific tile actually (maybe), so that it's easier to keep track of
-                self.specific_goal = (x, y)
-                return path + [(x, y)], dist
-
-            if (x, y) in visited:
-                continue
-
-            visited.add((x, y))
-
-            for dx, dy in directions:
-                nx, ny = x + dx, y + dy
-                if 0 <= ny < self.MAP_ROWS * TILE_SIZE and 0 <= nx < self.MAP_COLS * TILE_SIZE and self.is_pure_tile(ny, nx, 'road') and self.map_data[self.season][ny+1][nx+1] == 'road' and (nx, ny) not in visited:
-                    queue.append(((nx, ny), path + [(x, y)], dist+1))
-
-        return False, None
+        """
+        Shortest road path (tile corners, start and goal included) from `start` to
+        the goal (see distance_field), and its length. (False, None) if there is none.
+        """
+        field = self.distance_field(closet)
+        col, row = start[0] // TILE_SIZE, start[1] // TILE_SIZE
+        dist = field['dist'][row][col]
+        if dist < 0:
+            return False, None
+
+        path = [(col * TILE_SIZE, row * TILE_SIZE)]
+        while field['next'][row][col] is not None:
+            col, row = field['next'][row][col]
+            path.append((col * TILE_SIZE, row * TILE_SIZE))
+        # we want to record this specific tile actually (maybe), so that it's easier to keep track of
+        self.specific_goal = path[-1]
+        return path, dist
     
     def is_pure_tile(self, x, y, category):
-        for i in range((x // TILE_SIZE) * TILE_SIZE, (x // TILE_SIZE) * TILE_SIZE + TILE_SIZE):
-            for j in range((y // TILE_SIZE) * TILE_SIZE, (y // TILE_SIZE) * TILE_SIZE + TILE_SIZE):
-                if self.map_data[self.season][i][j] != category:
-                    return False
-        return True
+        code = self.labels.codes.get(category)
+        row, col = (x // TILE_SIZE) * TILE_SIZE, (y // TILE_SIZE) * TILE_SIZE
+        return code is not None and bool((self.map_data[self.season][row:row + TILE_SIZE, col:col + TILE_SIZE] == code).all())
 
     
     def generate_obstructed_path(self, start):
@@ -832,7 +915,7 @@ class GameMap:
         random.shuffle(original_path)
 
         for _, (x, y) in enumerate(original_path):  # original_path every single tile on the path
-            self.map_data[self.season][y][x] = 'construction'
+            self.map_data[self.season][y, x] = CONSTRUCTION
 
             # check if it's still possible
             new_path, dist = self.find_path_bfs(start, [self.specific_goal])
@@ -847,6 +930,6 @@ class GameMap:
                 self.place_item_at(y+1, x+1, size, 'construction', name_in_map, name=obj_name, id=obj['id'])
                 return new_path, dist
             else:
-                self.map_data[self.season][y][x] == 'road'
+                self.map_data[self.season][y, x] == ROAD
 
         return None, None
@@ -5,7 +5,8 @@ from envs.cuterpg.utils.assets.label_to_description import LABEL_TO_DESCRIPTION,
 from pdb import set_trace as st
 
 
-def get_first_person(pos, direction, map_data, season, MAP_ROWS, MAP_COLS, TILE_SIZE):
+def get_first_person(pos, direction, map_data, season, MAP_ROWS, MAP_COLS, TILE_SIZE, labels=None):
+    # labels: names of the codes when map_data holds the coded grids of the GameMap
     (x, y) = pos
     agent_tile_x = x // TILE_SIZE
     agent_tile_y = y // TILE_SIZE
@@ -24,7 +25,7 @@ def get_first_person(pos, direction, map_data, season, MAP_ROWS, MAP_COLS, TILE_
                 if x-1<=nx<=x+1 and y-1<=ny<=y+1:
                     row.append('agent')
                 else:
-                    row.append(map_data[season][ny][nx])
+                    row.append(map_data[season][ny][nx] if labels is None else labels[map_data[season][ny, nx]])
             else:
                 row.append("void")
         observation.append(row)
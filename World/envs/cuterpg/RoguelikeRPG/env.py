@@ -1,6 +1,5 @@
-import copy
+import pickle
 from typing import Dict, Any, List, Optional, Tuple
-from common.llms import llm
 from .game import Game
 from .constants import GameMode
 from pdb import set_trace as st
@@ -48,17 +47,53 @@ class Env:
         Returns:
             str: Initial observation
         """
-        # Reinitialize the game
-        self.game = Game(mode=self.mode,
-                         shuffle_container=self.shuffle_container,
-                         single_level_enemy=self.single_level_enemy,
-                         shuffle_enemy=self.shuffle_enemy,
-                         reversible=self.reversible,
-                         item_rename=self.item_rename)
+        return self.start_game(self.generate_game())
+
+    def generate_game(self) -> Game:
+        """
+        Generate a new game (levels and a solution for them).
         
-        self.initial_game = copy.deepcopy(self.game)
+        Returns:
+            Game: The generated game, not started yet
+        """
+        return Game(mode=self.mode,
+                    shuffle_container=self.shuffle_container,
+                    single_level_enemy=self.single_level_enemy,
+                    shuffle_enemy=self.shuffle_enemy,
+                    reversible=self.reversible,
+                    item_rename=self.item_rename)
 
+    def start_game(self, game: Game) -> str:
+        """
+        Start a generated game.
+        
+        Args:
+            game: Game from generate_game (or a saved copy of one)
+            
+        Returns:
+            str: Initial observation
+        """
+        self.game = game
         return self.reset_void()
+
+    def snapshot(self) -> bytes:
+        """
+        Snapshot of the game and episode state.
+        
+        Returns:
+            bytes: The pickled state, restored much faster than a deepcopy of the game
+        """
+        return pickle.dumps((self.game, self.done, self.last_reward, self.observation, self.last_hp, self.last_inventory),
+                            protocol=pickle.HIGHEST_PROTOCOL)
+
+    def restore(self, snapshot: bytes):
+        """
+        Go back to a snapshot.
+        
+        Args:
+            snapshot: State from snapshot
+        """
+        self.game, self.done, self.last_reward, self.observation, self.last_hp, self.last_inventory = pickle.loads(snapshot)
         
     
     def reset_void(self):
@@ -3,6 +3,7 @@ Solution manager to ensure games are solvable with guaranteed paths to defeat bo
 """
 import random
 import copy
+import functools
 from collections import defaultdict
 from typing import List
 from envs.cuterpg.RoguelikeRPG.constants import Element, BASE_MATERIALS
@@ -16,6 +17,16 @@ from envs.cuterpg.RoguelikeRPG.constants import ITEM_WEIGHT_MAP, ADVANCED_WEAPON
 from ..systems.virtual_inventory import VirtualInventory
 from pdb import set_trace as st
 
+
+# module level (not lambdas) so that a generated game can be pickled (world cache, env snapshots)
+def _item_counts():
+    return defaultdict(int)
+
+
+def _shopkeeper_hint(shop_level, shop_hint):
+    return {"success": True, "message": f"{shop_level.shopkeeper_name} says: {shop_hint}"}
+
+
 class SolutionManager:
     """
     Manages the solution path for the game, ensuring that players can
@@ -527,7 +538,7 @@ class SolutionManager:
             ]
             
             shop_hint = random.choice(shop_dialogs)
-            shop_level._talk_to_shopkeeper = lambda: {"success": True, "message": f"{shop_level.shopkeeper_name} says: {shop_hint}"}
+            shop_level._talk_to_shopkeeper = functools.partial(_shopkeeper_hint, shop_level, shop_hint)
 
 
     def get_recommended_weapon(self):
@@ -641,7 +652,7 @@ class SolutionManager:
 
         elif manual_type == 2:
             lines.append("You will need to collect items from the following levels:")
-            level_to_items = defaultdict(lambda: defaultdict(int))
+            level_to_items = defaultdict(_item_counts)
 
             # required_placed
             for level in self.required_placed:
@@ -663,7 +674,7 @@ class SolutionManager:
                     
         elif manual_type in [3, 5]:
             lines.append("You will need to collect items from the following levels:")
-            level_to_items = defaultdict(lambda: defaultdict(int))
+            level_to_items = defaultdict(_item_counts)
 
             # required_placed
             for level in self.required_placed:
@@ -693,7 +704,7 @@ class SolutionManager:
 
         elif manual_type == 4:
             lines.append("Make sure to collect items when you are at these levels:")
-            level_to_items = defaultdict(lambda: defaultdict(int))
+            level_to_items = defaultdict(_item_counts)
 
             # required_placed
             for level in self.required_placed:
@@ -4,6 +4,8 @@ from .Cooking.config import WINDOW_WIDTH, WINDOW_HEIGHT
 from .Cooking.character import Character
 from .Cooking.map import GameMap
 from .Cooking.env import Env
+from .utils.seeding import seed_everything
+from .utils.display import claim_display
 from pdb import set_trace as st
 
 class CookingEnv(gym.Env):
@@ -17,8 +19,7 @@ class CookingEnv(gym.Env):
         self.n_servings = kwargs.get("n_servings", 1)
 
         pygame.init()
-        self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-        pygame.display.set_caption("Cooking")
+        self.screen = claim_display((WINDOW_WIDTH, WINDOW_HEIGHT), "Cooking")
 
         self.env = Env( self.mode,
                         self.crop_gone,
@@ -26,6 +27,8 @@ class CookingEnv(gym.Env):
                         self.storage_loss,
                         self.n_servings,
                         )
+        # envs.cuterpg.utils.world_cache.WorldCache, set by load_env with --world_cache
+        self.world_cache = None
 
     def step(self, action):
         obs, reward, done, info = self.env.take_action(action)
@@ -35,17 +38,37 @@ class CookingEnv(gym.Env):
     def get_status(self):
         return self.env.take_action('status')
     
-    def reset(self):
-        obs = self.env.reset()
+    def reset(self, seed=None):
+        # with a task seed, the same dishes and ingredient locations are generated every time
+        if seed is not None:
+            seed_everything(seed)
+        world = self.world_cache.load(seed) if self.world_cache is not None else None
+        if world is None:
+            world = self.env.generate_task()
+            if self.world_cache is not None:
+                self.world_cache.save(seed, world)
+        obs = self.env.start_task(world)
+        # what back_to_start goes back to
+        self.initial_snapshot, self.initial_obs = self.snapshot(), obs
         self.update_screen()
         return obs
+
+    def snapshot(self):
+        # state of the current task that actions can change, nothing generated by reset
+        return self.env.snapshot()
+
+    def restore(self, snapshot):
+        self.env.restore(snapshot)
+        self.update_screen()
     
     def back_to_start(self):
-        obs = self.env.rewind()
-        self.update_screen()
-        return obs
+        # state right after reset, for the next trial of the same task
+        self.restore(self.initial_snapshot)
+        return self.initial_obs
     
     def update_screen(self):
+        # another env of the process may have resized the display since the last frame
+        self.screen = claim_display((WINDOW_WIDTH, WINDOW_HEIGHT), "Cooking")
         self.screen.fill((0, 0, 0))
         self.env.map.draw(self.screen)
         self.env.character.draw(self.screen)
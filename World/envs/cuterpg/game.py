@@ -1,5 +1,6 @@
 import gym
 from .RoguelikeRPG.env import Env
+from .utils.seeding import seed_everything
 from pdb import set_trace as st
 
 class GameEnv(gym.Env):
@@ -28,6 +29,12 @@ class GameEnv(gym.Env):
                        shuffle_enemy=self.shuffle_enemy,
                        reversible=self.reversible,
                        item_rename=self.item_rename)
+        # envs.cuterpg.utils.world_cache.WorldCache, set by load_env with --world_cache
+        self.world_cache = None
+        # False when no trial goes back to the start (see run_task), the start is not kept then
+        self.rewind = True
+        self.initial_snapshot = None
+        self.start_pending = False
 
     def step(self, action):
         """
@@ -39,20 +46,65 @@ class GameEnv(gym.Env):
         Returns:
             Tuple of (observation, reward, done, info)
         """
+        self.keep_start()
         obs, reward, done, info = self.env.take_action(action)
         return obs, reward, done, info
 
-    def reset(self):
+    def reset(self, seed=None):
         """
         Reset the environment.
         
+        Args:
+            seed: Optional task seed, the same game is generated for the same seed
+            
         Returns:
             Initial observation
         """
-        return self.env.reset()
+        if seed is not None:
+            seed_everything(seed)
+        game = self.world_cache.load(seed) if self.world_cache is not None else None
+        if game is None:
+            game = self.env.generate_game()
+            if self.world_cache is not None:
+                self.world_cache.save(seed, game)
+        obs = self.env.start_game(game)
+        # what back_to_start goes back to, kept only before the game first changes (see keep_start)
+        self.initial_snapshot = None
+        self.start_pending = self.rewind
+        return obs
+
+    def keep_start(self):
+        # called before anything changes the game (steps, get_manual restarting it)
+        if self.start_pending:
+            self.initial_snapshot = self.snapshot()
+            self.start_pending = False
+
+    def snapshot(self):
+        """
+        Snapshot of the state of the current game, nothing is regenerated by restore.
+        
+        Returns:
+            Opaque snapshot for restore
+        """
+        return self.env.snapshot()
+
+    def restore(self, snapshot):
+        """
+        Go back to a snapshot of the current game.
+        
+        Args:
+            snapshot: Snapshot from snapshot()
+        """
+        self.env.restore(snapshot)
     
     def back_to_start(self):
-        self.env.game = self.env.initial_game
+        # state right after reset, for the next trial of the same game
+        if self.initial_snapshot is not None:
+            self.restore(self.initial_snapshot)
+        elif not self.start_pending:
+            raise RuntimeError("The start of the game was not kept, back_to_start needs rewind=True at reset")
+        # else no step was taken, the game is still at the start
+        return self.env.observation
     
     def render(self, mode='human'):
         """
@@ -83,6 +135,7 @@ class GameEnv(gym.Env):
         Returns:
             Tuple of (manual_text, additional_info)
         """
+        self.keep_start()
         manual = self.env.get_manual(manual_type)
         obs = self.env.reset_void()
         return obs, manual
@@ -3,6 +3,8 @@ import gym
 import pygame
 from .utils.config import TILE_SIZE
 from .utils.charactersprite import CharacterSprite
+from .utils.seeding import seed_everything
+from .utils.display import claim_display
 from .NavigationMap.navigationMap import GameMap
 from .NavigationMap.main_character import NavigationCharacter
 from .NavigationMap.env import Env
@@ -27,8 +29,8 @@ class NavigationEnv(gym.Env):
         map_cols = kwargs.get('map_cols', 12)
         
         pygame.init()
-        self.screen = pygame.display.set_mode((window_width, window_height))
-        pygame.display.set_caption("Navigation Map")
+        self.window_size = (window_width, window_height)
+        self.screen = claim_display(self.window_size, "Navigation Map")
 
         self.character_sprite = CharacterSprite()
         self.game_map = GameMap(self.screen,
@@ -44,12 +46,24 @@ class NavigationEnv(gym.Env):
                                 )
         self.character = NavigationCharacter(self.character_sprite, self.game_map, step_size=TILE_SIZE)
         self.env = Env(self.game_map, self.character, npc_manual_lst, obs_type=self.obs_type)
+        # envs.cuterpg.utils.world_cache.WorldCache, set by load_env with --world_cache
+        self.world_cache = None
     
     def record_initial(self):
         self.initial_pos = self.character.position
         self.initial_dir = self.character.direction
+        # what back_to_start goes back to
+        self.initial_snapshot = self.snapshot()
 
-    def reset(self):
+    def reset(self, seed=None):
+        # with a task seed, the same map, goal and manual are generated every time
+        if seed is not None:
+            seed_everything(seed)
+        world = self.world_cache.load(seed) if self.world_cache is not None else None
+        if world is not None:
+            self.load_world(world)
+            self.update_screen()
+            return world['obs']
         done = True
         while done:
             # in case a task diectly succeeds
@@ -60,7 +74,22 @@ class NavigationEnv(gym.Env):
         obs, reward, done, info = self.env.take_action('void')
         self.record_initial()
         self.update_screen()
+        if self.world_cache is not None:
+            self.world_cache.save(seed, self.dump_world(obs))
         return obs
+
+    def dump_world(self, obs):
+        # the state right after reset, without the pygame surfaces
+        return {'obs': obs,
+                'game_map': self.game_map.get_state(),
+                'character': (self.character.position, self.character.direction),
+                'env': (self.env.num_rounds, self.env.last_obs)}
+
+    def load_world(self, world):
+        self.game_map.set_state(world['game_map'])
+        self.character.position, self.character.direction = world['character']
+        self.env.num_rounds, self.env.last_obs = world['env']
+        self.record_initial()
     
     def rewind(self):
         # go back to the initial state
@@ -69,13 +98,18 @@ class NavigationEnv(gym.Env):
         obs, reward, done, info = self.env.take_action('void')
         return obs, reward, done, info
     
-    def back_to_start(self):
-        self.env.game_map.map_data = self.env.initial_map
-        # self.character = self.initial_character
-        self.env.num_rounds = 0
-        obs = self.rewind()[0]
+    def snapshot(self):
+        # state of the current task that steps can change, nothing generated by reset
+        return self.env.snapshot()
+
+    def restore(self, snapshot):
+        self.env.restore(snapshot)
         self.update_screen()
-        return obs
+
+    def back_to_start(self):
+        # state right after reset, for the next trial of the same task
+        self.restore(self.initial_snapshot)
+        return self.env.last_obs
 
     def get_horizon(self):
         return self.game_map.max_horizon
@@ -85,6 +119,17 @@ class NavigationEnv(gym.Env):
         self.update_screen()
         return obs, reward, done, info
     
+    def oracle_action(self):
+        # next action along the bfs shortest path to the goal, used as the scripted `mock` llm policy
+        path, _ = self.game_map.find_path_bfs(self.character.position)
+        if not path or len(path) < 2:
+            return 'forward'
+        (x0, y0), (x1, y1) = path[0], path[1]
+        steps = {(TILE_SIZE, 0): 'east', (0, TILE_SIZE): 'south', (-TILE_SIZE, 0): 'west', (0, -TILE_SIZE): 'north'}
+        directions = ['east', 'south', 'west', 'north']
+        turn = (directions.index(steps[(x1 - x0, y1 - y0)]) - directions.index(self.character.direction)) % 4
+        return ['forward', 'turn right', 'turn around', 'turn left'][turn]
+
     def get_gt_mode(self):
         status = self.env.game_map.get_map_manual_status(self.character.position,
                                        self.character.direction)
@@ -94,6 +139,8 @@ class NavigationEnv(gym.Env):
         self.game_map.switch_season()
 
     def update_screen(self):
+        # another env of the process may have resized the display since the last frame
+        self.screen = self.game_map.screen = claim_display(self.window_size, "Navigation Map")
         self.screen.fill((0, 0, 0))
         self.game_map.draw()
         self.character.draw(self.screen)
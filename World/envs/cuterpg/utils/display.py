@@ -0,0 +1,15 @@
+import pygame
+from pdb import set_trace as st
+
+
+def claim_display(size, caption):
+    """
+    The pygame display at `size`. A process has a single display, shared by
+    all its envs (e.g. the warm envs of a sweep worker), so an env sets it up
+    again before drawing if another env resized it in the meantime.
+    """
+    screen = pygame.display.get_surface()
+    if screen is None or screen.get_size() != tuple(size):
+        screen = pygame.display.set_mode(size)
+        pygame.display.set_caption(caption)
+    return screen
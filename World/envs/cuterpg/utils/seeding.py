@@ -0,0 +1,19 @@
+import random
+import hashlib
+import numpy as np
+from pdb import set_trace as st
+
+
+def task_seed(seed, env_id, task_idx):
+    """
+    Seed of one task, derived from (run seed, env id, task index) only, so any
+    task can be regenerated on its own, in any order and on any worker.
+    """
+    digest = hashlib.sha256(f"{seed}:{env_id}:{task_idx}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:4], 'little')
+
+
+def seed_everything(seed):
+    # the envs draw from the global python and numpy generators
+    random.seed(seed)
+    np.random.seed(seed)
@@ -0,0 +1,190 @@
+import os
+import time
+import zlib
+import pickle
+import multiprocessing as mp
+import numpy as np
+import gym
+from .config import TILE_SIZE
+from .seeding import task_seed
+from .world_cache import WORLD_CACHE_VERSION, pack_world, unpack_world
+from ..NavigationMap.grid import pure_tiles, ROAD
+from pdb import set_trace as st
+
+# per task stats summed up in the bundle summary
+STAT_KEYS = ('path_length', 'branches', 'horizon', 'detour_length', 'seconds')
+
+# env of each env id in a generator process
+_envs = {}
+
+
+def world_stats(env):
+    """Path length and branches (in tiles) and horizon of the navigation task just reset."""
+    game_map = env.game_map
+    # the roads as generated, before the npcs and the construction
+    road = pure_tiles(game_map.underlying_map[game_map.seasons[0]], ROAD)
+    rows, cols = road.shape
+    tiles = [(x // TILE_SIZE, y // TILE_SIZE) for x, y in game_map.path]
+    # intersections passed on the way, where the agent has to pick the right road
+    branches = 0
+    for col, row in tiles[1:-1]:
+        ways = sum(1 for dx, dy in game_map.MOVES
+                   if 0 <= row + dy < rows and 0 <= col + dx < cols and road[row + dy, col + dx])
+        branches += ways > 2
+    stats = {'path_length': len(tiles) - 1,
+             'branches': branches,
+             'horizon': game_map.max_horizon}
+    if game_map.construction:
+        stats['detour_length'] = len(game_map.alter_path) - 1
+    return stats
+
+
+def validate_world(env):
+    """What is wrong with the navigation task just reset, empty if nothing."""
+    game_map = env.game_map
+    problems = []
+    if not game_map.path or len(game_map.path) < 2:
+        problems.append("no path from the start to the goal")
+    else:
+        start_x, start_y = game_map.start_position
+        if game_map.path[0] != (start_x // TILE_SIZE * TILE_SIZE, start_y // TILE_SIZE * TILE_SIZE):
+            problems.append("the path does not begin at the start")
+        if game_map.max_horizon < len(game_map.path):
+            problems.append("the horizon is shorter than the path")
+    if game_map.construction and not game_map.alter_path:
+        problems.append("no detour around the construction")
+    return problems
+
+
+def generate_world(env_id, seed, task_name):
+    """
+    Generate and check the world of one task, the one main.py plays for run
+    seed `seed`. Returns (task name, task seed, packed snapshot, stats, problems).
+    """
+    if env_id not in _envs:
+        _envs[env_id] = gym.make(env_id).unwrapped
+    env = _envs[env_id]
+    env.world_cache = None
+    seed_of_task = task_seed(seed, env_id, task_name)
+    start = time.time()
+    obs = env.reset(seed=seed_of_task)
+    # packed right away, with the generator states a WorldCache would save
+    snapshot = pack_world(env_id, seed_of_task, env.dump_world(obs))
+    stats = world_stats(env)
+    stats['seconds'] = round(time.time() - start, 3)
+    packed = zlib.compress(pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL))
+    return task_name, seed_of_task, packed, stats, validate_world(env)
+
+
+def _generate_job(job):
+    return generate_world(*job)
+
+
+def _init_generator():
+    # no window in the generator processes
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ['SDL_AUDIODRIVER'] = 'dummy'
+    # SDL's SIGTERM handler would swallow the signal of pool.terminate()
+    os.environ['SDL_NO_SIGNAL_HANDLERS'] = '1'
+
+
+def summarize(stats):
+    summary = {}
+    for key in STAT_KEYS:
+        values = [task[key] for task in stats.values() if key in task]
+        if values:
+            summary[key] = {'mean': round(float(np.mean(values)), 2), 'min': min(values), 'max': max(values)}
+    return summary
+
+
+def generate_bundle(env_id, path, n_tasks, seed=0, num_workers=1, log=print):
+    """
+    Pre-generate the worlds of tasks 0..n_tasks-1 of a navigation env, as main.py
+    seeds them for the run seed `seed`, over `num_workers` processes, and save
+    them with their stats as one bundle file at `path` (see WorldBundle).
+    Worlds failing validate_world are left out, reset generates them as usual.
+    Returns the bundle summary.
+    """
+    if not gym.spec(env_id).entry_point.endswith(':NavigationEnv'):
+        raise ValueError(f"{env_id} is not a navigation env, only those can be bundled")
+    jobs = [(env_id, seed, task_name) for task_name in range(n_tasks)]
+    if num_workers > 1:
+        # spawn, pygame is not fork safe (see collect_trajs_parallel)
+        pool = mp.get_context('spawn').Pool(num_workers, initializer=_init_generator)
+        results = pool.imap_unordered(_generate_job, jobs)
+    else:
+        pool = None
+        results = map(_generate_job, jobs)
+
+    worlds, stats, rejected = {}, {}, {}
+    try:
+        for done, (task_name, seed_of_task, packed, task_stats, problems) in enumerate(results, 1):
+            if problems:
+                rejected[task_name] = problems
+                log(f"\033[31mTask {task_name} rejected:\033[0m {'; '.join(problems)}")
+            else:
+                worlds[seed_of_task] = packed
+                stats[task_name] = dict(task_stats, seed=seed_of_task)
+            if done % 10 == 0 or done == n_tasks:
+                log(f"\033[32mGenerated:\033[0m {done}/{n_tasks} worlds of {env_id}")
+    except BaseException:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        raise
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    summary = dict(summarize(stats), worlds=len(worlds), rejected=len(rejected))
+    bundle = {'version': WORLD_CACHE_VERSION,
+              'env_id': env_id,
+              'seed': seed,
+              'worlds': worlds,
+              'stats': dict(sorted(stats.items())),
+              'rejected': rejected,
+              'summary': summary}
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    # write then rename, a run may be loading the previous bundle
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(bundle, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return summary
+
+
+class WorldBundle(object):
+    """
+    Worlds pre-generated by generate_bundle, looked up by task seed. Same
+    interface as WorldCache, the envs use it as their `world_cache`: reset only
+    unpacks the world. Tasks missing from the bundle are generated at reset and
+    saved to `fallback` (a WorldCache) if there is one.
+    """
+    def __init__(self, path, env_id, seed, fallback=None):
+        with open(path, 'rb') as f:
+            bundle = pickle.load(f)
+        if bundle.get('version') != WORLD_CACHE_VERSION:
+            raise ValueError(f"World bundle {path} is from an older world generation, generate it again")
+        if bundle['env_id'] != env_id or bundle['seed'] != seed:
+            raise ValueError(f"World bundle {path} holds the {bundle['env_id']} worlds of seed {bundle['seed']}, "
+                             f"not the {env_id} worlds of seed {seed}")
+        self.path = path
+        self.worlds = bundle['worlds']
+        self.stats = bundle['stats']
+        self.summary = bundle['summary']
+        self.fallback = fallback
+
+    def __len__(self):
+        return len(self.worlds)
+
+    def load(self, seed):
+        packed = self.worlds.get(seed)
+        if packed is None:
+            return self.fallback.load(seed) if self.fallback is not None else None
+        return unpack_world(pickle.loads(zlib.decompress(packed)))
+
+    def save(self, seed, world):
+        # only the worlds missing from the bundle get here
+        if self.fallback is not None:
+            self.fallback.save(seed, world)
@@ -0,0 +1,65 @@
+import os
+import pickle
+import random
+import numpy as np
+from pdb import set_trace as st
+
+# bump whenever the world generation changes, older snapshots are then regenerated
+WORLD_CACHE_VERSION = 3
+
+
+def pack_world(env_id, seed, world):
+    """Snapshot of a world just generated, with the random generator states at this point."""
+    return {'version': WORLD_CACHE_VERSION,
+            'env_id': env_id,
+            'seed': seed,
+            'world': world,
+            'random_state': random.getstate(),
+            'np_random_state': np.random.get_state()}
+
+
+def unpack_world(snapshot):
+    """The world of a snapshot, restoring the random generator states it was saved with."""
+    random.setstate(snapshot['random_state'])
+    np.random.set_state(snapshot['np_random_state'])
+    return snapshot['world']
+
+
+class WorldCache(object):
+    """
+    Generated worlds saved to disk, one snapshot per (env id, task seed), so that
+    only the first run pays for the generation and every model compared on an
+    env plays exactly the same tasks.
+    A snapshot also holds the random generator states at the time it was saved,
+    so everything drawn after loading it matches a freshly generated world.
+    """
+    def __init__(self, folder, env_id):
+        self.env_id = env_id
+        self.folder = f"{folder}/{env_id}"
+        os.makedirs(self.folder, exist_ok=True)
+
+    def path(self, seed):
+        return f"{self.folder}/{seed}.pkl"
+
+    def load(self, seed):
+        """The world saved for this task seed, None if there is none (or it is stale)."""
+        if seed is None or not os.path.exists(self.path(seed)):
+            return None
+        try:
+            with open(self.path(seed), 'rb') as f:
+                snapshot = pickle.load(f)
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None
+        if snapshot.get('version') != WORLD_CACHE_VERSION or snapshot.get('env_id') != self.env_id:
+            return None
+        return unpack_world(snapshot)
+
+    def save(self, seed, world):
+        if seed is None:
+            return
+        snapshot = pack_world(self.env_id, seed, world)
+        # write then rename, parallel workers may be loading the same task
+        tmp_path = f"{self.path(seed)}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path(seed))
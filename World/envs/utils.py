@@ -5,7 +5,11 @@ import gym
 
 from pdb import set_trace as st
 
-from envs.cuterpg import *
+# registers the env ids only, gym.make imports the env package of an id on first use
+import envs.cuterpg
+from envs.cuterpg.utils.seeding import task_seed
+from envs.cuterpg.utils.world_cache import WorldCache
+from envs.cuterpg.utils.world_bundle import WorldBundle
     
 
 def is_env_registered(env_id):
@@ -25,4 +29,13 @@ def load_env(args, is_train=False):
         env = gym.make(args.env)
     else:
         st()
+    world_cache = None
+    if getattr(args, 'world_cache', None):
+        # generated worlds are saved on first use and reloaded by every later run
+        world_cache = WorldCache(args.world_cache, args.env)
+    if getattr(args, 'world_bundle', None):
+        # worlds pre-generated by pregenerate.py, the missing ones go through the cache above
+        world_cache = WorldBundle(args.world_bundle, args.env, args.seed, fallback=world_cache)
+    if world_cache is not None:
+        env.unwrapped.world_cache = world_cache
     return env
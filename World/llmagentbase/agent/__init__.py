@@ -4,6 +4,7 @@ from .chef import Chef
 from .adventurer import Adventurer
 from .cook_planner import CookPlanner
 from .game_planner import GamePlanner
+from llmagentbase.prompts.builder import PromptBuilder
 from pdb import set_trace as st
 
 
@@ -68,6 +69,8 @@ def build_agent(env,
                                     args.agent_model,
                                     train_temperature,
                                     manual)
-        
-        
+
+    if getattr(args, 'structured_prompt', False):
+        agent.prompt_builder = PromptBuilder(instruction, in_context)
+    agent.enable_pipeline_think(getattr(args, 'pipeline_think', False))
     return agent
\ No newline at end of file
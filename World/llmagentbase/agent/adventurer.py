@@ -24,22 +24,14 @@ class Adventurer(Agent):
         self.available_actions = []
         self.mode_recs = []
 
-    def construct_prompt(self, traj):
+    def task_prompt(self):
         if self.manual_type is None:
             if self.reflection:
-                prompt = f"{self.instruction}\n{self.in_context}\nNow it's your turn:\nSomething useful:\n{self.manual}\n\n{self.reflection}\nTry your best to complete the game:\n"
-            else:
-                prompt = f"{self.instruction}\n{self.in_context}\nNow it's your turn:\nSomething useful:\n{self.manual}\n\nTry your best to complete the game:\n"
-        else:
-            if self.reflection:
-                prompt = f"{self.instruction}\n{self.in_context}\nNow it's your turn:\nStrategy Guide for Roguelike Game:\n{self.manual}\n\n{self.reflection}\nTry your best to complete the game:\n"
-            else:
-                prompt = f"{self.instruction}\n{self.in_context}\nNow it's your turn:\nStrategy Guide for Roguelike Game:\n{self.manual}\n\nTry your best to complete the game:\n"
-        prompt += f"{traj}\nAction: "
-        # if self.reflection:
-        # print(prompt)
-        # st()
-        return prompt
+                return f"Something useful:\n{self.manual}\n\n{self.reflection}\nTry your best to complete the game:\n"
+            return f"Something useful:\n{self.manual}\n\nTry your best to complete the game:\n"
+        if self.reflection:
+            return f"Strategy Guide for Roguelike Game:\n{self.manual}\n\n{self.reflection}\nTry your best to complete the game:\n"
+        return f"Strategy Guide for Roguelike Game:\n{self.manual}\n\nTry your best to complete the game:\n"
     
     def reset_env(self):
         reward, done, info = 0, False, {}
@@ -47,7 +39,7 @@ class Adventurer(Agent):
         step_count = 0
 
         if self.trial == 0:
-            observation = self.env.reset()
+            observation = self.env.reset(seed=self.task_seed)
         else:
             self.env.back_to_start()
         observation, self.manual = self.env.get_manual(self.manual_type)
@@ -72,6 +64,7 @@ class Adventurer(Agent):
         self.trial = trial
         self.reflection = reflection
         observation, reward, done, info, epi_history, step_count = self.reset_env()
+        self.log_prompt_prefix()
         self.logger.colored_log(f"Observation {step_count}:", observation, color="blue")
         self.logger.log()
         
@@ -155,6 +148,7 @@ class Adventurer(Agent):
 
             self.logger.colored_log(f"Action {step_count}:", action, color="blue")
             self.logger.colored_log(f"Observation {step_count+1}:", observation, color="blue")
+            self.logger.log_step(step_count, action, observation, reward)
             self.logger.log() 
             if "You have been defeated! Game over." in observation:
                 done = True
@@ -1,9 +1,12 @@
 import re
-from common.llms import llm, token_num
+from common.llms import llm, token_num, streams_output, TokenCounter
 from pdb import set_trace as st
 
 
 class Agent:
+    # what a think step adds to the prompt: the env answers 'OK.' and the next action is asked for
+    think_suffix = "\nObservation: OK.\n\nAction: "
+
     def __init__(   self, 
                     env,
                     instruction,
@@ -18,6 +21,15 @@ class Agent:
         self.logger = logger
         self.model_name = model_name
         self.temperature = temperature
+        self.token_counter = TokenCounter()
+        # set to a PromptBuilder to send prompts as prefix-cache friendly chat messages
+        self.prompt_builder = None
+        # let the llm generate past a think action and prefetch the action after it
+        self.pipeline_think = False
+        self.prefetched = None
+        self.prefetch_stats = {'hits': 0, 'misses': 0}
+        # seed of the current task, passed to env.reset (see envs.utils.task_seed)
+        self.task_seed = None
     
     def format_action(self, action):
         action_splitter = "```"
@@ -45,28 +57,126 @@ class Agent:
         return result[:-1]
     
     def get_action(self, prompt, max_tokens, stop, reset_context=False):
-        print(token_num(prompt))
+        if self.prefetched is not None:
+            next_prompt, next_action = self.prefetched
+            self.prefetched = None
+            if next_prompt == prompt:
+                self.prefetch_stats['hits'] += 1
+                self.logger.colored_log("Prefetched action:", next_action, color="magenta")
+                return next_action
+            self.prefetch_stats['misses'] += 1
+        if self.pipeline_think and self.should_prefetch():
+            return self.get_action_pipelined(prompt, max_tokens, stop, reset_context)
+        prompt_tokens = self.count_prompt_tokens(prompt)
         action = llm(prompt,
                      model_name=self.model_name,
                      temperature=self.temperature,
                      max_tokens=max_tokens,
                      stop=stop,
-                     reset_context=reset_context)
+                     logger=self.logger,
+                     reset_context=reset_context,
+                     prompt_tokens=prompt_tokens)
         if action is None: action = ''
         action = action.replace('\n', ' ').strip()
         return action
-    
+
+    def count_prompt_tokens(self, prompt):
+        if isinstance(prompt, str):
+            # consecutive step prompts only append to the trajectory, only count the new part
+            return self.token_counter.update(prompt)
+        # chat messages: same, plus the chat format overhead (see message_token_num)
+        return self.token_counter.update(''.join(m['content'] for m in prompt)) + 3 * len(prompt) + 3
+
+    def enable_pipeline_think(self, enabled=True):
+        # speculating past a think action only pays off when the backend stops reading at the cut,
+        # the others would generate the whole doubled budget on every step
+        self.pipeline_think = enabled and streams_output(self.model_name)
+        if enabled and not self.pipeline_think:
+            self.logger.colored_log("Warning:", f"--pipeline_think needs a streaming backend, disabled for {self.model_name}", color="red")
+
+    def should_prefetch(self):
+        # stop speculating for agents whose next prompt is never the predicted one
+        return self.prefetch_stats['hits'] > 0 or self.prefetch_stats['misses'] < 3
+
+    def think_step(self, prompt, action):
+        """The prompt of the next step if `action` is a think action."""
+        if isinstance(prompt, str):
+            return f"{prompt}{action}{self.think_suffix}"
+        messages = [dict(m) for m in prompt]
+        messages[-1]['content'] = f"{messages[-1]['content']}{action}{self.think_suffix}"
+        return messages
+
+    def think_cut(self, text, stop):
+        """
+        Client-side stop rule of a pipelined step: stop after the first action as
+        usual, unless it is a think action followed by exactly the think_suffix,
+        then keep going until the end of the action after it.
+        """
+        first = min([(text.find(s), s) for s in stop if s in text], default=None)
+        if first is None:
+            return None
+        pos, token = first
+        offset = self.think_suffix.find(token)
+        start = pos - offset
+        if offset == -1 or start < 0 or not text[:start].strip().startswith('think'):
+            return pos
+        tail = text[start:]
+        if len(tail) < len(self.think_suffix):
+            return None if self.think_suffix.startswith(tail) else pos
+        if not tail.startswith(self.think_suffix):
+            return pos
+        rest = start + len(self.think_suffix)
+        following = [text.find(s, rest) for s in stop if s in text[rest:]]
+        return min(following) if following else None
+
+    def get_action_pipelined(self, prompt, max_tokens, stop, reset_context=False):
+        # one round trip for a think action and the action following it,
+        # the stop strings are applied by think_cut while the response streams in
+        response = llm(prompt,
+                       model_name=self.model_name,
+                       temperature=self.temperature,
+                       max_tokens=2 * max_tokens,
+                       stop=None,
+                       logger=self.logger,
+                       reset_context=reset_context,
+                       prompt_tokens=self.count_prompt_tokens(prompt),
+                       early_stop=lambda text: self.think_cut(text, stop))
+        if response is None: response = ''
+        start = response.find(self.think_suffix)
+        if start == -1 or not response[:start].strip().startswith('think'):
+            # nothing to prefetch, agents that never think stop speculating (see should_prefetch)
+            self.prefetch_stats['misses'] += 1
+            return response.replace('\n', ' ').strip()
+        action = response[:start].replace('\n', ' ').strip()
+        next_action = response[start + len(self.think_suffix):].replace('\n', ' ').strip()
+        if next_action:
+            self.prefetched = (self.think_step(prompt, action), next_action)
+        else:
+            self.prefetch_stats['misses'] += 1
+        return action
+
     def skip_env(self):
         return
     
     def close_env(self):
         return
 
+    def task_prompt(self):
+        # the per-task part of the prompt (manual, reflection) between the in-context examples and the trajectory
+        raise NotImplementedError("You need to implement a prompt constructor. ")
+
     def construct_prompt(self,
-                         reflection,
                          traj,
                         ):
-        raise NotImplementedError("You need to implement a prompt constructor. ")
+        if self.prompt_builder is not None:
+            return self.prompt_builder.build(self.task_prompt(), traj)
+        return f"{self.instruction}\n{self.in_context}\nNow it's your turn:\n{self.task_prompt()}{traj}\nAction: "
+
+    def log_prompt_prefix(self):
+        if self.prompt_builder is not None:
+            self.logger.colored_log("Prompt prefix hash:",
+                                    f"static {self.prompt_builder.prefix_hash}, task {self.prompt_builder.task_hash(self.task_prompt())}",
+                                    color="magenta")
     
     def step(self, 
              action,
@@ -25,24 +25,12 @@ class Chef(Agent):
         self.mode_recs = []
 
 
-    def construct_prompt(self,
-                         traj
-                        ):
+    def task_prompt(self):
         if self.manual_type is None:
-            if self.reflection:
-                prompt = f"{self.instruction}\n{self.in_context}\nNow it's your turn:\n{self.reflection}\n"
-            else:
-                prompt = f"{self.instruction}\n{self.in_context}\nNow it's your turn:\n"
-        else:
-            if self.reflection:
-                prompt = f"{self.instruction}\n{self.in_context}\nNow it's your turn:\nRecide of the required dish(es):\n{self.manual}\n\n{self.reflection}\nTry your best to complete the required dish(es):\n"
-            else:
-                prompt = f"{self.instruction}\n{self.in_context}\nNow it's your turn:\nRecide of the required dish(es):\n{self.manual}\n\nTry your best to complete the required dish(es):\n"
-
-        prompt += f"{traj}\nAction: "
-        # print(f"\033[34mPrompt: \033[0m{prompt}")
-        # st()
-        return prompt
+            return f"{self.reflection}\n" if self.reflection else ''
+        if self.reflection:
+            return f"Recide of the required dish(es):\n{self.manual}\n\n{self.reflection}\nTry your best to complete the required dish(es):\n"
+        return f"Recide of the required dish(es):\n{self.manual}\n\nTry your best to complete the required dish(es):\n"
     
     def reset_env(self):
         reward, done, info = 0, False, {}
@@ -50,7 +38,7 @@ class Chef(Agent):
         step_count = 0
 
         if self.trial == 0:
-            observation = self.env.reset()
+            observation = self.env.reset(seed=self.task_seed)
         else:
             observation = self.env.back_to_start()
         self.manual, self.imperfect_info = self.env.get_manual(self.manual_type)
@@ -69,6 +57,7 @@ class Chef(Agent):
         self.reflection = reflection
         self.trial = trial
         observation, reward, done, info, epi_history, step_count = self.reset_env()
+        self.log_prompt_prefix()
         self.logger.log(f"\033[34mObservation {step_count}: \033[0m{observation}")
         self.logger.log()
 
@@ -134,6 +123,7 @@ class Chef(Agent):
 
             self.logger.log(f"\033[34mAction {step_count}: \033[0m{action}")
             self.logger.log(f"\033[34mObservation {step_count + 1}: \033[0m{observation}")
+            self.logger.log_step(step_count, action, observation, reward)
             self.logger.log()
             
         epi_history = '\nObservation:'.join(epi_history.split('\nObservation:')[:-1])
@@ -147,6 +137,9 @@ class Chef(Agent):
         return reward, epi_history, step_count
 
     def log_frame(self, action, step, add_to_history=True):
+        if not self.logger.visualize:
+            # nothing is captured with --visualization none
+            return
         frame = pygame.surfarray.array3d(pygame.display.get_surface())
         frame = np.rot90(frame, k=-1)
         frame = np.fliplr(frame)
@@ -126,10 +126,16 @@ class CookPlanner(Agent):
         self.mode_recs = []
 
 
+    def task_prompt(self):
+        return f"A guide that contains important information:{self.manual}\n" if self.manual else ''
+
     def construct_prompt(self,
                          traj,
                          plan
                         ):
+        if self.prompt_builder is not None:
+            # the subgoal changes during the task, it goes with the trajectory after the cached prefix
+            return self.prompt_builder.build(self.task_prompt(), f"Current subgoal: {plan}\nTrajectory:\n{traj}")
         if self.manual:
             prompt = f"{self.instruction}\n{self.in_context}\nNow it's your turn: \nA guide that contains important information:{self.manual}\nCurrent subgoal: {plan}\nTrajectory:\n"
         else:
@@ -155,7 +161,7 @@ class CookPlanner(Agent):
         step_count = 0
 
         if self.trial == 0:
-            observation = self.env.reset()
+            observation = self.env.reset(seed=self.task_seed)
         else:
             observation = self.env.back_to_start()
         self.manual, self.imperfect_info = self.env.get_manual(self.manual_type)
@@ -176,6 +182,7 @@ class CookPlanner(Agent):
         self.reflection = reflection
         self.trial = trial
         observation, reward, done, info, epi_history, step_count = self.reset_env()
+        self.log_prompt_prefix()
         self.logger.log(f"\033[34mObservation {step_count}: \033[0m{observation}")
         self.logger.log()
 
@@ -276,6 +283,7 @@ class CookPlanner(Agent):
 
             self.logger.log(f"\033[34mAction {step_count}: \033[0m{action}")
             self.logger.log(f"\033[34mObservation {step_count + 1}: \033[0m{observation}")
+            self.logger.log_step(step_count, action, observation, reward, subgoal=plan)
             self.logger.log()
             
         epi_history = '\nObservation:'.join(epi_history.split('\nObservation:')[:-1])
@@ -289,6 +297,9 @@ class CookPlanner(Agent):
         return reward, epi_history, step_count
 
     def log_frame(self, action, step, add_to_history=True):
+        if not self.logger.visualize:
+            # nothing is captured with --visualization none
+            return
         frame = pygame.surfarray.array3d(pygame.display.get_surface())
         frame = np.rot90(frame, k=-1)
         frame = np.fliplr(frame)
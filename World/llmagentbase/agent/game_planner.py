@@ -148,7 +148,13 @@ class GamePlanner(Agent):
         self.available_actions = []
         self.mode_recs = []
 
+    def task_prompt(self):
+        return f"A guide that contains important information:{self.manual}\n\n"
+
     def construct_prompt(self, traj, plan):
+        if self.prompt_builder is not None:
+            # the subgoal changes during the task, it goes with the trajectory after the cached prefix
+            return self.prompt_builder.build(self.task_prompt(), f"Current subgoal: {plan}\nTrajectory:\n{traj}")
         prompt = f"{self.instruction}\n{self.in_context}\nNow it's your turn: \nA guide that contains important information:{self.manual}\n\nCurrent subgoal: {plan}\nTrajectory:\n"
         prompt += f"{traj}\nAction: "
         # print(prompt)
@@ -170,7 +176,7 @@ class GamePlanner(Agent):
         epi_history = ''
         step_count = 0
 
-        observation = self.env.reset()
+        observation = self.env.reset(seed=self.task_seed)
         observation, self.manual = self.env.get_manual(self.manual_type)
         self.logger.colored_log("Loaded Strategy Guide:", self.manual, color="yellow")
         self.logger.colored_log("Max Steps:", self.env.get_horizon(), color="green")
@@ -193,6 +199,7 @@ class GamePlanner(Agent):
         self.trial = trial
         self.reflection = reflection
         observation, reward, done, info, epi_history, step_count = self.reset_env()
+        self.log_prompt_prefix()
         self.logger.colored_log(f"Observation {step_count}:", observation, color="blue")
         self.logger.log()
         
@@ -303,6 +310,7 @@ class GamePlanner(Agent):
 
             self.logger.colored_log(f"Action {step_count}:", action, color="blue")
             self.logger.colored_log(f"Observation {step_count+1}:", observation, color="blue")
+            self.logger.log_step(step_count, action, observation, reward, subgoal=plan)
             self.logger.log() 
             if "You have been defeated! Game over." in observation:
                 done = True
@@ -129,10 +129,17 @@ class NavigatePlanner(Agent):
         self.mode_recs = []
 
 
+    def task_prompt(self):
+        # the guide only goes to the planner (see plan_prompt)
+        return ''
+
     def construct_prompt(self,
                          traj,
                          plan
                         ):
+        if self.prompt_builder is not None:
+            # the subgoal changes during the task, it goes with the trajectory after the cached prefix
+            return self.prompt_builder.build(self.task_prompt(), f"Current subgoal: {plan}\nTrajectory:\n{traj}")
         prompt = f"{self.instruction}\n{self.in_context}\nNow it's your turn: \nCurrent subgoal: {plan}\nTrajectory:\n"
         prompt += f"{traj}\nAction: "
         # print(prompt)
@@ -155,7 +162,7 @@ class NavigatePlanner(Agent):
         epi_history = ''
         step_count = 0
         if self.trial == 0:
-            observation = self.env.reset()
+            observation = self.env.reset(seed=self.task_seed)
         else:
             observation = self.env.back_to_start()
         self.manual, self.imperfect_info = self.env.get_manual(self.manual_type)
@@ -177,6 +184,7 @@ class NavigatePlanner(Agent):
         self.reflection = reflection
         self.trial = trial
         observation, reward, done, info, epi_history, step_count = self.reset_env()
+        self.log_prompt_prefix()
         self.logger.colored_log(f"Observation {step_count}:", observation, color="blue")
         self.logger.log()
         consecutive_think = 0
@@ -271,6 +279,7 @@ class NavigatePlanner(Agent):
 
             self.logger.colored_log(f"Action {step_count}:", action, color="blue")
             self.logger.colored_log(f"Observation {step_count+1}:", observation, color="blue")
+            self.logger.log_step(step_count, action, observation, reward, subgoal=plan)
             self.logger.log()
             
         epi_history = '\nObservation:'.join(epi_history.split('\nObservation:')[:-1])
@@ -283,6 +292,9 @@ class NavigatePlanner(Agent):
 
 
     def log_frame(self, action, step, add_to_history=True):
+        if not self.logger.visualize:
+            # nothing is captured with --visualization none
+            return
         frame = pygame.surfarray.array3d(pygame.display.get_surface())
         frame = np.rot90(frame, k=-1)
         frame = np.fliplr(frame)
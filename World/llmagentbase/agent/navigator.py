@@ -25,23 +25,12 @@ class Navigator(Agent):
         self.mode_recs = []
 
 
-    def construct_prompt(self,
-                         traj
-                        ):
+    def task_prompt(self):
         if self.manual_type is None:
-            if self.reflection:
-                prompt = f"{self.instruction}\n{self.in_context}\nNow it's your turn:\n{self.reflection}"
-            else:
-                prompt = f"{self.instruction}\n{self.in_context}\nNow it's your turn:\n"
-        else:
-            if self.reflection:
-                prompt = f"{self.instruction}\n{self.in_context}\nNow it's your turn:\nStep-by-Step Guide to Complete the Task:\n{self.manual}\n\n{self.reflection}\nTry your best to navigate to the destination:\n"
-            else:
-                prompt = f"{self.instruction}\n{self.in_context}\nNow it's your turn:\nStep-by-Step Guide to Complete the Task:\n{self.manual}\n\nTry your best to navigate to the destination:\n"
-        prompt += f"{traj}\nAction: "
-        # print(f"\033[34mPrompt: \033[0m{prompt}")
-        # st()
-        return prompt
+            return self.reflection
+        if self.reflection:
+            return f"Step-by-Step Guide to Complete the Task:\n{self.manual}\n\n{self.reflection}\nTry your best to navigate to the destination:\n"
+        return f"Step-by-Step Guide to Complete the Task:\n{self.manual}\n\nTry your best to navigate to the destination:\n"
     
     
     def reset_env(self):
@@ -49,7 +38,7 @@ class Navigator(Agent):
         epi_history = ''
         step_count = 0
         if self.trial == 0:
-            observation = self.env.reset()
+            observation = self.env.reset(seed=self.task_seed)
         else:
             observation = self.env.back_to_start()
         self.manual, self.imperfect_info = self.env.get_manual(self.manual_type)
@@ -69,6 +58,7 @@ class Navigator(Agent):
         self.reflection = reflection
         self.trial = trial
         observation, reward, done, info, epi_history, step_count = self.reset_env()
+        self.log_prompt_prefix()
         self.logger.colored_log(f"Observation {step_count}:", observation, color="blue")
         self.logger.log()
         consecutive_think = 0
@@ -132,6 +122,7 @@ class Navigator(Agent):
 
             self.logger.colored_log(f"Action {step_count}:", action, color="blue")
             self.logger.colored_log(f"Observation {step_count+1}:", observation, color="blue")
+            self.logger.log_step(step_count, action, observation, reward)
             self.logger.log() 
             
         epi_history = '\nObservation:'.join(epi_history.split('\nObservation:')[:-1])
@@ -145,6 +136,9 @@ class Navigator(Agent):
 
 
     def log_frame(self, action, step, add_to_history=True):
+        if not self.logger.visualize:
+            # nothing is captured with --visualization none
+            return
         frame = pygame.surfarray.array3d(pygame.display.get_surface())
         frame = np.rot90(frame, k=-1)
         frame = np.fliplr(frame)
@@ -0,0 +1,26 @@
+import hashlib
+from pdb import set_trace as st
+
+
+def prefix_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+
+class PromptBuilder(object):
+    """
+    Lays a step prompt out as chat messages ordered from the most to the least
+    stable part, so that servers with prefix (KV) caching can reuse most of it:
+        1. system: instruction + in-context examples, byte-identical for every task and step
+        2. user:   per-task part (manual, reflection), then the per-step trajectory
+    """
+    def __init__(self, instruction, in_context):
+        self.system = f"{instruction}\n{in_context}"
+        self.prefix_hash = prefix_hash(self.system)
+
+    def build(self, task, traj):
+        return [{'role': 'system', 'content': self.system},
+                {'role': 'user', 'content': f"Now it's your turn:\n{task}{traj}\nAction: "}]
+
+    def task_hash(self, task):
+        """Hash of the prefix shared by every step of one task."""
+        return prefix_hash(f"{self.system}\0Now it's your turn:\n{task}")
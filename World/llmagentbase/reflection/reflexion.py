@@ -23,6 +23,7 @@ def reflect(traj,
                         reflect_model, 
                         temperature=0, 
                         max_tokens=256, 
-                        stop=None)
+                        stop=None,
+                        logger=logger)
     logger.log(f'\n\033[33mReflection\033[0m: {reflection}')
     return reflection
\ No newline at end of file
@@ -0,0 +1,91 @@
+import os
+import json
+from common.utils import rew_logging
+from envs.utils import task_seed
+from pdb import set_trace as st
+
+
+def records_path(logger):
+    return f"{logger.log_folder}/tasks.jsonl"
+
+
+def make_record(task_idx, task_name, seed, rewards, steps, memory):
+    # memory is the [traj, reflection, traj, reflection, ...] list the agent is prompted with
+    return {'task_idx': task_idx,
+            'task_name': task_name,
+            'seed': seed,
+            'rewards': rewards,
+            'steps': steps,
+            'trajectories': memory[0::2],
+            'reflections': memory[1::2]}
+
+
+def record_memory(record):
+    memory = []
+    for traj, reflection in zip(record['trajectories'], record['reflections']):
+        memory.extend([traj, reflection])
+    return memory
+
+
+def save_record(path, record):
+    """Append the record of a finished task, synced to disk before returning."""
+    with open(path, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def load_records(path, args):
+    """
+    Records of the tasks finished by a previous run of the same experiment,
+    keyed by task name. A partly written last line (crash while saving) and
+    records generated from another seed are ignored.
+    """
+    records = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record['seed'] == task_seed(args.seed, args.env, record['task_name']):
+                records[record['task_name']] = record
+    return records
+
+
+def init_records(logger, args):
+    path = records_path(logger)
+    if getattr(args, 'resume', False):
+        records = load_records(path, args)
+        if os.path.exists(path) and os.path.getsize(path):
+            # end a partly written last line, the next record would be appended to it
+            with open(path, 'rb+') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    f.write(b'\n')
+        logger.colored_log("Resuming:", f"{len(records)} finished tasks loaded from {path}", color="green")
+        # the steps of the tasks left unfinished are recorded again when they run
+        logger.steps.keep_tasks(records)
+        return path, records
+    if os.path.exists(path):
+        os.remove(path)
+    return path, {}
+
+
+def restore_task(record, task_idx, logger, last_rewards, best_rewards, best_trials, prev_reflections, success_fn, args):
+    """Replay a finished task into the logs and reward stats, as if it had just run."""
+    logger.colored_log(f"Task {task_idx + 1}: {record['task_name']}", "restored from checkpoint", color="red")
+    prev_reflections[task_idx] = record_memory(record)
+    for trial, (reward, steps) in enumerate(zip(record['rewards'], record['steps'])):
+        logger.log_experiment(steps, success_fn(reward))
+        rew_logging(best_rewards,
+                    last_rewards,
+                    best_trials,
+                    reward,
+                    task_idx,
+                    trial=trial,
+                    logger=logger,
+                    success_fn=success_fn,
+                    debug=args.debug)
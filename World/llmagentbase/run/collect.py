@@ -1,26 +1,26 @@
-import pygame
 from common.utils import set_seed, rew_logging, initialize_logs, compute_accuracies
-from envs.utils import load_env
+from common.llm_cache import llm_cache
+from common.llm_mock import set_mock_policy
+from envs.utils import load_env, task_seed
 from llmagentbase.run.run_episode import run_one_episode
 from llmagentbase.prompts import get_prompt
 from llmagentbase.agent import build_agent
 from llmagentbase.reflection.reflexion import reflect
 from llmagentbase.utils import log_trial, log_task
+from llmagentbase.run.checkpoint import init_records, make_record, save_record, restore_task
 from pdb import set_trace as st
 
-def collect_trajs(  task_range,
-                    logger,
-                    max_trial,
-                    args,
-                    is_train,
-                    ):
-    # set_seed(args.seed)
+def get_success_fn(args):
+    if args.env_type == 'roguelike':
+        return lambda r: r != 0
+    return lambda r: r == 1
+
+def setup_run(logger, args, is_train):
+    # one env and one agent, reused for every task
     env = load_env(args, is_train)
     # get prompts
     instruction = get_prompt('instruction', env, args)
     in_context = get_prompt('react', env, args)
-            
-    last_rewards, best_rewards, best_trials, prev_reflections = initialize_logs(task_range)
     # init agent
     agent = build_agent(None,
                         instruction,
@@ -28,54 +28,118 @@ def collect_trajs(  task_range,
                         logger,
                         args.train_temperature if is_train else args.test_temperature,
                         args)
-    if args.env_type == 'roguelike':
-        success_fn = lambda r: r != 0
-    else:
-        success_fn = lambda r: r == 1
-    
-    for task_idx, task_name in enumerate(task_range):
-        log_task(task_idx, task_name, logger)
-        for trial in range(max_trial): #loop in this way because of the way alfworld loops
-            # load env for agent
-            agent.env = env
-            log_trial(trial, logger) #log trial information
-            # really run one task
-            traj, reward, step_count = run_one_episode(  agent,
-                                                        task_name=task_name,
-                                                        trial=trial,
-                                                        memory=prev_reflections[task_idx],
-                                                        logger=logger,
-                                                        args=args,
-                                                        )
-            compute_accuracies(agent.mode_recs, logger)
-            success = success_fn(reward)
-            logger.log_experiment(step_count, success)
+    return env, agent
+
+def run_task(agent,
+             env,
+             task_idx,
+             task_name,
+             reflections,
+             logger,
+             max_trial,
+             args,
+             success_fn,
+             on_trial=None,
+             ):
+    """
+    Run the trials of one task until it succeeds, reflecting on failed trials.
+    `reflections` is extended in place, `on_trial(reward, trial)` is called after every trial.
+    Returns the checkpoint record of the task (see llmagentbase.run.checkpoint).
+    """
+    log_task(task_idx, task_name, logger)
+    # the task is generated from its own seed, independent of the tasks run before it
+    agent.task_seed = task_seed(args.seed, args.env, task_name)
+    if args.agent_model == 'mock' and hasattr(env, 'oracle_action'):
+        # scripted policy for benchmarking the loop without a real llm, set per task since
+        # a sweep worker keeps the envs of several configs
+        set_mock_policy(lambda prompt: env.oracle_action())
+    rewards, steps = [], []
+    if hasattr(env.unwrapped, 'rewind'):
+        # the roguelike keeps the start of the game only for the trials going back to it
+        env.unwrapped.rewind = max_trial > 1
+    for trial in range(max_trial): #loop in this way because of the way alfworld loops
+        # load env for agent
+        agent.env = env
+        log_trial(trial, logger) #log trial information
+        # really run one task
+        traj, reward, step_count = run_one_episode(  agent,
+                                                    task_name=task_name,
+                                                    trial=trial,
+                                                    memory=reflections,
+                                                    logger=logger,
+                                                    args=args,
+                                                    )
+        compute_accuracies(agent.mode_recs, logger)
+        success = success_fn(reward)
+        logger.log_experiment(step_count, success)
 
-            traj_reflection = ''
-            #only reflect on failed trajectories 
-            if trial < max_trial - 1 and (not success) and args.agent_model != 'human':
-                traj_reflection = reflect(  traj,
-                                            args.env,
-                                            args.agent_model,
-                                            get_prompt('reflexion', env, args),
-                                            logger,
-                                            )
+        traj_reflection = ''
+        #only reflect on failed trajectories
+        if trial < max_trial - 1 and (not success) and args.agent_model != 'human':
+            traj_reflection = reflect(  traj,
+                                        args.env,
+                                        args.agent_model,
+                                        get_prompt('reflexion', env, args),
+                                        logger,
+                                        )
 
-            prev_reflections[task_idx].extend([traj, traj_reflection])
-            best_rewards, best_trials, last_rewards = rew_logging(best_rewards,
-                                                                  last_rewards,
-                                                                  best_trials,
-                                                                  reward,
-                                                                  task_idx,
-                                                                  trial=trial,
-                                                                  logger=logger,
-                                                                  success_fn=success_fn,
-                                                                  debug=args.debug)
-            if success:
-                break
+        reflections.extend([traj, traj_reflection])
+        rewards.append(reward)
+        steps.append(step_count)
+        if on_trial is not None:
+            on_trial(reward, trial)
+        if success:
+            break
 
-        logger.save_gif(task_name, best_rewards[-1])
-        agent.close_env()
+    # same as the best reward kept by rew_logging
+    logger.save_gif(task_name, max([0] + rewards))
+    # on disk together with the checkpoint record of the task
+    logger.steps.flush()
+    agent.close_env()
+    return make_record(task_idx, task_name, agent.task_seed, rewards, steps, reflections)
+
+def collect_trajs(  task_range,
+                    logger,
+                    max_trial,
+                    args,
+                    is_train,
+                    ):
+    if getattr(args, 'num_workers', 1) > 1:
+        from llmagentbase.run.parallel import collect_trajs_parallel
+        return collect_trajs_parallel(task_range, logger, max_trial, args, is_train)
+
+    # set_seed(args.seed)
+    env, agent = setup_run(logger, args, is_train)
+    last_rewards, best_rewards, best_trials, prev_reflections = initialize_logs(task_range)
+    success_fn = get_success_fn(args)
+    # finished tasks are recorded one by one, so that a crashed run can be resumed
+    records_path, records = init_records(logger, args)
+
+    for task_idx, task_name in enumerate(task_range):
+        if task_name in records:
+            restore_task(records[task_name], task_idx, logger, last_rewards, best_rewards, best_trials,
+                         prev_reflections, success_fn, args)
+            continue
+        record = run_task(agent,
+                 env,
+                 task_idx,
+                 task_name,
+                 prev_reflections[task_idx],
+                 logger,
+                 max_trial,
+                 args,
+                 success_fn,
+                 on_trial=lambda reward, trial: rew_logging(best_rewards,
+                                                            last_rewards,
+                                                            best_trials,
+                                                            reward,
+                                                            task_idx,
+                                                            trial=trial,
+                                                            logger=logger,
+                                                            success_fn=success_fn,
+                                                            debug=args.debug))
+        save_record(records_path, record)
 
     logger.save_summary()
-    return
\ No newline at end of file
+    logger.colored_log(llm_cache.summary(), color="green")
+    return
@@ -0,0 +1,195 @@
+import os
+import copy
+import queue
+import traceback
+import multiprocessing as mp
+from common.utils import set_seed, rew_logging, initialize_logs
+from common.logger import Logger
+from common.traj_store import TrajectoryStore
+from common.llm_cache import llm_cache
+from common.llm_clients import load_endpoints
+from llmagentbase.run.collect import setup_run, run_task, get_success_fn
+from llmagentbase.run.checkpoint import init_records, save_record, restore_task, record_memory
+from pdb import set_trace as st
+
+# seconds between liveness checks of the workers while waiting for results
+POLL_INTERVAL = 5
+
+
+def shard_tasks(task_range, num_workers, skip=()):
+    # round robin, so that every worker gets a mix of early and late tasks
+    tasks = [(task_idx, task_name) for task_idx, task_name in enumerate(task_range) if task_name not in skip]
+    return [tasks[rank::num_workers] for rank in range(num_workers)]
+
+
+def setup_worker(rank, args, is_train, log_folder):
+    """
+    Headless env, agent and worker logger for `args`, with gifs and step records
+    going to the folders of the main run in `log_folder`.
+    """
+    # no window (and no sound) in the workers, pygame renders to an off-screen surface
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ['SDL_AUDIODRIVER'] = 'dummy'
+    if getattr(args, 'llm_endpoints', None):
+        # spawned, the registry of the parent is not inherited
+        load_endpoints(args.llm_endpoints)
+    # tasks are seeded on their own (see run_task), this only covers the rest
+    set_seed(args.seed)
+    worker_args = copy.copy(args)
+    worker_args.log_name = f"{args.log_name}/workers/worker_{rank}"
+    logger = Logger(worker_args)
+    logger.gif_folder = f"{log_folder}/gifs"
+    logger.run_name = args.log_name
+    logger.steps = TrajectoryStore(f"{log_folder}/steps")
+    env, agent = setup_run(logger, worker_args, is_train)
+    return logger, env, agent, get_success_fn(worker_args)
+
+
+def run_worker_task(agent, env, task_idx, task_name, logger, max_trial, args, success_fn):
+    """Run one task in a worker, returns what the parent needs to merge it (see merge_task)."""
+    logger.flush()
+    log_start = os.path.getsize(logger.log_file)
+    steps_start, success_start, usage_start = len(logger.steps_all), len(logger.steps_success), len(logger.usage)
+    reflections = []
+    record = run_task(agent,
+                      env,
+                      task_idx,
+                      task_name,
+                      reflections,
+                      logger,
+                      max_trial,
+                      args,
+                      success_fn)
+    logger.flush()
+    with open(logger.log_file, 'r') as f:
+        f.seek(log_start)
+        log_text = f.read()
+    return {'type': 'task',
+            'task_idx': task_idx,
+            'record': record,
+            'log': log_text,
+            'steps_all': logger.steps_all[steps_start:],
+            'steps_success': logger.steps_success[success_start:],
+            'usage': logger.usage[usage_start:]}
+
+
+def _worker(rank, shard, max_trial, args, is_train, log_folder, results):
+    """
+    Runs a shard of (task_idx, task_name) with its own headless env and agent,
+    and sends one result per task back to the parent.
+    """
+    try:
+        logger, env, agent, success_fn = setup_worker(rank, args, is_train, log_folder)
+        cache_start = (llm_cache.hits, llm_cache.misses, llm_cache.bytes_saved)
+
+        for task_idx, task_name in shard:
+            results.put(run_worker_task(agent, env, task_idx, task_name, logger, max_trial, logger.args, success_fn))
+
+        results.put({'type': 'done',
+                     'rank': rank,
+                     'cache': (llm_cache.hits - cache_start[0],
+                               llm_cache.misses - cache_start[1],
+                               llm_cache.bytes_saved - cache_start[2])})
+    except Exception:
+        results.put({'type': 'error', 'rank': rank, 'error': traceback.format_exc()})
+
+
+def collect_trajs_parallel(task_range,
+                           logger,
+                           max_trial,
+                           args,
+                           is_train,
+                           ):
+    """
+    Same as collect_trajs, but the tasks are sharded over `args.num_workers`
+    processes. Task results are merged into `logger` (log file, steps, usage)
+    and wandb in task order, so the outputs match the sequential run.
+    """
+    last_rewards, best_rewards, best_trials, prev_reflections = initialize_logs(task_range)
+    success_fn = get_success_fn(args)
+    records_path, records = init_records(logger, args)
+    pending = [task_name for task_name in task_range if task_name not in records]
+    num_workers = max(1, min(args.num_workers, len(pending)))
+    logger.colored_log("Parallel run:", f"{len(pending)} tasks over {num_workers} workers", color="green")
+
+    # spawn, pygame and the llm clients are not fork safe. Fix the str hash seed of
+    # the workers, set iteration order feeds into some of the world generation.
+    os.environ.setdefault('PYTHONHASHSEED', '0')
+    ctx = mp.get_context('spawn')
+    results = ctx.Queue()
+    workers = [ctx.Process(target=_worker,
+                           args=(rank, shard, max_trial, args, is_train, logger.log_folder, results),
+                           daemon=True)
+               for rank, shard in enumerate(shard_tasks(task_range, num_workers, skip=records))]
+    for worker in workers:
+        worker.start()
+
+    # tasks restored from the checkpoint are merged in order with the new ones
+    finished = {task_idx: {'type': 'restored', 'task_idx': task_idx, 'record': records[task_name]}
+                for task_idx, task_name in enumerate(task_range) if task_name in records}
+    next_task = 0
+    while next_task in finished:
+        merge_task(finished.pop(next_task), logger, last_rewards, best_rewards, best_trials,
+                   prev_reflections, success_fn, args)
+        next_task += 1
+    running = set(range(num_workers)) if pending else set()
+    try:
+        while running:
+            try:
+                result = results.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                dead = [rank for rank in running if not workers[rank].is_alive()]
+                if dead:
+                    raise RuntimeError(f"Worker(s) {dead} exited without finishing their tasks.")
+                continue
+
+            if result['type'] == 'error':
+                raise RuntimeError(f"Worker {result['rank']} failed:\n{result['error']}")
+            if result['type'] == 'done':
+                running.discard(result['rank'])
+                llm_cache.hits += result['cache'][0]
+                llm_cache.misses += result['cache'][1]
+                llm_cache.bytes_saved += result['cache'][2]
+                continue
+
+            # record it right away, merge it in task order (the running averages of rew_logging depend on it)
+            save_record(records_path, result['record'])
+            finished[result['task_idx']] = result
+            while next_task in finished:
+                merge_task(finished.pop(next_task), logger, last_rewards, best_rewards, best_trials,
+                           prev_reflections, success_fn, args)
+                next_task += 1
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+
+    logger.save_summary()
+    logger.colored_log(llm_cache.summary(), color="green")
+    return
+
+
+def merge_task(result, logger, last_rewards, best_rewards, best_trials, prev_reflections, success_fn, args):
+    task_idx = result['task_idx']
+    if result['type'] == 'restored':
+        restore_task(result['record'], task_idx, logger, last_rewards, best_rewards, best_trials,
+                     prev_reflections, success_fn, args)
+        return
+    record = result['record']
+    # the worker already printed it, only add it to the log file
+    logger.write(result['log'])
+    logger.steps_all.extend(result['steps_all'])
+    logger.steps_success.extend(result['steps_success'])
+    logger.usage.extend(result['usage'])
+    prev_reflections[task_idx] = record_memory(record)
+    for trial, reward in enumerate(record['rewards']):
+        rew_logging(best_rewards,
+                    last_rewards,
+                    best_trials,
+                    reward,
+                    task_idx,
+                    trial=trial,
+                    logger=logger,
+                    success_fn=success_fn,
+                    debug=args.debug)
@@ -24,6 +24,8 @@ def run_one_episode(agent,
                     logger,
                     args,
                     ):
+    usage_start = len(logger.usage)
+    logger.start_episode(task_name, trial)
     reward, traj, step_count = agent.run(task_name, 
                                          trial=trial,
                                          reflection=mem_to_reflect(trial, memory),
@@ -31,6 +33,7 @@ def run_one_episode(agent,
                                          )
 
     logger.colored_log(f"Task {task_name}, trial {trial + 1}:", f"ends with reward: {reward:.3f}", color="cyan")
+    logger.log_usage_summary(f"Task {task_name}, trial {trial + 1} LLM usage:", start=usage_start)
     # logger.save_gif(task_name, reward)
     # st()
     return traj, reward, step_count
\ No newline at end of file
@@ -0,0 +1,282 @@
+import os
+import copy
+import queue
+import itertools
+import traceback
+import yaml
+import multiprocessing as mp
+from collections import deque
+from common.utils import finalize_args, init_wandb, initialize_logs
+from common.logger import Logger
+from common.llm_cache import llm_cache
+from envs.utils import get_task_range
+from llmagentbase.run.collect import get_success_fn
+from llmagentbase.run.checkpoint import init_records, save_record
+from llmagentbase.run.parallel import setup_worker, run_worker_task, merge_task, POLL_INTERVAL
+from pdb import set_trace as st
+
+
+def load_sweep(path, args):
+    """
+    Expand a sweep file into the args of every config, e.g.
+
+        num_workers: 8
+        concurrency:        # tasks in flight per agent_model, default num_workers
+          qwen3:14b: 4
+        args:               # shared by every config
+          max_trial: 3
+        grid:               # every combination
+          env: [VillageNav-v0, VillageNav-Dynamic-v0]
+          manual_type: [null, 0, 1, 2]
+          agent_model: [qwen3:14b, gpt-4o-mini]
+        configs:            # single configs, on top of the grid
+          - {env: Cooking-easy-v0, manual_type: 0, seed: 1}
+
+    Args not set in the file keep their command line value.
+    Returns the config args, the number of workers and the per model limits.
+    """
+    with open(path, 'r') as file:
+        spec = yaml.safe_load(file) or {}
+    shared = spec.get('args') or {}
+    grid = spec.get('grid') or {}
+    overrides = [dict(zip(grid, values)) for values in itertools.product(*grid.values())] if grid else []
+    overrides += spec.get('configs') or []
+    if not overrides:
+        raise ValueError(f"No config in sweep {path}, set `grid` and/or `configs`.")
+
+    configs, log_names = [], set()
+    for override in overrides:
+        config = copy.copy(args)
+        for key, value in {**shared, **override}.items():
+            if not hasattr(config, key):
+                raise ValueError(f"Unknown arg '{key}' in sweep {path}")
+            setattr(config, key, value)
+        finalize_args(config)
+        if config.log_name in log_names:
+            raise ValueError(f"Config {config.log_name} appears twice in sweep {path}")
+        log_names.add(config.log_name)
+        configs.append(config)
+    concurrency = spec.get('concurrency') or {}
+    for model, limit in concurrency.items():
+        if limit < 1:
+            raise ValueError(f"Concurrency of {model} in sweep {path} must be at least 1")
+    return configs, spec.get('num_workers', args.num_workers), concurrency
+
+
+def _sweep_worker(rank, configs, is_train, inbox, results):
+    """
+    Warm worker of a sweep. Runs the (config, task) units sent by the parent,
+    keeping the env and agent of every config it has seen until the parent
+    releases the config.
+    """
+    warm = {}
+    try:
+        cache_start = (llm_cache.hits, llm_cache.misses, llm_cache.bytes_saved)
+        while True:
+            message = inbox.get()
+            if message is None:
+                break
+            if message[0] == 'release':
+                if message[1] in warm:
+                    logger, env, agent, success_fn = warm.pop(message[1])
+                    logger.close()
+                    env.close()
+                continue
+
+            _, config_idx, task_idx, task_name = message
+            args, log_folder = configs[config_idx]
+            if config_idx not in warm:
+                warm[config_idx] = setup_worker(rank, args, is_train, log_folder)
+            logger, env, agent, success_fn = warm[config_idx]
+            result = run_worker_task(agent, env, task_idx, task_name, logger, args.max_trial, logger.args, success_fn)
+            result.update(rank=rank, config=config_idx)
+            results.put(result)
+
+        results.put({'type': 'done',
+                     'rank': rank,
+                     'cache': (llm_cache.hits - cache_start[0],
+                               llm_cache.misses - cache_start[1],
+                               llm_cache.bytes_saved - cache_start[2])})
+    except Exception:
+        results.put({'type': 'error', 'rank': rank, 'error': traceback.format_exc()})
+
+
+class Sweep(object):
+    """
+    Parent side of a sweep: hands the (config, task) units of every config to
+    idle workers, keeping at most `concurrency[model]` units of a model in
+    flight, and merges the results of each config in task order into its own
+    logger, checkpoint records and wandb run (as collect_trajs_parallel does).
+
+    Configs are opened in order and closed as soon as their last task is merged,
+    so only the configs that are running have a log, a wandb run and warm workers.
+    """
+    def __init__(self, configs, num_workers, concurrency, is_train):
+        self.configs = configs
+        self.num_workers = num_workers
+        self.concurrency = concurrency
+        self.is_train = is_train
+        self.runs = [None] * len(configs)
+        self.unopened = deque(range(len(configs)))
+        self.active = []
+        self.in_flight = {}
+        self.busy = [None] * num_workers
+        self.warm = [set() for _ in range(num_workers)]
+
+    def has_capacity(self, model):
+        return self.in_flight.get(model, 0) < self.concurrency.get(model, self.num_workers)
+
+    def open(self, config_idx):
+        args = self.configs[config_idx]
+        logger = Logger(args)
+        if not args.debug:
+            # one run per config, open side by side
+            logger.wandb_run = init_wandb(args, reinit='create_new')
+        task_range = get_task_range(args, is_train=self.is_train)
+        records_path, records = init_records(logger, args)
+        last_rewards, best_rewards, best_trials, prev_reflections = initialize_logs(task_range)
+        run = {'args': args,
+               'logger': logger,
+               'task_range': task_range,
+               'records_path': records_path,
+               'pending': deque((task_idx, task_name) for task_idx, task_name in enumerate(task_range)
+                                if task_name not in records),
+               # tasks restored from the checkpoint are merged in order with the new ones
+               'finished': {task_idx: {'type': 'restored', 'task_idx': task_idx, 'record': records[task_name]}
+                            for task_idx, task_name in enumerate(task_range) if task_name in records},
+               'next_task': 0,
+               'stats': (last_rewards, best_rewards, best_trials, prev_reflections),
+               'success_fn': get_success_fn(args)}
+        logger.colored_log("Sweep config:", f"{len(run['pending'])} of {len(task_range)} tasks to run", color="green")
+        self.runs[config_idx] = run
+        self.active.append(config_idx)
+        self.merge(config_idx)
+
+    def merge(self, config_idx):
+        run = self.runs[config_idx]
+        while run['next_task'] in run['finished']:
+            merge_task(run['finished'].pop(run['next_task']), run['logger'], *run['stats'], run['success_fn'], run['args'])
+            run['next_task'] += 1
+        if run['next_task'] == len(run['task_range']):
+            self.close(config_idx)
+
+    def close(self, config_idx):
+        run = self.runs[config_idx]
+        run['logger'].save_summary()
+        run['logger'].close()
+        if run['logger'].wandb_run is not None:
+            run['logger'].wandb_run.finish()
+        self.active.remove(config_idx)
+        self.runs[config_idx] = None
+
+    def next_unit(self, rank):
+        """The next (config, task) for worker `rank`, preferring the configs it already has warm."""
+        ready = [config_idx for config_idx in self.active
+                 if self.runs[config_idx]['pending'] and self.has_capacity(self.configs[config_idx].agent_model)]
+        warm = [config_idx for config_idx in ready if config_idx in self.warm[rank]]
+        if warm or ready:
+            config_idx = (warm or ready)[0]
+            return config_idx, self.runs[config_idx]['pending'].popleft()
+        # open the next config whose model is not saturated yet
+        for config_idx in list(self.unopened):
+            if not self.has_capacity(self.configs[config_idx].agent_model):
+                continue
+            self.unopened.remove(config_idx)
+            self.open(config_idx)
+            if config_idx in self.active and self.runs[config_idx]['pending']:
+                return config_idx, self.runs[config_idx]['pending'].popleft()
+        return None
+
+    def dispatch(self, inboxes):
+        for rank in range(self.num_workers):
+            if self.busy[rank] is not None:
+                continue
+            unit = self.next_unit(rank)
+            if unit is None:
+                return
+            config_idx, (task_idx, task_name) = unit
+            model = self.configs[config_idx].agent_model
+            self.in_flight[model] = self.in_flight.get(model, 0) + 1
+            self.busy[rank] = config_idx
+            self.warm[rank].add(config_idx)
+            inboxes[rank].put(('task', config_idx, task_idx, task_name))
+
+    def finish_unit(self, result, inboxes):
+        config_idx = result['config']
+        model = self.configs[config_idx].agent_model
+        self.in_flight[model] -= 1
+        self.busy[result['rank']] = None
+        run = self.runs[config_idx]
+        # record it right away, merge it in task order (the running averages of rew_logging depend on it)
+        save_record(run['records_path'], result['record'])
+        run['finished'][result['task_idx']] = result
+        self.merge(config_idx)
+        if self.runs[config_idx] is None:
+            # done, the workers can drop its env and agent
+            for rank in range(self.num_workers):
+                if config_idx in self.warm[rank]:
+                    self.warm[rank].discard(config_idx)
+                    inboxes[rank].put(('release', config_idx))
+
+    def done(self):
+        return not self.unopened and not self.active
+
+
+def run_sweep(args, is_train=False):
+    """
+    Run every config of the sweep file `args.sweep` (see load_sweep) over one
+    pool of warm workers. Each config gets the same logs, checkpoint records and
+    wandb metrics as its own main.py run, so `--resume` works per config.
+    """
+    configs, num_workers, concurrency = load_sweep(args.sweep, args)
+    num_workers = max(1, num_workers)
+    sweep = Sweep(configs, num_workers, concurrency, is_train)
+    print(f"\033[32mSweep:\033[0m {len(configs)} configs over {num_workers} workers, concurrency {concurrency or 'unlimited'}")
+
+    # spawn, pygame and the llm clients are not fork safe (see collect_trajs_parallel)
+    os.environ.setdefault('PYTHONHASHSEED', '0')
+    ctx = mp.get_context('spawn')
+    results = ctx.Queue()
+    inboxes = [ctx.Queue() for _ in range(num_workers)]
+    worker_configs = [(config, f"./logs/{config.log_name}") for config in configs]
+    workers = [ctx.Process(target=_sweep_worker,
+                           args=(rank, worker_configs, is_train, inboxes[rank], results),
+                           daemon=True)
+               for rank in range(num_workers)]
+    for worker in workers:
+        worker.start()
+
+    try:
+        sweep.dispatch(inboxes)
+        while not sweep.done():
+            try:
+                result = results.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                dead = [rank for rank in range(num_workers) if not workers[rank].is_alive()]
+                if dead:
+                    raise RuntimeError(f"Worker(s) {dead} exited during the sweep.")
+                continue
+            if result['type'] == 'error':
+                raise RuntimeError(f"Worker {result['rank']} failed:\n{result['error']}")
+            sweep.finish_unit(result, inboxes)
+            sweep.dispatch(inboxes)
+
+        # stop the workers, they send their llm cache stats on the way out
+        for inbox in inboxes:
+            inbox.put(None)
+        stopping = set(range(num_workers))
+        while stopping:
+            result = results.get(timeout=POLL_INTERVAL * 12)
+            if result['type'] == 'error':
+                raise RuntimeError(f"Worker {result['rank']} failed:\n{result['error']}")
+            stopping.discard(result['rank'])
+            llm_cache.hits += result['cache'][0]
+            llm_cache.misses += result['cache'][1]
+            llm_cache.bytes_saved += result['cache'][2]
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+
+    print(llm_cache.summary())
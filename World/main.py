@@ -1,9 +1,9 @@
 import argparse
-import yaml
-import wandb
-from common.utils import set_seed
+from common.utils import set_seed, finalize_args, init_wandb
 from common.logger import Logger
+from common.llm_clients import load_endpoints
 from llmagentbase import meta_train, meta_test
+from llmagentbase.run.sweep import run_sweep
 from pdb import set_trace as st
 
 
@@ -11,12 +11,7 @@ def main(args, logger):
     # set seed
     set_seed(args.seed)
     if not args.debug:
-        wandb.init(
-            project="mirage3", 
-            entity="lyneylynettemagic-university-of-michigan", 
-            name=args.log_name,
-            config={k: str(v) if v is None else v for k, v in vars(args).items()}
-        )
+        init_wandb(args)
     if args.train:
         # if you want to train something
         meta_train(args, logger)
@@ -68,37 +63,67 @@ if __name__ == "__main__":
     parser.add_argument(
         "--debug", action="store_true",
     )
+    parser.add_argument(
+        "--structured_prompt", action="store_true",
+        help="send the instruction and in-context examples as a separate, static system message (better prefix caching)"
+    )
+    parser.add_argument(
+        "--pipeline_think", action="store_true",
+        help="let the llm continue past a think[] action and reuse the action it generates after it"
+    )
+    parser.add_argument(
+        "--num_workers", type=int, default=1,
+        help="run the tasks in this many parallel processes (headless pygame), 1 runs them sequentially"
+    )
+    parser.add_argument(
+        "--visualization", type=str, default='gif', choices=['gif', 'mp4', 'none'],
+        help="format of the episode visualizations (mp4 needs imageio-ffmpeg), none skips capturing frames at all"
+    )
+    parser.add_argument(
+        "--frame_every", type=int, default=1,
+        help="keep only every n-th frame in the visualizations"
+    )
+    parser.add_argument(
+        "--frame_scale", type=float, default=1.0,
+        help="resize the visualization frames by this factor, e.g. 0.5"
+    )
+    parser.add_argument(
+        "--world_cache", type=str, default=None,
+        help="folder of generated worlds: tasks are generated once, saved there and reloaded by later runs"
+    )
+    parser.add_argument(
+        "--world_bundle", type=str, default=None,
+        help="bundle of worlds pre-generated by pregenerate.py for this env and seed, reset loads them instead of generating"
+    )
+    parser.add_argument(
+        "--resume", action="store_true",
+        help="skip the tasks already finished by a previous run with the same log_name (logs/<log_name>/tasks.jsonl)"
+    )
+    parser.add_argument(
+        "--llm_endpoints", type=str, default=None,
+        help="yaml file listing the ollama/vllm/openai servers to balance requests over"
+    )
+    parser.add_argument(
+        "--sweep", type=str, default=None,
+        help="yaml grid of configs (env, manual_type, agent_model, ...) to run over one shared pool of --num_workers workers"
+    )
 
     args = parser.parse_args()
 
-    # set log name
-    str_debug = 'debug_' if args.debug else ''
-    args.log_name = \
-        f"{str_debug}{args.env}/Manual_{args.manual_type}_{args.hierachical}_{args.exploration_model}_{args.imperfect_aware}_{args.agent_model}_trial_{args.max_trial}"
-    
-    # set logging
-    logger = Logger(args)
-
-    # environment specific configs
-    if 'Nav' in args.env:
-        args.env_type = 'navigation'
-    elif 'Cooking' in args.env:
-        args.env_type = 'cooking'
-    elif 'Roguelike' in args.env:
-        args.env_type = 'roguelike'
-        args.back = False
-        if 'reversible' in args.env:
-            args.back = True 
-        
-    with open(f'envs/env_configs/{args.env_type}.yaml', 'r') as file:
-        yaml_args = yaml.safe_load(file)
+    if args.sweep:
+        # every config of the grid over one pool of workers
+        run_sweep(args)
+    else:
+        finalize_args(args)
 
-    for key, value in yaml_args.items():
-        setattr(args, key, value)
+        # set logging
+        logger = Logger(args)
 
-    # run main
-    main(args=args, logger=logger)
+        if args.llm_endpoints:
+            load_endpoints(args.llm_endpoints)
 
+        # run main
+        main(args=args, logger=logger)
 
 
 # react: python main.py --env webshop
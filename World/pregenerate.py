@@ -0,0 +1,37 @@
+import os
+import argparse
+from envs.cuterpg.utils.world_bundle import generate_bundle
+from pdb import set_trace as st
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="pre-generate the worlds of a navigation env into a bundle for main.py --world_bundle")
+    parser.add_argument(
+        '--env', type=str, default='VillageNav-v0'
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0,
+        help="the --seed of the runs that will load the bundle, tasks are seeded from it"
+    )
+    parser.add_argument(
+        "--n_tasks", type=int, default=50,
+        help="worlds of tasks 0..n_tasks-1, as many as the runs play (n_test_tasks)"
+    )
+    parser.add_argument(
+        "--num_workers", type=int, default=os.cpu_count(),
+        help="generator processes"
+    )
+    parser.add_argument(
+        "--out", type=str, default=None,
+        help="bundle file, worlds/<env>/seed_<seed>.bundle by default"
+    )
+    args = parser.parse_args()
+
+    # headless, the worlds are only generated
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    os.environ['SDL_AUDIODRIVER'] = 'dummy'
+    out = args.out or f"worlds/{args.env}/seed_{args.seed}.bundle"
+    summary = generate_bundle(args.env, out, args.n_tasks, seed=args.seed, num_workers=args.num_workers)
+    print(f"\033[32mBundle:\033[0m {out}, {summary.pop('worlds')} worlds, {summary.pop('rejected')} rejected")
+    for key, values in summary.items():
+        print(f"  {key}: mean {values['mean']}, min {values['min']}, max {values['max']}")
@@ -0,0 +1,124 @@
+import argparse
+import contextlib
+import functools
+import io
+import os
+import pathlib
+import time
+
+# no window while testing the envs
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import gym
+import pytest
+
+import envs.utils  # registers the env ids
+
+WORLD = pathlib.Path(__file__).resolve().parents[1]
+# main.py defaults
+MAIN_ARGS = dict(seed=0, train=False, env="navigation", agent_model="gpt-4o-mini", max_trial=1,
+                 train_temperature=0, test_temperature=0, manual_type=None, imperfect_aware=None,
+                 hierachical=False, exploration_model=None, note="", debug=False, structured_prompt=False,
+                 pipeline_think=False, num_workers=1, visualization="gif", frame_every=1, frame_scale=1.0,
+                 world_cache=None, world_bundle=None, resume=False, llm_endpoints=None, sweep=None)
+
+
+def quiet(fn, *args, **kwargs):
+    """Call fn without the prints of the envs (the roguelike logs its whole generation)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+@pytest.fixture
+def make_env():
+    def make(env_id):
+        return gym.make(env_id, disable_env_checker=True).unwrapped
+    return make
+
+
+class StubOllama(object):
+    """
+    Stands in for the pooled ollama.Client: streams `chunks` one every `delay`
+    seconds, or an endless stream when `chunks` is None.
+    """
+    def __init__(self):
+        self.chunks = ["turn left"]
+        self.delay = 0.0
+        self.requests = []
+        self.served = 0
+
+    def chat(self, model, messages, options, stream):
+        self.requests.append(messages)
+        return self.stream()
+
+    def stream(self):
+        chunks = self.chunks
+        i = 0
+        while chunks is None or i < len(chunks):
+            time.sleep(self.delay)
+            self.served += 1
+            last = chunks is not None and i == len(chunks) - 1
+            yield {"message": {"content": "step " if chunks is None else chunks[i]}, "done": last}
+            i += 1
+
+
+@pytest.fixture
+def ollama_stub(monkeypatch):
+    import common.llms as llms
+    from common.llm_clients import registry
+    previous = registry.endpoints.get("ollama")
+    registry.configure({"ollama": ["http://ollama-stub:11434"]})
+    stub = StubOllama()
+    registry.endpoints["ollama"][0]._client = stub
+    # the tiktoken encoding is downloaded on first use, count words instead
+    monkeypatch.setattr(llms, "token_num", lambda prompt: len(str(prompt).split()))
+    yield stub
+    if previous is None:
+        registry.endpoints.pop("ollama", None)
+    else:
+        registry.endpoints["ollama"] = previous
+
+
+class WordEncoder(object):
+    def encode(self, text):
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+@pytest.fixture
+def pinned_gym(monkeypatch):
+    """gym.make as the code calls it, on the gym installed here."""
+    if not hasattr(gym.envs.registry, "env_specs"):
+        # gym >= 0.26 instead of the pinned 0.24.0: plain dict registry and a checker rejecting the envs
+        monkeypatch.setattr(envs.utils, "is_env_registered", lambda env_id: env_id in gym.envs.registry)
+        monkeypatch.setattr(gym, "make", functools.partial(gym.make, disable_env_checker=True))
+
+
+@pytest.fixture
+def run_args(tmp_path, monkeypatch, pinned_gym):
+    """
+    Builds the finalized main.py args of a debug run, logging to ./logs under
+    tmp_path. The runs go through load_env like main.py, on the gym installed here.
+    """
+    import common.llms as llms
+    from common.llm_mock import set_mock_policy
+    from common.utils import finalize_args
+    # the env configs are read relative to the working directory
+    (tmp_path / "envs").symlink_to(WORLD / "envs")
+    monkeypatch.syspath_prepend(str(WORLD))
+    monkeypatch.chdir(tmp_path)
+    # the tiktoken encoding is downloaded on first use
+    monkeypatch.setattr(llms, "get_encoder", WordEncoder)
+
+    def make(n_test_tasks=None, **overrides):
+        args = argparse.Namespace(**{**MAIN_ARGS, "debug": True, "visualization": "none", **overrides})
+        finalize_args(args)
+        if n_test_tasks is not None:
+            args.n_test_tasks = n_test_tasks
+        return args
+
+    yield make
+    set_mock_policy(None)
@@ -0,0 +1,39 @@
+import pytest
+
+import common.llms as llms
+from common.llm_mock import set_mock_policy
+from llmagentbase.agent.base import Agent
+
+
+class RecordingLogger(object):
+    def __init__(self):
+        self.lines = []
+        self.usage = []
+
+    def colored_log(self, *args, color=None):
+        self.lines.append(" ".join(str(arg) for arg in args))
+
+    def log_usage(self, usage):
+        self.usage.append(dict(usage))
+
+
+class WordEncoder(object):
+    def encode(self, text):
+        return text.split()
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    # the tiktoken encoding is downloaded on first use, count words instead
+    monkeypatch.setattr(llms, "token_num", lambda prompt: len(str(prompt).split()))
+    monkeypatch.setattr(llms, "get_encoder", lambda: WordEncoder())
+    yield Agent(None, "instruction", "examples", RecordingLogger(), "mock", 0.0)
+    set_mock_policy(None)
+
+
+def test_get_action_writes_nothing_to_stdout(agent, capsys):
+    set_mock_policy(lambda prompt: "move forward\n")
+    assert agent.get_action("Observation: a road\nAction: ", max_tokens=16, stop=["\n"]) == "move forward"
+    assert capsys.readouterr().out == ""
+    # the incremental count of the prompt goes to the usage record instead
+    assert [usage["prompt_tokens"] for usage in agent.logger.usage] == [4]
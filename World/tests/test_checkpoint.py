@@ -0,0 +1,58 @@
+import json
+
+from common.logger import Logger
+from envs.cuterpg.utils.seeding import task_seed
+from llmagentbase.run.checkpoint import load_records, make_record, record_memory, save_record
+from llmagentbase.run.collect import collect_trajs
+
+
+def read_records(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_load_records_skips_a_partial_line_and_other_seeds(tmp_path, run_args):
+    args = run_args(env="VillageNav-v0")
+    path = str(tmp_path / "tasks.jsonl")
+    memory = ["Observation: a road", "I should turn earlier."]
+    save_record(path, make_record(0, 0, task_seed(0, "VillageNav-v0", 0), [0.0, 1.0], [5, 3], memory))
+    save_record(path, make_record(1, 1, task_seed(1, "VillageNav-v0", 1), [1.0], [4], memory))
+    with open(path, "a") as f:
+        f.write('{"task_idx": 2, "task_na')
+    records = load_records(path, args)
+    assert list(records) == [0]
+    assert records[0]["rewards"] == [0.0, 1.0]
+    assert record_memory(records[0]) == memory
+
+
+def test_resume_runs_only_the_unfinished_tasks(run_args):
+    task_range = list(range(3))
+    args = run_args(env="VillageNav-v0", agent_model="mock", n_test_tasks=3)
+    logger = Logger(args)
+    collect_trajs(task_range, logger, 1, args, False)
+    logger.close()
+    path = f"{logger.log_folder}/tasks.jsonl"
+    finished = read_records(path)
+
+    # crashed while saving the last task
+    with open(path, "w") as f:
+        f.write("".join(json.dumps(record) + "\n" for record in finished[:2]))
+        f.write(json.dumps(finished[2])[:40])
+    args.resume = True
+    resumed = Logger(args)
+    collect_trajs(task_range, resumed, 1, args, False)
+    resumed.close()
+
+    with open(resumed.log_file) as f:
+        log = f.read()
+    assert log.count("restored from checkpoint") == 2
+    # the log of the first run is kept, task 3 ran twice
+    assert log.count("Trial #1") == 4
+    assert resumed.steps_all == logger.steps_all
+    # the restored rewards feed the same running averages
+    averages = [line for line in log.splitlines() if "Average" in line and "reward" in line]
+    assert len(averages) == 12 and averages[:6] == averages[6:]
+    # one mock call per step
+    assert len(resumed.usage) == finished[2]["steps"][0]
+    # and the next resume finds every task
+    assert load_records(path, args) == {record["task_name"]: record for record in finished}
@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import common.llms as llms
+from common.deadline import Deadline, DeadlineExceeded, current_deadline, deadline_scope
+
+
+def test_deadline_expires():
+    deadline = Deadline(0.05)
+    assert not deadline.expired()
+    time.sleep(0.1)
+    assert deadline.expired()
+    assert deadline.remaining() == 0
+    with pytest.raises(DeadlineExceeded):
+        deadline.check()
+
+
+def test_deadline_follows_its_parent():
+    parent = Deadline(0.2)
+    child = Deadline(60, parent=parent)
+    assert child.remaining() <= 0.2
+    assert Deadline(parent=Deadline()).remaining() is None
+    parent.cancel()
+    assert child.cancelled() and child.expired()
+    with pytest.raises(DeadlineExceeded, match="cancelled"):
+        child.check()
+
+
+def test_deadline_scope_is_per_thread():
+    seen = {}
+
+    def worker():
+        seen["worker"] = current_deadline()
+
+    with deadline_scope(10) as deadline:
+        assert current_deadline() is deadline
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+    assert seen["worker"] is None
+    assert current_deadline() is None
+
+
+def test_llm_times_out_in_a_worker_thread(ollama_stub):
+    # an endless stream, only the deadline of the attempt can end it
+    ollama_stub.chunks = None
+    ollama_stub.delay = 0.02
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        response = pool.submit(llms.llm, "Which way?", "qwen3:14b", cache=False, max_trial=1, timeout=0.3).result(timeout=10)
+    assert response == ""
+    assert 0.3 <= time.monotonic() - start < 3
+
+
+def test_deadlines_of_concurrent_calls_are_independent(ollama_stub):
+    ollama_stub.delay = 0.05
+    ollama_stub.chunks = ["turn ", "left"]
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        # the short timeout of the first call must not cut the second one
+        short = pool.submit(llms.llm, "Which way?", "qwen3:14b", cache=False, max_trial=1, timeout=0.01)
+        long = pool.submit(llms.llm, "Which way?", "qwen3:14b", cache=False, max_trial=1, timeout=10)
+        assert short.result(timeout=10) == ""
+        assert long.result(timeout=10) == "turn left"
+
+
+def test_cancelling_allm_stops_the_request(ollama_stub):
+    ollama_stub.chunks = None
+    ollama_stub.delay = 0.02
+
+    async def ask():
+        await asyncio.wait_for(llms.allm("Which way?", "qwen3:14b", cache=False, max_trial=1), 0.3)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(ask())
+    # the request in the worker pool sees the cancelled deadline at its next chunk
+    time.sleep(0.2)
+    served = ollama_stub.served
+    time.sleep(0.2)
+    assert ollama_stub.served == served
@@ -0,0 +1,72 @@
+import pytest
+
+from conftest import quiet
+from envs.cuterpg.utils.seeding import seed_everything
+
+
+def play(env, actions, seed=0):
+    # the actions may draw from the global generators, same draws on every replay
+    seed_everything(seed)
+    return [quiet(env.step, action)[0] for action in actions]
+
+
+@pytest.mark.parametrize("env_id", ["Roguelike-easy-v0", "Roguelike-hard-v0", "Roguelike-shuffle-easy-v0"])
+def test_roguelike_back_to_start(make_env, env_id):
+    env = make_env(env_id)
+    quiet(env.reset, seed=3)
+    # starting the game shuffles the containers of some modes
+    seed_everything(1)
+    start, manual = quiet(env.get_manual, None)
+    actions = ["leave", "talk", "leave", "attack"]
+    first = play(env, actions)
+    assert env.env.game.current_level_index > 0
+
+    quiet(env.back_to_start)
+    # as the adventurer starts every trial
+    seed_everything(1)
+    obs, manual_again = quiet(env.get_manual, None)
+    assert obs == start
+    assert manual_again == manual
+    assert env.env.game.current_level_index == 0
+    assert play(env, actions) == first
+
+
+def test_roguelike_without_rewind_keeps_no_start(make_env):
+    env = make_env("Roguelike-easy-v0")
+    env.rewind = False
+    quiet(env.reset, seed=3)
+    quiet(env.step, "leave")
+    assert env.initial_snapshot is None
+    with pytest.raises(RuntimeError):
+        env.back_to_start()
+
+
+def test_roguelike_snapshot_restore(make_env):
+    env = make_env("Roguelike-easy-v0")
+    quiet(env.reset, seed=5)
+    quiet(env.get_manual, None)
+    quiet(env.step, "leave")
+    snapshot = env.snapshot()
+    after = play(env, ["leave", "leave"])
+    env.restore(snapshot)
+    assert play(env, ["leave", "leave"]) == after
+
+
+def test_navigation_back_to_start(make_env):
+    env = make_env("VillageNav-v0")
+    start = env.reset(seed=3)
+    position = env.character.position
+    actions = ["forward", "turn left", "forward", "turn right", "forward"]
+    first = play(env, actions)
+    assert env.back_to_start() == start
+    assert env.character.position == position
+    assert play(env, actions) == first
+
+
+def test_cooking_back_to_start(make_env):
+    env = make_env("Cooking-easy-v0")
+    start = env.reset(seed=3)
+    actions = ["goto farm", "goto store", "goto restaurant"]
+    first = play(env, actions)
+    assert env.back_to_start() == start
+    assert play(env, actions) == first
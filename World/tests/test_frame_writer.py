@@ -0,0 +1,55 @@
+import os
+
+import imageio
+import numpy as np
+import pytest
+
+from common.frame_writer import FrameWriter
+from common.logger import Logger
+
+
+def frames(n, height=40, width=60):
+    return [np.full((height, width, 3), 20 * i, dtype=np.uint8) for i in range(n)]
+
+
+def test_every_nth_frame_is_kept_and_resized(tmp_path):
+    path = str(tmp_path / "episode.gif")
+    writer = FrameWriter(path, every=3, scale=0.5)
+    for frame in frames(10):
+        writer.add(frame)
+    # frames 0, 3, 6 and 9
+    assert writer.close() == 4
+    written = imageio.mimread(path)
+    assert len(written) == 4
+    assert written[0].shape[:2] == (20, 30)
+    assert [int(frame[..., :3].mean()) for frame in written] == [0, 60, 120, 180]
+
+
+def test_encoding_errors_are_raised_at_close(tmp_path):
+    writer = FrameWriter(str(tmp_path / "episode.gif"))
+    writer.add(frames(1)[0])
+    writer.add("not a frame")
+    writer.add(frames(1)[0])
+    with pytest.raises(Exception):
+        writer.close()
+    assert writer.written == 1
+
+
+@pytest.mark.parametrize("reward, outcome", [(1, "success"), (0, "failure")])
+def test_logger_names_the_visualization_after_the_outcome(run_args, reward, outcome):
+    logger = Logger(run_args(env="VillageNav-v0", visualization="gif", frame_every=2))
+    for frame in frames(5):
+        logger.log_frame(frame)
+    logger.save_gif("task_3", reward)
+    logger.close()
+    assert os.listdir(logger.gif_folder) == [f"task_3_{outcome}.gif"]
+    assert len(imageio.mimread(f"{logger.gif_folder}/task_3_{outcome}.gif")) == 3
+
+
+def test_no_frames_are_kept_without_visualization(run_args):
+    logger = Logger(run_args(env="VillageNav-v0"))
+    logger.log_frame(frames(1)[0])
+    assert logger.frame_writer is None
+    logger.save_gif("task_3", 1)
+    logger.close()
+    assert os.listdir(logger.gif_folder) == []
@@ -0,0 +1,60 @@
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from envs.cuterpg.NavigationMap.grid import FreeCells
+from envs.cuterpg.utils.seeding import seed_everything
+
+
+def test_remove_keeps_the_cells_mask_and_index_in_sync():
+    mask = np.zeros((4, 5), dtype=bool)
+    mask[1:3, 1:4] = True
+    free = FreeCells(mask)
+    assert len(free) == 6 and (2, 3) in free and (0, 0) not in free
+    for cell in [(1, 1), (2, 3), (1, 2)]:
+        free.remove(cell)
+        assert cell not in free and not free.mask[cell]
+    assert sorted(free.cells) == [(1, 3), (2, 1), (2, 2)]
+    assert all(free.cells[free.index[cell]] == cell for cell in free.cells)
+    assert sorted(map(tuple, np.argwhere(free.mask).tolist())) == sorted(free.cells)
+    # the mask passed in is left alone
+    assert mask.sum() == 6
+
+
+def test_sample_only_returns_accepted_free_cells():
+    free = FreeCells(np.ones((6, 6), dtype=bool))
+    free.remove((0, 0))
+    where = np.zeros((6, 6), dtype=bool)
+    where[:2, :] = True
+    seed_everything(0)
+    for _ in range(200):
+        row, col = free.sample(where, lambda row, col: col % 2 == 0)
+        assert row < 2 and col % 2 == 0 and (row, col) != (0, 0)
+    assert free.sample(where, lambda row, col: False) is None
+    assert free.sample(np.zeros((6, 6), dtype=bool)) is None
+    assert len(free) == 35
+
+
+def test_sample_is_uniform_over_the_accepted_cells():
+    free = FreeCells(np.ones((3, 4), dtype=bool))
+    accepted = {(0, 1), (1, 1), (2, 3)}
+    random.seed(0)
+    draws = Counter(free.sample(free.mask, lambda row, col: (row, col) in accepted) for _ in range(6000))
+    assert set(draws) == accepted
+    assert all(abs(count - 2000) < 200 for count in draws.values())
+
+
+@pytest.mark.parametrize("env_id, seed", [("VillageNav-v0", 0), ("VillageNav-Seasonal-v0", 1), ("UrbanNav-v0", 2)])
+def test_placed_objects_do_not_overlap(make_env, env_id, seed):
+    env = make_env(env_id)
+    env.reset(seed=seed)
+    game_map = env.game_map
+    for season, objects in game_map.objects.items():
+        taken = np.zeros(game_map.map_data[season].shape, dtype=int)
+        for obj in objects:
+            if obj["type"] == "object":
+                (row, col), (height, width) = obj["position"], obj["size"]
+                taken[row:row + height, col:col + width] += 1
+        assert taken.max() == 1
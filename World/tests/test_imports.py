@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+WORLD = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def imported_by(module, candidates):
+    # in a fresh interpreter, without the key that common.llms used to read at import
+    code = f"import sys, {module}; print(' '.join(m for m in {candidates!r} if m in sys.modules))"
+    env = {key: value for key, value in os.environ.items() if key != "OPENAI_API_KEY"}
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=WORLD, env=env)
+    return out.stdout.split()
+
+
+@pytest.mark.parametrize("module", ["common.llms", "common.utils", "llmagentbase.run.collect"])
+def test_backend_sdks_are_imported_on_first_use(module):
+    assert imported_by(module, ("openai", "tiktoken", "wandb")) == []
+
+
+def test_env_registration_imports_no_env_package():
+    assert imported_by("envs.utils", ("envs.cuterpg.navigation", "envs.cuterpg.cooking", "envs.cuterpg.game")) == []
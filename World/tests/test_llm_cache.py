@@ -0,0 +1,94 @@
+import itertools
+
+import pytest
+
+import common.llms as llms
+import common.llm_cache as llm_cache_module
+from common.llm_cache import LLMCache, make_key
+
+
+class Clock(object):
+    """A strictly increasing clock, entries written in the same instant would tie on last_access."""
+    def __init__(self):
+        self.ticks = itertools.count(1)
+
+    def time(self):
+        return float(next(self.ticks))
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_cache_module, "time", Clock())
+    cache = LLMCache(str(tmp_path / "cache.sqlite"))
+    yield cache
+    cache.close()
+
+
+def test_key_is_content_addressed():
+    key = make_key("qwen3:14b", "Which way?", 0.08, 128, ["\n", "Observation"])
+    # same request in another form
+    assert make_key("qwen3:14b", [{"role": "user", "content": "Which way?"}], 0.080000001, 128, ["Observation", "\n"]) == key
+    assert make_key("qwen3:14b", "Which way?", 0.08, 128, None) == make_key("qwen3:14b", "Which way?", 0.08, 128, [])
+    for other in [make_key("qwen3:32b", "Which way?", 0.08, 128, ["\n", "Observation"]),
+                  make_key("qwen3:14b", "Which way ?", 0.08, 128, ["\n", "Observation"]),
+                  make_key("qwen3:14b", "Which way?", 0.5, 128, ["\n", "Observation"]),
+                  make_key("qwen3:14b", "Which way?", 0.08, 64, ["\n", "Observation"])]:
+        assert other != key
+
+
+def test_cached_call_hit_and_stats(cache):
+    calls = []
+
+    def generate():
+        calls.append(1)
+        return "turn left"
+
+    assert cache.cached_call(generate, "m", "p", 0.0, 16, None) == "turn left"
+    assert cache.cached_call(generate, "m", "p", 0.0, 16, None) == "turn left"
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+    assert stats["bytes"] == stats["bytes_saved"] == len("turn left")
+    assert "1 hits / 1 misses" in cache.summary()
+
+
+def test_empty_responses_are_not_cached(cache):
+    assert cache.cached_call(lambda: "", "m", "p", 0.0, 16, None) == ""
+    assert cache.cached_call(lambda: "finish", "m", "p", 0.0, 16, None) == "finish"
+    assert cache.stats()["entries"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    cache.max_bytes = 30
+    cache.check_every = 1
+    for key in "abc":
+        cache.set(key, key * 10)
+    # reading a makes b the least recently used entry
+    assert cache.get("a") == "a" * 10
+    cache.set("d", "d" * 10)
+    # 40 bytes over a cap of 30, evicted down to 27
+    assert cache.get("b") is None
+    assert cache.get("c") is None
+    assert cache.get("a") == "a" * 10
+    assert cache.get("d") == "d" * 10
+
+
+def test_processes_share_the_file(cache):
+    cache.set("key", "turn left")
+    other = LLMCache(cache.path)
+    try:
+        assert other.get("key") == "turn left"
+    finally:
+        other.close()
+
+
+def test_llm_serves_repeated_requests_from_the_cache(cache, ollama_stub, monkeypatch):
+    monkeypatch.setattr(llms, "llm_cache", cache)
+    first = llms.llm("Which way?", "qwen3:14b", max_trial=1)
+    second = llms.llm("Which way?", "qwen3:14b", max_trial=1)
+    assert first == second == "turn left"
+    assert len(ollama_stub.requests) == 1
+    # cache=False always goes to the backend
+    llms.llm("Which way?", "qwen3:14b", max_trial=1, cache=False)
+    assert len(ollama_stub.requests) == 2
@@ -0,0 +1,93 @@
+import pytest
+
+import common.llms as llms
+import common.llm_gpt as llm_gpt
+from common.early_stop import early_stop_scope
+from common.llm_gpt import openai_stream
+from common.usage import usage_scope, summarize_usage
+
+
+class Stream(object):
+    """A streamed chat completion of the legacy openai api, counting the chunks read."""
+    def __init__(self, deltas):
+        self.deltas = deltas
+        self.read = 0
+
+    def __iter__(self):
+        # the first chunk of a stream only carries the role
+        yield {"choices": [{"delta": {"role": "assistant"}}]}
+        for delta in self.deltas:
+            self.read += 1
+            yield {"choices": [{"delta": {"content": delta}}]}
+
+
+class ChatCompletion(object):
+    requests = []
+    deltas = []
+    stream = None
+
+    @classmethod
+    def create(cls, **request):
+        cls.requests.append(request)
+        cls.stream = Stream(cls.deltas)
+        return cls.stream
+
+
+class FakeOpenAI(object):
+    ChatCompletion = ChatCompletion
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    monkeypatch.setattr(llm_gpt, "_openai", FakeOpenAI)
+    monkeypatch.setattr(llms, "token_num", lambda prompt: len(str(prompt).split()))
+    ChatCompletion.requests = []
+    return ChatCompletion
+
+
+def test_stream_stops_reading_at_a_stop_string():
+    stream = Stream(["go ", "north", "\nObs", "ervation: a wall", " more", " more"])
+    with usage_scope("gpt-4o-mini") as usage:
+        assert openai_stream(stream, stop=["\nObservation"]) == "go north"
+    # nothing is read past the chunk completing the stop string
+    assert stream.read == 4
+    assert usage["completion_tokens"] == 4
+    assert usage["ttft"] is not None and usage["ttft"] <= usage["latency"]
+
+
+def test_stream_applies_the_early_stop_rule():
+    stream = Stream(["think[", "plan]", " go", " north"])
+    with usage_scope("gpt-4o-mini"), early_stop_scope(lambda text: text.find("]") + 1 or None):
+        assert openai_stream(stream) == "think[plan]"
+    assert stream.read == 2
+
+
+def test_llm_records_the_usage_of_a_streamed_call(fake_openai):
+    fake_openai.deltas = ["turn", " left", "\nObservation:", " ignored"]
+
+    class UsageLog(object):
+        def __init__(self):
+            self.usage = []
+
+        def log_usage(self, usage):
+            self.usage.append(dict(usage))
+
+    log = UsageLog()
+    response = llms.llm("Which way now?", "gpt-4o-mini", stop=["\nObservation"], cache=False, max_trial=1, logger=log)
+    assert response == "turn left"
+    assert fake_openai.requests[0]["stream"] is True
+    assert fake_openai.requests[0]["messages"] == [{"role": "user", "content": "Which way now?"}]
+    [usage] = log.usage
+    assert usage["model"] == "gpt-4o-mini"
+    # the legacy stream reports no usage, the prompt is counted locally
+    assert (usage["prompt_tokens"], usage["completion_tokens"], usage["cached"]) == (3, 3, False)
+    assert usage["latency"] > 0 and usage["ttft"] is not None
+
+
+def test_summarize_usage():
+    records = [{"model": "m", "prompt_tokens": 10, "completion_tokens": 2, "latency": 1.0, "ttft": 0.5, "cached": False},
+               {"model": "m", "prompt_tokens": 10, "completion_tokens": 2, "latency": 0.0, "ttft": None, "cached": True}]
+    summary = summarize_usage(records)
+    assert (summary["calls"], summary["cached_calls"], summary["prompt_tokens"], summary["completion_tokens"]) == (2, 1, 20, 4)
+    assert (summary["total_latency"], summary["mean_latency"], summary["mean_ttft"]) == (1.0, 0.5, 0.5)
+    assert summarize_usage([])["calls"] == 0
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+import common.llms as llms
+import common.llm_mock as llm_mock
+from common.llm_mock import TraceReplayer, record_trace, set_mock_policy, trace_key
+
+
+@pytest.fixture(autouse=True)
+def fresh_mock(monkeypatch):
+    monkeypatch.setattr(llm_mock, "_replayers", {})
+    yield
+    set_mock_policy(None)
+
+
+def test_mock_policy():
+    assert llms.llm("Which way?", "mock", max_trial=1) == "finish"
+    set_mock_policy(lambda prompt: f"seen {len(prompt.split())} words")
+    assert llms.llm("Which way now?", "mock", max_trial=1) == "seen 3 words"
+
+
+def test_recorded_trace_replays_without_the_backend(tmp_path, ollama_stub, monkeypatch):
+    trace = str(tmp_path / "trace.jsonl")
+    monkeypatch.setattr(llms, "RECORD_PATH", trace)
+    monkeypatch.setattr(llm_mock, "RECORD_PATH", trace)
+    prompts = ["Observation: a road", "Observation: a wall", "Observation: a bridge"]
+    recorded = []
+    for prompt, chunks in zip(prompts, [["forward"], ["turn ", "left"], ["finish"]]):
+        ollama_stub.chunks = chunks
+        recorded.append(llms.llm(prompt, "qwen3:14b", cache=False, max_trial=1, stop=["\n"]))
+    assert recorded == ["forward", "turn left", "finish"]
+    with open(trace) as f:
+        assert [json.loads(line)["model"] for line in f] == ["qwen3:14b"] * 3
+
+    # replayed out of order, each request is matched on its key
+    served = len(ollama_stub.requests)
+    for i in [2, 0, 1]:
+        assert llms.llm(prompts[i], f"replay:{trace}", max_trial=1, stop=["\n"]) == recorded[i]
+    assert len(ollama_stub.requests) == served
+
+
+def test_replayer_serves_unmatched_requests_in_recorded_order(tmp_path):
+    trace = str(tmp_path / "trace.jsonl")
+    for prompt, response in [("a", "forward"), ("b", "turn left"), ("c", "finish")]:
+        record_trace(prompt, "qwen3:14b", 0.0, 16, None, response, path=trace)
+    replayer = TraceReplayer(trace)
+    assert replayer.respond(trace_key("b", 0.0, 16, None)) == "turn left"
+    # b was served by its key, the others in order
+    assert replayer.respond("unknown") == "forward"
+    assert replayer.respond("unknown") == "finish"
+    assert replayer.respond("unknown") == ""
+
+
+def test_oracle_policy_reaches_the_navigation_goal(make_env):
+    env = make_env("VillageNav-v0")
+    env.reset(seed=2)
+    set_mock_policy(lambda prompt: env.oracle_action())
+    for _ in range(env.get_horizon()):
+        obs, reward, done, info = env.step(llms.llm("Action: ", "mock", max_trial=1))
+        if done:
+            break
+    assert done and reward == 1
@@ -0,0 +1,93 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import common.llms as llms
+from common.llm_clients import registry
+from common.llm_mock import set_mock_policy
+
+
+class StubVLLMHandler(BaseHTTPRequestHandler):
+    """Answers /v1/chat/completions like a vllm server serving Qwen3."""
+    requests = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.requests.append((self.path, body))
+        payload = json.dumps({
+            "id": "cmpl-stub",
+            "object": "chat.completion",
+            "model": body["model"],
+            "choices": [{"index": 0,
+                         "message": {"role": "assistant", "content": "<think>\n</think>turn left"},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7},
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def vllm_server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubVLLMHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    StubVLLMHandler.requests = []
+    previous = registry.endpoints.get("vllm")
+    registry.configure({"vllm": [f"http://127.0.0.1:{server.server_port}/v1"]})
+    # the tiktoken encoding is downloaded on first use, count words instead
+    monkeypatch.setattr(llms, "token_num", lambda prompt: len(str(prompt).split()))
+    yield StubVLLMHandler.requests
+    server.shutdown()
+    server.server_close()
+    if previous is None:
+        registry.endpoints.pop("vllm", None)
+    else:
+        registry.endpoints["vllm"] = previous
+
+
+def test_llm_goes_through_vllm(vllm_server):
+    response = llms.llm("Which way?", "Qwen/Qwen3-32B", cache=False, max_trial=1, stop=["\nObservation"])
+    assert response == "turn left"
+    assert len(vllm_server) == 1
+    path, body = vllm_server[0]
+    assert path == "/v1/chat/completions"
+    assert body["model"] == "Qwen/Qwen3-32B"
+    assert body["messages"] == [{"role": "user", "content": "/nothink Which way?"}]
+    assert body["stop"] == ["\nObservation"]
+
+
+def test_llm_batch_fans_out_to_vllm(vllm_server):
+    responses = llms.llm_batch([f"prompt {i}" for i in range(4)], "Qwen/Qwen3-32B", cache=False, max_trial=1)
+    assert responses == ["turn left"] * 4
+    assert sorted(body["messages"][0]["content"] for _, body in vllm_server) == \
+        [f"/nothink prompt {i}" for i in range(4)]
+
+
+class UsageLog(object):
+    def __init__(self):
+        self.usage = []
+
+    def log_usage(self, usage):
+        self.usage.append(dict(usage))
+
+
+def test_llm_batch_forwards_prompt_tokens_and_early_stop(monkeypatch):
+    monkeypatch.setattr(llms, "token_num", lambda prompt: len(str(prompt).split()))
+    set_mock_policy(lambda prompt: f"{prompt} done\nObservation: more")
+    log = UsageLog()
+    try:
+        responses = llms.llm_batch(["a", "b c"], "mock", logger=log, prompt_tokens=[100, 200],
+                                   early_stop=lambda text: text.find("\nObservation") if "\nObservation" in text else None)
+    finally:
+        set_mock_policy(None)
+    assert responses == ["a done", "b c done"]
+    assert sorted(usage["prompt_tokens"] for usage in log.usage) == [100, 200]
@@ -0,0 +1,70 @@
+import threading
+import time
+
+from common.logger import LogSink, Logger
+
+
+def read(path):
+    with open(path) as f:
+        return f.read()
+
+
+def test_sink_keeps_the_order_of_concurrent_writers(tmp_path):
+    sink = LogSink(str(tmp_path / "log.txt"), flush_interval=60)
+
+    def write(name):
+        for i in range(200):
+            sink.write(f"{name} {i}\n")
+
+    threads = [threading.Thread(target=write, args=(name,)) for name in "abc"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    sink.flush()
+    lines = read(sink.path).splitlines()
+    assert len(lines) == 600
+    for name in "abc":
+        assert [line for line in lines if line.startswith(name)] == [f"{name} {i}" for i in range(200)]
+    sink.close()
+
+
+def test_sink_flushes_on_flush_interval_and_close(tmp_path):
+    path = str(tmp_path / "log.txt")
+    sink = LogSink(path, flush_interval=0.05)
+    sink.write("first\n")
+    # nothing asked for a flush, the background thread flushes once idle
+    deadline = time.time() + 5
+    while read(path) != "first\n" and time.time() < deadline:
+        time.sleep(0.01)
+    assert read(path) == "first\n"
+
+    sink.flush_interval = 60
+    sink.write("second\n")
+    sink.close()
+    assert read(path) == "first\nsecond\n"
+    # from an exit handler running after close
+    sink.write("third\n")
+    assert read(path) == "first\nsecond\nthird\n"
+    sink.close()
+
+
+def test_logger_writes_what_it_prints(run_args, capsys):
+    args = run_args(env="VillageNav-v0")
+    logger = Logger(args)
+    logger.log("Observation:", "a road")
+    logger.colored_log("Task 1:", "done", color="green")
+    logger.write("from a worker\n")
+    logger.flush()
+    assert read(logger.log_file) == "Observation: a road\n\033[32mTask 1:\033[0m done\nfrom a worker\n"
+    assert "Observation: a road" in capsys.readouterr().out
+    logger.close()
+
+    # a resumed run appends to the log of the run it resumes
+    args.resume = True
+    resumed = Logger(args)
+    resumed.log("resumed")
+    resumed.close()
+    assert read(logger.log_file).endswith("from a worker\nresumed\n")
+    Logger(run_args(env="VillageNav-v0")).close()
+    assert read(logger.log_file) == ""
@@ -0,0 +1,89 @@
+import numpy as np
+import pygame
+import pytest
+
+from conftest import quiet
+from envs.cuterpg.NavigationMap.grid import ROAD
+from envs.cuterpg.utils.config import GRID_SIZE, TILE_SIZE
+from envs.cuterpg.utils.seeding import seed_everything
+from envs.cuterpg.utils.tileset import TileSet
+
+
+def draw_from_disk(game_map, screen):
+    # every tile and object blitted on every frame, the sprites read from disk, as before the caches
+    tileset = TileSet(game_map.season)
+    tiles = {"land": tileset.get_land(), "road": tileset.get_road(), "highlighted": tileset.get_highlighted_road()}
+    if game_map.construction:
+        tiles["alter"] = tileset.get_alter_road()
+    for row in range(0, game_map.MAP_ROWS * TILE_SIZE, TILE_SIZE):
+        for col in range(0, game_map.MAP_COLS * TILE_SIZE, TILE_SIZE):
+            if (col, row) in game_map.path:
+                tile = tiles["highlighted"]
+            elif game_map.construction and (col, row) in game_map.alter_path:
+                tile = tiles["alter"]
+            else:
+                tile = tiles["road"] if game_map.map_data[game_map.season][row, col] == ROAD else tiles["land"]
+            screen.blit(tile, (col * GRID_SIZE, row * GRID_SIZE))
+    for obj in game_map.objects[game_map.season]:
+        obj_type = obj["type"]
+        if obj_type == "house":
+            obj_tile = tileset.get_house(16, 32, 8, 10)
+        elif obj_type == "destination":
+            obj_tile = tileset.get_house(8, 32, 8, 10)
+        elif obj_type == "grass":
+            obj_tile = tileset.get_object(25, 20, 1, 1)
+        elif obj_type == "npc":
+            obj_tile = game_map.npc_list[int(obj["name"].split("_")[1])]
+        elif obj_type == "object":
+            obj_tile = pygame.image.load(f"envs/cuterpg/utils/assets/{game_map.season}_objects/object_{obj['id']}.png").convert_alpha()
+        elif obj_type == "construction":
+            obj_tile = pygame.image.load(f"envs/cuterpg/utils/assets/construction/{obj['name'].split('_construction')[0]}.png").convert_alpha()
+        elif obj_type == "light":
+            obj_tile = pygame.image.load(f"envs/cuterpg/utils/assets/lights/object_{obj['id']}.png").convert_alpha()
+        else:
+            continue
+        row, col = obj["position"]
+        screen.blit(obj_tile, (col * GRID_SIZE, row * GRID_SIZE))
+
+
+def frame(game_map, draw):
+    game_map.screen.fill((0, 0, 0))
+    draw()
+    return pygame.surfarray.array3d(game_map.screen)
+
+
+@pytest.mark.parametrize("env_id", ["VillageNav-v0", "VillageNav-Seasonal-v0", "VillageNav-Dynamic-v0",
+                                    "VillageNav-NPC_mixed-v0", "UrbanNav-Construction-v0"])
+def test_frames_match_drawing_everything_from_disk(make_env, env_id):
+    env = make_env(env_id)
+    quiet(env.reset, seed=4)
+    game_map = env.game_map
+    seed_everything(0)
+    for action in [None, "forward", "turn left", "forward", "turn right", "forward"]:
+        if action is not None:
+            quiet(env.step, action)
+        cached = frame(game_map, game_map.draw)
+        assert cached.any()
+        assert np.array_equal(cached, frame(game_map, lambda: draw_from_disk(game_map, game_map.screen)))
+    if len(game_map.seasons) > 1:
+        game_map.switch_season()
+        cached = frame(game_map, game_map.draw)
+        assert np.array_equal(cached, frame(game_map, lambda: draw_from_disk(game_map, game_map.screen)))
+
+
+def test_sprites_are_loaded_once(make_env, monkeypatch):
+    env = make_env("VillageNav-Dynamic-v0")
+    env.reset(seed=4)
+    loads = []
+    original_load = pygame.image.load
+    monkeypatch.setattr(pygame.image, "load", lambda path: loads.append(path) or original_load(path))
+    for action in ["forward", "turn left", "forward"]:
+        env.step(action)
+    env.reset(seed=5)
+    env.step("forward")
+    # only the sprites of the second map that the first one did not use
+    assert len(loads) == len(set(loads))
+    first = len(loads)
+    env.reset(seed=4)
+    env.step("forward")
+    assert len(loads) == first
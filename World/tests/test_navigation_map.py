@@ -0,0 +1,143 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+from envs.cuterpg.NavigationMap.grid import (LabelTable, BASE_LABELS, ROAD, DESTINATION, CONSTRUCTION, fit_mask,
+                                             pure_tiles, any_tiles, corner_tiles)
+from envs.cuterpg.utils.config import TILE_SIZE
+
+MAPS = [("VillageNav-v0", 0), ("VillageNav-v0", 1), ("UrbanNav-v0", 2), ("VillageNav-Dynamic-v0", 3)]
+
+
+@pytest.fixture(params=MAPS, ids=lambda m: f"{m[0]}-{m[1]}")
+def game_map(request, make_env):
+    env_id, seed = request.param
+    env = make_env(env_id)
+    env.reset(seed=seed)
+    return env.game_map
+
+
+# the label grid versions of the map queries, before the maps were integer coded
+def is_pure_tile_labels(labels, x, y, category):
+    for i in range((x // TILE_SIZE) * TILE_SIZE, (x // TILE_SIZE) * TILE_SIZE + TILE_SIZE):
+        for j in range((y // TILE_SIZE) * TILE_SIZE, (y // TILE_SIZE) * TILE_SIZE + TILE_SIZE):
+            if labels[i][j] != category:
+                return False
+    return True
+
+
+def size_safe_to_place_labels(labels, size, row, col):
+    if not (row + size[0] < len(labels) and col + size[1] < len(labels[0])):
+        return False
+    return all(labels[row + r][col + c] == "land" for r in range(size[0]) for c in range(size[1]))
+
+
+def is_next_to_road_labels(labels, row, col, size=(1, 1)):
+    for (y, x) in {(row - 1, col), (row, col - 1), (row + size[0], col + size[1] - 1), (row + size[0] - 1, col + size[1])}:
+        if 0 <= x < len(labels[0]) and 0 <= y < len(labels) and labels[y][x] in ["road", "grass"]:
+            return True
+    return False
+
+
+def test_label_table():
+    labels = LabelTable()
+    assert [labels.code(name) for name in BASE_LABELS] == list(range(len(BASE_LABELS)))
+    house = labels.code("house_1")
+    assert house == len(BASE_LABELS)
+    assert labels.code("npc_0") == house + 1
+    # never reassigned
+    assert labels.code("house_1") == house
+    assert labels.decode(np.array([[ROAD, house], [0, DESTINATION]])) == [["road", "house_1"], ["", "destination"]]
+
+
+def test_tile_queries_match_the_label_grid(game_map):
+    grid = game_map.map_data[game_map.season]
+    labels = game_map.label_map()[game_map.season]
+    rows, cols = game_map.MAP_ROWS, game_map.MAP_COLS
+    for category in ["road", "land", "destination"]:
+        pure = pure_tiles(grid, game_map.labels.codes[category])
+        for row in range(rows):
+            for col in range(cols):
+                x, y = col * TILE_SIZE, row * TILE_SIZE
+                assert pure[row, col] == is_pure_tile_labels(labels, y, x, category)
+                assert game_map.is_pure_tile(x, y, category) == is_pure_tile_labels(labels, x, y, category)
+    destination = any_tiles(grid, DESTINATION)
+    corners = corner_tiles(grid)
+    for row in range(rows):
+        for col in range(cols):
+            block = [labels[r][c] for r in range(row * TILE_SIZE, (row + 1) * TILE_SIZE)
+                     for c in range(col * TILE_SIZE, (col + 1) * TILE_SIZE)]
+            assert destination[row, col] == ("destination" in block)
+            assert game_map.labels.names[corners[row, col]] == block[0]
+
+
+@pytest.mark.parametrize("size", [(1, 1), (2, 3), (3, 2)])
+def test_placement_queries_match_the_label_grid(game_map, size):
+    grid = game_map.map_data[game_map.season]
+    labels = game_map.label_map()[game_map.season]
+    fits = fit_mask(grid, size)
+    side = game_map.road_side_anchors(size)
+    for row in range(grid.shape[0]):
+        for col in range(grid.shape[1]):
+            safe = size_safe_to_place_labels(labels, size, row, col)
+            assert fits[row, col] == safe
+            assert game_map.size_safe_to_place(size, row, col) == safe
+            next_to_road = is_next_to_road_labels(labels, row, col, size)
+            assert side[row, col] == next_to_road
+            assert game_map.is_next_to_road(row, col, size) == next_to_road
+
+
+def find_path_bfs_forward(game_map, start, closet=None):
+    # one forward BFS per query, as before the distance field
+    start = tuple((x // TILE_SIZE) * TILE_SIZE for x in start)
+    directions = [(-TILE_SIZE, 0), (TILE_SIZE, 0), (0, -TILE_SIZE), (0, TILE_SIZE)]
+    queue = deque([(start, [], 0)])
+    visited = set()
+    closet = set(game_map.closet_to_goal_tiles() if closet is None else closet)
+    road = pure_tiles(game_map.map_data[game_map.season], ROAD)
+    while queue:
+        (x, y), path, dist = queue.popleft()
+        if (x, y) in closet:
+            return path + [(x, y)], dist
+        if (x, y) in visited:
+            continue
+        visited.add((x, y))
+        for dx, dy in directions:
+            nx, ny = x + dx, y + dy
+            if (0 <= ny < game_map.MAP_ROWS * TILE_SIZE and 0 <= nx < game_map.MAP_COLS * TILE_SIZE
+                    and road[ny // TILE_SIZE, nx // TILE_SIZE] and (nx, ny) not in visited):
+                queue.append(((nx, ny), path + [(x, y)], dist + 1))
+    return False, None
+
+
+def all_starts(game_map):
+    # every tile, reachable or not, entered from inside the tile like the character
+    return [(col * TILE_SIZE + 1, row * TILE_SIZE + 2) for row in range(game_map.MAP_ROWS) for col in range(game_map.MAP_COLS)]
+
+
+def test_paths_match_the_forward_bfs(game_map):
+    reachable = 0
+    for start in all_starts(game_map):
+        path, dist = game_map.find_path_bfs(start)
+        assert (path, dist) == find_path_bfs_forward(game_map, start)
+        reachable += bool(path)
+    assert reachable > 1
+
+
+def test_paths_to_another_goal_match_the_forward_bfs(game_map):
+    road_rows, road_cols = np.nonzero(corner_tiles(game_map.map_data[game_map.season]) == ROAD)
+    goal = [(int(road_cols[0]) * TILE_SIZE, int(road_rows[0]) * TILE_SIZE)]
+    for start in all_starts(game_map):
+        assert game_map.find_path_bfs(start, goal) == find_path_bfs_forward(game_map, start, goal)
+
+
+def test_the_field_follows_road_changes(game_map):
+    start = (game_map.start_position[0] + 1, game_map.start_position[1] + 1)
+    path, dist = game_map.find_path_bfs(start)
+    # close the road in the middle of the path, as generate_obstructed_path does
+    x, y = path[len(path) // 2]
+    game_map.map_data[game_map.season][y, x] = CONSTRUCTION
+    detour = game_map.find_path_bfs(start)
+    assert detour == find_path_bfs_forward(game_map, start)
+    assert (x, y) not in (detour[0] or [])
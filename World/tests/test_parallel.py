@@ -0,0 +1,56 @@
+import json
+
+from common.logger import Logger
+from common.utils import initialize_logs
+from llmagentbase.run.checkpoint import init_records, save_record
+from llmagentbase.run.collect import collect_trajs, get_success_fn
+from llmagentbase.run.parallel import shard_tasks, setup_worker, run_worker_task, merge_task
+
+
+def test_shard_tasks():
+    assert shard_tasks(list(range(7)), 3) == [[(0, 0), (3, 3), (6, 6)], [(1, 1), (4, 4)], [(2, 2), (5, 5)]]
+    # finished tasks keep their index and are left out
+    assert shard_tasks(list(range(5)), 2, skip={0: None, 3: None}) == [[(1, 1), (4, 4)], [(2, 2)]]
+    assert shard_tasks([0], 2) == [[(0, 0)], []]
+
+
+def read_lines(path):
+    with open(path) as f:
+        return f.readlines()
+
+
+def test_merged_worker_results_match_the_sequential_run(run_args):
+    task_range = list(range(4))
+    args = run_args(env="VillageNav-v0", agent_model="mock", n_test_tasks=4)
+    args.log_name += "_sequential"
+    sequential = Logger(args)
+    collect_trajs(task_range, sequential, 1, args, False)
+    sequential.close()
+
+    # the worker side of collect_trajs_parallel in this process, one worker after the other
+    args = run_args(env="VillageNav-v0", agent_model="mock", n_test_tasks=4, num_workers=2)
+    logger = Logger(args)
+    records_path, _ = init_records(logger, args)
+    results = {}
+    for rank, shard in enumerate(shard_tasks(task_range, 2)):
+        worker_logger, env, agent, success_fn = setup_worker(rank, args, False, logger.log_folder)
+        for task_idx, task_name in shard:
+            results[task_idx] = run_worker_task(agent, env, task_idx, task_name, worker_logger, 1, worker_logger.args, success_fn)
+        worker_logger.close()
+    # finished out of order, merged in task order
+    last_rewards, best_rewards, best_trials, prev_reflections = initialize_logs(task_range)
+    for task_idx in [1, 3, 0, 2]:
+        save_record(records_path, results[task_idx]["record"])
+    for task_idx in task_range:
+        merge_task(results[task_idx], logger, last_rewards, best_rewards, best_trials,
+                   prev_reflections, get_success_fn(args), args)
+    logger.save_summary()
+    logger.close()
+
+    assert logger.steps_all == sequential.steps_all
+    assert [usage["prompt_tokens"] for usage in logger.usage] == [usage["prompt_tokens"] for usage in sequential.usage]
+    assert last_rewards == [[1.0]] * 4
+    # the sequential log ends with the llm cache summary
+    assert read_lines(logger.log_file) == read_lines(sequential.log_file)[:-1]
+    merged = sorted((json.loads(line) for line in read_lines(records_path)), key=lambda record: record["task_idx"])
+    assert merged == [json.loads(line) for line in read_lines(f"{sequential.log_folder}/tasks.jsonl")]
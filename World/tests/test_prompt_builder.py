@@ -0,0 +1,64 @@
+import pytest
+
+from llmagentbase.agent.adventurer import Adventurer
+from llmagentbase.agent.chef import Chef
+from llmagentbase.agent.cook_planner import CookPlanner
+from llmagentbase.agent.game_planner import GamePlanner
+from llmagentbase.agent.navigate_planner import NavigatePlanner
+from llmagentbase.agent.navigator import Navigator
+from llmagentbase.prompts.builder import PromptBuilder
+
+INSTRUCTION = "You are a navigator."
+IN_CONTEXT = "Example: ...\nAction: forward"
+
+
+def make_agent(cls, manual="Go north twice.", reflection=""):
+    agent = cls(None, INSTRUCTION, IN_CONTEXT, None, "mock", 0.0, 1)
+    agent.manual = manual
+    agent.reflection = reflection
+    return agent
+
+
+def test_system_message_is_shared_by_every_task_and_step():
+    builder = PromptBuilder(INSTRUCTION, IN_CONTEXT)
+    first = builder.build("Guide A\n", "Observation: a road")
+    later = builder.build("Guide B\n", "Observation: a road\nAction: forward\nObservation: a wall")
+    assert first[0] == later[0] == {"role": "system", "content": f"{INSTRUCTION}\n{IN_CONTEXT}"}
+    assert first[1] == {"role": "user", "content": "Now it's your turn:\nGuide A\nObservation: a road\nAction: "}
+
+
+def test_hashes():
+    builder = PromptBuilder(INSTRUCTION, IN_CONTEXT)
+    assert builder.prefix_hash == PromptBuilder(INSTRUCTION, IN_CONTEXT).prefix_hash
+    assert builder.prefix_hash != PromptBuilder(INSTRUCTION, "other examples").prefix_hash
+    assert builder.task_hash("Guide A\n") == builder.task_hash("Guide A\n")
+    assert builder.task_hash("Guide A\n") != builder.task_hash("Guide B\n")
+
+
+@pytest.mark.parametrize("cls", [Navigator, Chef, Adventurer])
+def test_structured_prompt_holds_the_plain_prompt(cls):
+    agent = make_agent(cls, reflection="Last time I turned too early.")
+    plain = agent.construct_prompt("Observation: a road")
+    agent.prompt_builder = PromptBuilder(INSTRUCTION, IN_CONTEXT)
+    system, user = agent.construct_prompt("Observation: a road")
+    assert f"{system['content']}\n{user['content']}" == plain
+
+
+@pytest.mark.parametrize("cls", [NavigatePlanner, CookPlanner, GamePlanner])
+def test_planners_put_the_subgoal_after_the_task_prefix(cls):
+    agent = make_agent(cls)
+    agent.prompt_builder = PromptBuilder(INSTRUCTION, IN_CONTEXT)
+    system, user = agent.construct_prompt("Observation: a road", "reach the bridge")
+    other_system, other_user = agent.construct_prompt("Observation: a road\nAction: forward", "cross the bridge")
+    assert system == other_system
+    prefix = f"Now it's your turn:\n{agent.task_prompt()}"
+    assert user["content"].startswith(prefix) and other_user["content"].startswith(prefix)
+    assert user["content"][len(prefix):] == "Current subgoal: reach the bridge\nTrajectory:\nObservation: a road\nAction: "
+
+
+@pytest.mark.parametrize("cls", [NavigatePlanner, CookPlanner, GamePlanner])
+def test_planners_keep_the_plain_prompt_without_a_builder(cls):
+    prompt = make_agent(cls).construct_prompt("Observation: a road", "reach the bridge")
+    assert isinstance(prompt, str)
+    assert prompt.startswith(f"{INSTRUCTION}\n{IN_CONTEXT}\nNow it's your turn: \n")
+    assert prompt.endswith("Current subgoal: reach the bridge\nTrajectory:\nObservation: a road\nAction: ")
@@ -0,0 +1,157 @@
+import pytest
+
+import common.rate_limit as rate_limit
+from common.llm_clients import ClientRegistry
+from common.rate_limit import CircuitBreaker, CircuitOpen, ModelLimiter, TokenBucket, retry_after
+
+
+class FakeTime(object):
+    """A clock that only moves when something sleeps on it."""
+    def __init__(self):
+        self.now = 1000.
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+
+class ServerError(Exception):
+    pass
+
+
+class RateLimitError(Exception):
+    pass
+
+
+def test_token_bucket(clock):
+    bucket = TokenBucket(2., capacity=4.)
+    assert bucket.wait_time(4) == 0
+    bucket.take(4)
+    assert bucket.wait_time(1) == 0.5
+    clock.sleep(1.)
+    assert bucket.wait_time(2) == 0
+    # more than the capacity only waits for a full bucket
+    assert bucket.wait_time(10) == 1.
+
+
+def test_requests_are_paced_at_the_rpm(clock):
+    limiter = ModelLimiter(rpm=60)
+    start = clock.now
+    for _ in range(5):
+        limiter.acquire()
+    # the first request spends the burst of one, then one per second
+    assert clock.now - start == pytest.approx(4.)
+
+
+def test_tokens_are_paced_at_the_tpm(clock):
+    limiter = ModelLimiter(tpm=600)
+    start = clock.now
+    limiter.acquire(10)
+    assert clock.now == start
+    limiter.acquire(5)
+    assert clock.now - start == pytest.approx(0.5)
+
+
+def test_rate_is_cut_on_a_429_and_recovers(clock):
+    limiter = ModelLimiter(rpm=60)
+    for _ in range(10):
+        limiter.acquire()
+    limiter.rate_limited()
+    assert limiter.rpm == pytest.approx(42.)
+    limiter.success()
+    assert limiter.rpm == pytest.approx(42.5)
+    for _ in range(100):
+        limiter.success()
+    # never above the configured quota
+    assert limiter.rpm == 60
+
+
+def test_unlimited_model_learns_its_rate_from_a_429(clock):
+    limiter = ModelLimiter()
+    start = clock.now
+    for _ in range(30):
+        limiter.acquire()
+    assert clock.now == start
+    # 30 requests in the same second, seeded at 0.7 of the observed 1800 rpm
+    limiter.rate_limited(delay=5.)
+    assert limiter.rpm == pytest.approx(1260.)
+    limiter.acquire()
+    # the server asked to wait 5s first
+    assert clock.now - start == pytest.approx(5.)
+
+
+def test_retry_after():
+    error = RateLimitError()
+    error.headers = {"retry-after": "7"}
+    assert retry_after(error) == 7.
+    error.headers = {"retry-after-ms": "1500"}
+    assert retry_after(error) == 1.5
+    assert retry_after(ServerError()) is None
+    assert retry_after(CircuitOpen("open", retry_after=3.)) == 3.
+
+
+def test_circuit_breaker_opens_and_closes(clock):
+    breaker = CircuitBreaker(threshold=3, cooldown=10.)
+    for _ in range(2):
+        breaker.failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.failure()
+    assert breaker.state == "open" and not breaker.allow()
+    assert breaker.retry_in() == 10.
+
+    clock.sleep(10.)
+    assert breaker.state == "half_open"
+    # a single probe goes through
+    assert breaker.allow() and not breaker.allow()
+    breaker.failure()
+    assert breaker.state == "open"
+
+    clock.sleep(10.)
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == "closed" and breaker.failures == 0
+
+
+def fail(registry, backend, error):
+    with pytest.raises(type(error)):
+        with registry.acquire(backend):
+            raise error
+
+
+def test_registry_skips_failing_endpoints(clock):
+    registry = ClientRegistry("round_robin")
+    registry.configure({"vllm": ["http://a", "http://b"]})
+    a, b = registry.get_endpoints("vllm")
+    for _ in range(rate_limit.BREAKER_THRESHOLD):
+        a.breaker.failure()
+    for _ in range(4):
+        with registry.acquire("vllm") as endpoint:
+            assert endpoint is b
+
+    # a 429 means the server is up
+    fail(registry, "vllm", RateLimitError())
+    assert b.breaker.failures == 0
+    for _ in range(rate_limit.BREAKER_THRESHOLD):
+        fail(registry, "vllm", ServerError())
+    with pytest.raises(CircuitOpen) as error:
+        with registry.acquire("vllm"):
+            pass
+    assert error.value.retry_after == rate_limit.BREAKER_COOLDOWN
+
+    # a recovered endpoint is probed and closed again
+    clock.sleep(rate_limit.BREAKER_COOLDOWN)
+    with registry.acquire("vllm") as endpoint:
+        pass
+    assert registry.stats()["vllm"][endpoint.url]["state"] == "closed"
@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import WORLD, quiet
+from envs.cuterpg.utils.seeding import task_seed
+
+ENV_IDS = ["VillageNav-v0", "Cooking-easy-v0", "Roguelike-easy-v0"]
+
+FIRST_OBSERVATIONS = """
+import contextlib, hashlib, io
+import gym
+import envs.utils
+from envs.cuterpg.utils.seeding import task_seed
+for env_id in {env_ids}:
+    env = gym.make(env_id, disable_env_checker=True).unwrapped
+    with contextlib.redirect_stdout(io.StringIO()):
+        obs = env.reset(seed=task_seed(0, env_id, 2))
+    print(task_seed(0, env_id, 2), hashlib.sha256(str(obs).encode()).hexdigest())
+"""
+
+
+def test_task_seed_depends_on_the_seed_env_and_task_only():
+    assert task_seed(0, "VillageNav-v0", 2) == 963866858
+    seeds = {task_seed(seed, env_id, task_idx)
+             for seed in range(3) for env_id in ENV_IDS for task_idx in range(10)}
+    assert len(seeds) == 3 * len(ENV_IDS) * 10
+
+
+def test_tasks_are_the_same_across_str_hash_seeds():
+    outputs = []
+    for hash_seed in ["0", "1", "random"]:
+        env = {**os.environ, "PYTHONHASHSEED": hash_seed, "PYTHONPATH": str(WORLD),
+               "SDL_VIDEODRIVER": "dummy", "SDL_AUDIODRIVER": "dummy"}
+        outputs.append(subprocess.run([sys.executable, "-c", FIRST_OBSERVATIONS.format(env_ids=ENV_IDS)],
+                                      env=env, cwd=WORLD, capture_output=True, text=True, check=True).stdout)
+    assert len(outputs[0].splitlines()) == len(ENV_IDS)
+    assert outputs[0] == outputs[1] == outputs[2]
+
+
+@pytest.mark.parametrize("env_id", ENV_IDS)
+def test_a_task_does_not_depend_on_the_tasks_before_it(make_env, env_id):
+    env = make_env(env_id)
+    alone = quiet(env.reset, seed=task_seed(0, env_id, 2))
+    for task_idx in [0, 1, 2]:
+        obs = quiet(env.reset, seed=task_seed(0, env_id, task_idx))
+    assert obs == alone
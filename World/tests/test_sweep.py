@@ -0,0 +1,103 @@
+import json
+import queue
+import threading
+
+import pytest
+import yaml
+
+from llmagentbase.run.sweep import Sweep, _sweep_worker, load_sweep
+
+
+def write_sweep(tmp_path, spec):
+    path = tmp_path / "sweep.yaml"
+    path.write_text(yaml.safe_dump(spec))
+    return str(path)
+
+
+def test_load_sweep_expands_the_grid(tmp_path, run_args):
+    spec = {"num_workers": 3,
+            "concurrency": {"qwen3:14b": 2},
+            "args": {"max_trial": 2},
+            "grid": {"env": ["VillageNav-v0", "Cooking-easy-v0"], "manual_type": [None, 1]},
+            "configs": [{"env": "VillageNav-v0", "manual_type": 0, "seed": 1}]}
+    configs, num_workers, concurrency = load_sweep(write_sweep(tmp_path, spec), run_args(env="VillageNav-v0"))
+    assert (num_workers, concurrency) == (3, {"qwen3:14b": 2})
+    assert [(config.env, config.manual_type, config.seed) for config in configs] == [
+        ("VillageNav-v0", None, 0), ("VillageNav-v0", 1, 0), ("Cooking-easy-v0", None, 0), ("Cooking-easy-v0", 1, 0),
+        ("VillageNav-v0", 0, 1)]
+    assert all(config.max_trial == 2 for config in configs)
+    # finalized like a main.py run
+    assert [config.env_type for config in configs] == ["navigation"] * 2 + ["cooking"] * 2 + ["navigation"]
+    assert configs[1].log_name == "debug_VillageNav-v0/Manual_1_False_None_None_gpt-4o-mini_trial_2"
+
+
+@pytest.mark.parametrize("spec, error", [
+    ({}, "No config"),
+    ({"grid": {"temperature": [0, 1]}}, "Unknown arg"),
+    ({"configs": [{"env": "VillageNav-v0"}, {"env": "VillageNav-v0"}]}, "appears twice"),
+    ({"grid": {"env": ["VillageNav-v0"]}, "concurrency": {"mock": 0}}, "at least 1"),
+])
+def test_load_sweep_rejects(tmp_path, run_args, spec, error):
+    with pytest.raises(ValueError, match=error):
+        load_sweep(write_sweep(tmp_path, spec), run_args(env="VillageNav-v0"))
+
+
+def read_records(log_folder):
+    with open(f"{log_folder}/tasks.jsonl") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_sweep_runs_every_config_on_warm_workers(tmp_path, run_args):
+    spec = {"num_workers": 2,
+            "concurrency": {"mock": 1},
+            "grid": {"env": ["VillageNav-v0", "UrbanNav-v0"]}}
+    configs, num_workers, concurrency = load_sweep(write_sweep(tmp_path, spec), run_args(env="VillageNav-v0", agent_model="mock"))
+    for config in configs:
+        config.n_test_tasks = 3
+    sweep = Sweep(configs, num_workers, concurrency, False)
+
+    # the workers of run_sweep as threads, one unit in flight at a time
+    results = queue.Queue()
+    inboxes = [queue.Queue() for _ in range(num_workers)]
+    worker_configs = [(config, f"./logs/{config.log_name}") for config in configs]
+    workers = [threading.Thread(target=_sweep_worker, args=(rank, worker_configs, False, inboxes[rank], results))
+               for rank in range(num_workers)]
+    for worker in workers:
+        worker.start()
+    units = []
+    sweep.dispatch(inboxes)
+    while not sweep.done():
+        assert sum(config_idx is not None for config_idx in sweep.busy) == 1
+        result = results.get(timeout=60)
+        assert result["type"] == "task", result.get("error")
+        units.append((result["rank"], result["config"], result["task_idx"]))
+        sweep.finish_unit(result, inboxes)
+        sweep.dispatch(inboxes)
+    for inbox in inboxes:
+        inbox.put(None)
+    for worker in workers:
+        worker.join()
+
+    # the idle worker keeps getting the tasks of the config it has warm
+    assert units == [(0, 0, 0), (0, 0, 1), (0, 0, 2), (0, 1, 0), (0, 1, 1), (0, 1, 2)]
+    assert sweep.warm == [set(), set()]
+    for config, log_folder in worker_configs:
+        records = read_records(log_folder)
+        assert [record["task_idx"] for record in records] == [0, 1, 2]
+        # the mock llm follows the oracle of the env of its own config
+        assert [record["rewards"] for record in records] == [[1.0]] * 3
+
+
+def test_a_warm_worker_interleaves_configs(tmp_path, run_args):
+    spec = {"grid": {"env": ["VillageNav-v0", "UrbanNav-v0"]}}
+    configs, _, _ = load_sweep(write_sweep(tmp_path, spec), run_args(env="VillageNav-v0", agent_model="mock"))
+    worker_configs = [(config, f"./logs/{config.log_name}") for config in configs]
+    inbox, results = queue.Queue(), queue.Queue()
+    for unit in [("task", 0, 0, 0), ("task", 1, 0, 0), ("task", 0, 1, 1), ("release", 0), ("task", 1, 1, 1), None]:
+        inbox.put(unit)
+    _sweep_worker(0, worker_configs, False, inbox, results)
+    units = [results.get_nowait() for _ in range(5)]
+    assert [unit["type"] for unit in units] == ["task"] * 4 + ["done"]
+    assert [(unit["config"], unit["task_idx"]) for unit in units[:4]] == [(0, 0), (1, 0), (0, 1), (1, 1)]
+    # the mock llm follows the env of the running task, not of the last config set up
+    assert [unit["record"]["rewards"] for unit in units[:4]] == [[1.0]] * 4
@@ -0,0 +1,83 @@
+import sys
+import types
+
+import pytest
+
+import common.llms as llms
+from common.llms import TokenCounter
+
+
+class WordEncoder(object):
+    """One token per word, remembering every text it was asked to encode."""
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, text):
+        self.encoded.append(text)
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+@pytest.fixture
+def encoder(monkeypatch):
+    encoder = WordEncoder()
+    monkeypatch.setattr(llms, "get_encoder", lambda: encoder)
+    return encoder
+
+
+def test_counter_encodes_only_the_appended_text(encoder):
+    counter = TokenCounter()
+    prompt = "Instruction and examples\nObservation: a road"
+    assert counter.update(prompt) == 6
+    for step in range(3):
+        prompt += f"\nAction: forward\nObservation: step {step}"
+        assert counter.update(prompt) == len(prompt.split())
+    # the history was encoded once, every later step only encoded its own lines
+    assert sum(len(text) for text in encoder.encoded) == len(prompt)
+
+
+def test_counter_recounts_a_prompt_that_does_not_extend_the_last_one(encoder):
+    counter = TokenCounter()
+    counter.update("Observation: a road ahead")
+    assert counter.update("Observation: a wall") == 3
+    assert encoder.encoded[-1] == "Observation: a wall"
+
+
+def test_message_token_num_counts_the_chat_overhead(encoder):
+    messages = [{"role": "system", "content": "You navigate."},
+                {"role": "user", "content": "Which way?", "name": "player"}]
+    # 3 to prime the reply, 3 per message, 1 per name, plus the encoded fields
+    assert llms.token_num(messages) == 3 + (3 + 1 + 2) + (3 + 1 + 2 + 1 + 1)
+    with pytest.raises(ValueError):
+        llms.token_num(42)
+
+
+def test_truncate(encoder):
+    assert llms.truncate("a b c d", 2) == "a b"
+
+
+def test_the_encoder_is_built_once(monkeypatch):
+    built = []
+    fake_tiktoken = types.ModuleType("tiktoken")
+    fake_tiktoken.get_encoding = lambda name: built.append(name) or WordEncoder()
+    monkeypatch.setitem(sys.modules, "tiktoken", fake_tiktoken)
+    monkeypatch.setattr(llms, "_encoder", None)
+    for _ in range(3):
+        llms.token_num("a b c")
+    assert built == ["cl100k_base"]
+
+
+def test_counter_matches_tiktoken():
+    try:
+        encoder = llms.get_encoder()
+    except Exception:
+        pytest.skip("the cl100k_base encoding cannot be loaded here")
+    counter = TokenCounter()
+    prompt = "You are a navigator.\nObservation: You are facing north."
+    counter.update(prompt)
+    for extension, step in enumerate(["forward", "turn left", "think[the goal is east]", "forward"], 1):
+        prompt += f"\nAction: {step}\nObservation: You moved."
+        # tokens merging across the boundary, at most one per extension
+        assert abs(counter.update(prompt) - len(encoder.encode(prompt))) <= extension
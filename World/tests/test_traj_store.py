@@ -0,0 +1,98 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+from common.traj_store import TrajectoryStore, STEP_COLUMNS, load_steps, episode_summary
+
+
+def row(task, step, trial=0, reward=0.0):
+    return {"run": "run", "env": "VillageNav-v0", "model": "mock", "task": str(task), "trial": trial,
+            "step": step, "action": "forward", "observation": f"obs {step}", "reward": reward,
+            "subgoal": None, "llm_calls": 1, "latency": 0.5, "prompt_tokens": 10, "completion_tokens": 2}
+
+
+def read_rows(folder):
+    rows = []
+    for name in sorted(os.listdir(folder)):
+        rows.extend(pq.read_table(os.path.join(folder, name)).to_pylist())
+    return sorted(rows, key=lambda r: (r["task"], r["trial"], r["step"]))
+
+
+def test_parts_are_written_every_flush_rows(tmp_path):
+    store = TrajectoryStore(str(tmp_path), flush_rows=2)
+    for step in range(5):
+        store.append(row(0, step))
+    assert len(os.listdir(tmp_path)) == 2
+    store.flush()
+    names = sorted(os.listdir(tmp_path))
+    assert names == [f"part-{store.token}-{n:05d}.parquet" for n in range(3)]
+    rows = read_rows(tmp_path)
+    assert [r["step"] for r in rows] == list(range(5))
+    assert list(rows[0]) == [name for name, _ in STEP_COLUMNS]
+
+
+def test_stores_sharing_a_folder_never_overwrite(tmp_path):
+    first, second = TrajectoryStore(str(tmp_path)), TrajectoryStore(str(tmp_path))
+    first.append(row(0, 0))
+    second.append(row(1, 0))
+    first.flush()
+    second.flush()
+    assert first.token != second.token
+    assert [r["task"] for r in read_rows(tmp_path)] == ["0", "1"]
+
+
+def test_keep_tasks_drops_unfinished_tasks(tmp_path):
+    store = TrajectoryStore(str(tmp_path), flush_rows=2)
+    for r in [row(0, 0), row(0, 1), row(1, 0), row(2, 0), row(1, 1), row(1, 2)]:
+        store.append(r)
+    store.flush()
+    # as init_records does on --resume, with the task names of tasks.jsonl
+    TrajectoryStore(str(tmp_path)).keep_tasks({0: {}, 2: {}})
+    assert [(r["task"], r["step"]) for r in read_rows(tmp_path)] == [("0", 0), ("0", 1), ("2", 0)]
+    # the part holding only task 1 is gone
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_clear(tmp_path):
+    store = TrajectoryStore(str(tmp_path))
+    store.append(row(0, 0))
+    store.flush()
+    store.clear()
+    assert os.listdir(tmp_path) == []
+
+
+def test_missing_pyarrow_is_a_clear_error(tmp_path, monkeypatch):
+    store = TrajectoryStore(str(tmp_path))
+    monkeypatch.setitem(sys.modules, "pyarrow.parquet", None)
+    with pytest.raises(ImportError, match="trajectory store needs pyarrow"):
+        store.append(row(0, 0))
+
+
+def test_logger_does_not_import_pandas_or_pyarrow():
+    code = "import sys, common.logger; print(sorted(m for m in ('pandas', 'pyarrow') if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    assert out.stdout.strip() == "[]"
+
+
+def test_load_steps_and_episode_summary(tmp_path):
+    pytest.importorskip("pandas")
+    folder = tmp_path / "run" / "steps"
+    store = TrajectoryStore(str(folder))
+    for step in range(3):
+        store.append(row(0, step, reward=float(step == 2)))
+    store.append(row(0, 0, trial=1))
+    store.append(dict(row(1, 0), env="UrbanNav-v0"))
+    store.flush()
+
+    steps = load_steps(str(tmp_path / "*" / "steps"), env="VillageNav-v0")
+    assert len(steps) == 4
+    assert len(load_steps(str(folder), trial=[1])) == 1
+    episodes = episode_summary(steps)
+    first = episodes[(episodes.task == "0") & (episodes.trial == 0)].iloc[0]
+    assert (first.steps, first.reward, first.llm_calls, first.prompt_tokens) == (3, 1.0, 3, 30)
+    assert list(load_steps(str(tmp_path / "none")).columns) == [name for name, _ in STEP_COLUMNS]
@@ -0,0 +1,98 @@
+import pickle
+
+import pytest
+
+import envs.cuterpg.utils.world_bundle as world_bundle
+from envs.cuterpg.utils.seeding import task_seed
+from envs.cuterpg.utils.world_bundle import WorldBundle, generate_bundle
+from envs.cuterpg.utils.world_cache import WorldCache
+from envs.utils import load_env
+
+ENV_ID = "VillageNav-v0"
+
+
+def no_generation(*args, **kwargs):
+    raise AssertionError("the world should have been loaded from the bundle")
+
+
+@pytest.fixture
+def bundle_path(tmp_path, pinned_gym, monkeypatch):
+    monkeypatch.setattr(world_bundle, "_envs", {})
+    return str(tmp_path / "worlds" / "seed_0.bundle")
+
+
+def test_bundle_round_trip(bundle_path, make_env):
+    logs = []
+    summary = generate_bundle(ENV_ID, bundle_path, 3, seed=0, log=logs.append)
+    assert (summary["worlds"], summary["rejected"]) == (3, 0)
+    assert summary["path_length"]["min"] <= summary["path_length"]["mean"] <= summary["path_length"]["max"]
+    assert logs[-1].endswith(f"3/3 worlds of {ENV_ID}")
+
+    bundle = WorldBundle(bundle_path, ENV_ID, 0)
+    assert len(bundle) == 3
+    assert [bundle.stats[task]["seed"] for task in range(3)] == [task_seed(0, ENV_ID, task) for task in range(3)]
+    for task in range(3):
+        seed = task_seed(0, ENV_ID, task)
+        generated = make_env(ENV_ID)
+        obs = generated.reset(seed=seed)
+        loaded = make_env(ENV_ID)
+        loaded.world_cache = bundle
+        loaded.env.take_action = no_generation
+        assert loaded.reset(seed=seed) == obs
+        assert loaded.game_map.path == generated.game_map.path
+        assert loaded.character.position == generated.character.position
+
+
+def test_rejected_worlds_are_generated_at_reset(bundle_path, make_env, tmp_path, monkeypatch):
+    rejected_seed = task_seed(0, ENV_ID, 1)
+    # tasks are generated in order by a single process
+    problems = iter([[], ["no path from the start to the goal"], []])
+    monkeypatch.setattr(world_bundle, "validate_world", lambda env: next(problems))
+    summary = generate_bundle(ENV_ID, bundle_path, 3, seed=0, log=lambda text: None)
+    assert (summary["worlds"], summary["rejected"]) == (2, 1)
+    with open(bundle_path, "rb") as f:
+        assert pickle.load(f)["rejected"] == {1: ["no path from the start to the goal"]}
+
+    fallback = WorldCache(str(tmp_path / "cache"), ENV_ID)
+    bundle = WorldBundle(bundle_path, ENV_ID, 0, fallback=fallback)
+    assert bundle.load(rejected_seed) is None
+    env = make_env(ENV_ID)
+    env.world_cache = bundle
+    obs = env.reset(seed=rejected_seed)
+    # generated, and kept by the fallback cache for the next runs
+    assert fallback.load(rejected_seed)["obs"] == obs
+
+
+def test_bundle_of_another_run_is_refused(bundle_path):
+    generate_bundle(ENV_ID, bundle_path, 1, seed=0, log=lambda text: None)
+    with pytest.raises(ValueError, match="not the VillageNav-v0 worlds of seed 1"):
+        WorldBundle(bundle_path, ENV_ID, 1)
+    with pytest.raises(ValueError, match="not the UrbanNav-v0 worlds"):
+        WorldBundle(bundle_path, "UrbanNav-v0", 0)
+    with open(bundle_path, "rb") as f:
+        bundle = pickle.load(f)
+    bundle["version"] = -1
+    with open(bundle_path, "wb") as f:
+        pickle.dump(bundle, f)
+    with pytest.raises(ValueError, match="older world generation"):
+        WorldBundle(bundle_path, ENV_ID, 0)
+    with pytest.raises(ValueError, match="not a navigation env"):
+        generate_bundle("Cooking-easy-v0", bundle_path, 1)
+
+
+def test_load_env_plays_the_bundle(bundle_path, run_args):
+    generate_bundle(ENV_ID, bundle_path, 2, seed=0, log=lambda text: None)
+    env = load_env(run_args(env=ENV_ID, world_bundle=bundle_path))
+    assert isinstance(env.unwrapped.world_cache, WorldBundle)
+    env.unwrapped.env.take_action = no_generation
+    env.reset(seed=task_seed(0, ENV_ID, 1))
+
+
+def test_validate_world(make_env):
+    env = make_env(ENV_ID)
+    env.reset(seed=task_seed(0, ENV_ID, 0))
+    assert world_bundle.validate_world(env) == []
+    env.game_map.path = env.game_map.path[1:]
+    assert world_bundle.validate_world(env) == ["the path does not begin at the start"]
+    env.game_map.path = False
+    assert world_bundle.validate_world(env) == ["no path from the start to the goal"]
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from conftest import quiet
+from envs.cuterpg.utils.seeding import seed_everything
+from envs.cuterpg.utils.world_cache import WorldCache
+
+
+def no_generation(*args, **kwargs):
+    raise AssertionError("the world should have been loaded from the cache")
+
+
+def test_roguelike_world_cache_round_trip(make_env, tmp_path):
+    env_id = "Roguelike-easy-v0"
+    first = make_env(env_id)
+    first.world_cache = WorldCache(str(tmp_path), env_id)
+    start = quiet(first.reset, seed=11)
+    assert os.path.exists(first.world_cache.path(11))
+    seed_everything(1)
+    manual = quiet(first.get_manual, None)
+    first_steps = [quiet(first.step, action)[0] for action in ["leave", "leave"]]
+
+    second = make_env(env_id)
+    second.world_cache = WorldCache(str(tmp_path), env_id)
+    second.env.generate_game = no_generation
+    assert quiet(second.reset, seed=11) == start
+    seed_everything(1)
+    assert quiet(second.get_manual, None) == manual
+    assert [quiet(second.step, action)[0] for action in ["leave", "leave"]] == first_steps
+
+
+def test_navigation_world_cache_round_trip(make_env, tmp_path):
+    env_id = "VillageNav-v0"
+    first = make_env(env_id)
+    first.world_cache = WorldCache(str(tmp_path), env_id)
+    start = first.reset(seed=11)
+    path, position = list(first.game_map.path), first.character.position
+
+    second = make_env(env_id)
+    second.world_cache = WorldCache(str(tmp_path), env_id)
+    second.env.take_action = no_generation
+    assert second.reset(seed=11) == start
+    assert second.game_map.path == path
+    assert second.character.position == position
+
+
+def test_cooking_world_cache_round_trip(make_env, tmp_path):
+    env_id = "Cooking-easy-v0"
+    first = make_env(env_id)
+    first.world_cache = WorldCache(str(tmp_path), env_id)
+    start = first.reset(seed=11)
+
+    second = make_env(env_id)
+    second.world_cache = WorldCache(str(tmp_path), env_id)
+    second.env.generate_task = no_generation
+    assert second.reset(seed=11) == start
+    seed_everything(1)
+    moved = first.step("goto farm")[0]
+    seed_everything(1)
+    assert second.step("goto farm")[0] == moved
+
+
+def test_world_cache_ignores_other_envs(tmp_path):
+    WorldCache(str(tmp_path), "VillageNav-v0").save(7, {"obs": "world"})
+    assert WorldCache(str(tmp_path), "VillageNav-v0").load(7) == {"obs": "world"}
+    assert WorldCache(str(tmp_path), "UrbanNav-v0").load(7) is None
+    assert WorldCache(str(tmp_path), "VillageNav-v0").load(8) is None
+    assert WorldCache(str(tmp_path), "VillageNav-v0").load(None) is None